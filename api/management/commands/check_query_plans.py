@@ -0,0 +1,159 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.pagination import PAGE_SIZE, keyset_queryset
+from homepage.models import (
+    ChatMessage,
+    Community,
+    Conversation,
+    DirectMessage,
+    PhotoComment,
+    UserPhoto,
+)
+
+
+# Plan fragments that mean "this query reads the whole table" or
+# "this query sorts rows itself instead of walking an index in order".
+BAD_PLAN_PATTERNS = {
+    'postgresql': [
+        (re.compile(r'Seq Scan on (?P<table>\w+)'), 'sequential scan'),
+        (re.compile(r'(^|->)\s*Sort\s+\(', re.MULTILINE), 'filesort'),
+    ],
+    'sqlite': [
+        (re.compile(r'\bSCAN (?P<table>\w+)'), 'sequential scan'),
+        (re.compile(r'USE TEMP B-TREE FOR ORDER BY'), 'filesort'),
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large dataset, EXPLAIN the hot querysets used by api/views.py and "
+        "fail if any plan contains a sequential scan or a filesort."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000,
+                            help='Rows to seed per hot table (default: 20000).')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the seeded rows instead of rolling them back.')
+        parser.add_argument('--verbose-plans', action='store_true',
+                            help='Print every plan, not only the failing ones.')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in BAD_PLAN_PATTERNS:
+            raise CommandError(f"Query plan checks are not supported on '{vendor}'.")
+
+        failures = []
+        with transaction.atomic():
+            seed = self._seed(options['rows'])
+            self._analyze()
+
+            for name, queryset in self._hot_querysets(seed):
+                plan = queryset.explain()
+                problems = self._problems(vendor, plan)
+                if problems or options['verbose_plans']:
+                    self.stdout.write(f"--- {name}\n{plan}\n")
+                if problems:
+                    failures.append((name, problems))
+                    self.stdout.write(self.style.ERROR(f"FAIL {name}: {', '.join(problems)}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"OK   {name}"))
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot queryset(s) have a bad query plan.")
+
+    # ---------------------------------------------------------
+    # Hot querysets (keep in sync with api/views.py)
+    # ---------------------------------------------------------
+    def _hot_querysets(self, seed):
+        user = seed['user']
+        return [
+            ('ChatListCreateView',
+             ChatMessage.objects.filter(community__isnull=True).order_by('-created_at')[:50]),
+            ('CommunityChatListCreateView',
+             ChatMessage.objects.filter(community=seed['community']).order_by('-created_at')[:50]),
+            ('DirectMessageListCreateView',
+             DirectMessage.objects.filter(conversation=seed['conversation']).order_by('-created_at')[:50]),
+            ('DirectThreadSerializer (unread)',
+             DirectMessage.objects.filter(conversation=seed['conversation'], pk__gt=0).exclude(sender=user)),
+            ('PhotoCommentListView',
+             PhotoComment.objects.filter(photo=seed['photo'], parent=None).order_by('created_at')),
+            ('UserPhotoListCreateView (first page)',
+             keyset_queryset(UserPhoto.objects.filter(user=user))[:PAGE_SIZE + 1]),
+            ('UserPhotoListCreateView (next page)',
+             keyset_queryset(UserPhoto.objects.filter(user=user),
+                             (seed['photo'].created_at, seed['photo'].pk))[:PAGE_SIZE + 1]),
+        ]
+
+    def _problems(self, vendor, plan):
+        problems = []
+        for pattern, label in BAD_PLAN_PATTERNS[vendor]:
+            for match in pattern.finditer(plan):
+                table = match.groupdict().get('table')
+                problems.append(f"{label} on {table}" if table else label)
+        return problems
+
+    # ---------------------------------------------------------
+    # Seeding
+    # ---------------------------------------------------------
+    def _seed(self, rows):
+        user_count = max(rows // 100, 10)
+        users = User.objects.bulk_create(
+            User(username=f'planseed{i}', email=f'planseed{i}@example.com') for i in range(user_count)
+        )
+        communities = Community.objects.bulk_create(
+            Community(name=f'Plan seed {i}', slug=f'plan-seed-{i}', created_by=users[i % user_count])
+            for i in range(max(rows // 500, 10))
+        )
+        conversations = Conversation.objects.bulk_create(
+            Conversation() for _ in range(max(rows // 100, 10))
+        )
+        Participant = Conversation.participants.through
+        Participant.objects.bulk_create(
+            Participant(conversation_id=c.pk, user_id=users[(i + k) % user_count].pk)
+            for i, c in enumerate(conversations) for k in (0, 1)
+        )
+
+        ChatMessage.objects.bulk_create(
+            (ChatMessage(user=users[i % user_count],
+                         community=None if i % 5 == 0 else communities[i % len(communities)],
+                         text='seed')
+             for i in range(rows)),
+            batch_size=1000,
+        )
+        DirectMessage.objects.bulk_create(
+            (DirectMessage(conversation=conversations[i % len(conversations)],
+                           sender=users[i % user_count],
+                           text='seed')
+             for i in range(rows)),
+            batch_size=1000,
+        )
+        photos = UserPhoto.objects.bulk_create(
+            (UserPhoto(user=users[i % user_count], image=f'gallery/seed{i}.jpg') for i in range(rows)),
+            batch_size=1000,
+        )
+        PhotoComment.objects.bulk_create(
+            (PhotoComment(user=users[i % user_count], photo=photos[i % len(photos)], text='seed')
+             for i in range(rows)),
+            batch_size=1000,
+        )
+
+        return {
+            'user': users[0],
+            'community': communities[1],
+            'conversation': conversations[0],
+            'photo': photos[0],
+        }
+
+    def _analyze(self):
+        # Refresh planner statistics so the seeded volume is actually visible
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
@@ -0,0 +1,76 @@
+import io
+import json
+import pstats
+import re
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import profile_dir
+
+
+# Literals vary per request; strip them so the same statement groups together
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarize the request profiles collected by core.profiling.ProfilingMiddleware: "
+        "hottest functions across all samples and the most expensive SQL statements."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--route', help='Only samples of this URL name (e.g. api-dm-thread-messages).')
+        parser.add_argument('--limit', type=int, default=25, help='Rows per table (default: 25).')
+        parser.add_argument('--sort', default='cumulative', choices=['cumulative', 'tottime', 'ncalls'],
+                            help='Function ordering (default: cumulative).')
+
+    def handle(self, *args, **options):
+        directory = profile_dir()
+        samples = []
+        for prof in sorted(directory.glob('*.prof')):
+            meta_path = prof.with_suffix('.json')
+            try:
+                meta = json.loads(meta_path.read_text())
+            except (OSError, ValueError):
+                continue
+            if options['route'] and meta['route'] != options['route']:
+                continue
+            samples.append((prof, meta))
+        if not samples:
+            raise CommandError(f"No profiles found in {directory}.")
+
+        self._routes(samples)
+        self._functions(samples, options['sort'], options['limit'])
+        self._sql(samples, options['limit'])
+
+    def _routes(self, samples):
+        by_route = defaultdict(list)
+        for _, meta in samples:
+            by_route[meta['route']].append(meta)
+        self.stdout.write(f"{len(samples)} sample(s)\n")
+        self.stdout.write(f"{'route':<40}{'samples':>8}{'avg ms':>10}{'avg queries':>13}")
+        for route, metas in sorted(by_route.items(), key=lambda item: -len(item[1])):
+            avg_ms = sum(m['total_ms'] for m in metas) / len(metas)
+            avg_queries = sum(len(m['queries']) for m in metas) / len(metas)
+            self.stdout.write(f"{route:<40}{len(metas):>8}{avg_ms:>10.1f}{avg_queries:>13.1f}")
+
+    def _functions(self, samples, sort, limit):
+        buffer = io.StringIO()
+        stats = pstats.Stats(*(str(prof) for prof, _ in samples), stream=buffer)
+        stats.files = []  # don't list every sample file in the header
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        self.stdout.write(f"\nHottest functions (by {sort}):")
+        self.stdout.write(buffer.getvalue())
+
+    def _sql(self, samples, limit):
+        totals = defaultdict(lambda: [0, 0.0])
+        for _, meta in samples:
+            for query in meta['queries']:
+                entry = totals[SQL_LITERALS.sub('?', query['sql'])]
+                entry[0] += 1
+                entry[1] += query['ms']
+        self.stdout.write("Most expensive SQL (total time across samples):")
+        self.stdout.write(f"{'total ms':>10}{'calls':>8}  statement")
+        for sql, (calls, ms) in sorted(totals.items(), key=lambda item: -item[1][1])[:limit]:
+            self.stdout.write(f"{ms:>10.1f}{calls:>8}  {sql[:160]}")
@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from homepage.models import MediaObject, UserPhoto
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete stored images that no avatar or gallery photo has used for --grace-hours "
+        "(reference counts are kept in homepage.models.MediaObject)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Keep unreferenced images this long, for uploads still in flight (default: 24).')
+        parser.add_argument('--recount', action='store_true',
+                            help='Rebuild all reference counts from the database first.')
+        parser.add_argument('--dry-run', action='store_true', help='Only list what would be deleted.')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            self.stdout.write(f"Recounted: {MediaObject.recount()} referenced file(s)")
+
+        storage = UserPhoto._meta.get_field('image').storage
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        deleted = 0
+        for obj in MediaObject.objects.filter(refs__lte=0, updated_at__lt=cutoff).order_by('pk').iterator():
+            if options['dry_run']:
+                self.stdout.write(obj.name)
+                deleted += 1
+                continue
+            with transaction.atomic():
+                # Re-check under the row lock: a reference counted or an upload reusing the
+                # file (MediaObject.touch) keeps it, and a touch now waits for the delete
+                claimed = MediaObject.objects.select_for_update().filter(
+                    pk=obj.pk, refs__lte=0, updated_at__lt=cutoff,
+                ).first()
+                if claimed is None:
+                    continue
+                storage.delete(claimed.name)
+                claimed.delete()
+            deleted += 1
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(f"{verb} {deleted} unreferenced file(s)")
@@ -0,0 +1,151 @@
+"""
+Ring buffers of the newest chat messages per room, so polling a chat costs
+no database query while the buffer is warm.
+
+A room's buffer is an entry in the default cache holding the
+LeanChatMessageSerializer rows of its newest RecentChat.SIZE messages. The rows hold nothing request-specific, so one
+buffer serves every reader. Signal receivers below update the buffers after
+each transaction commits: a saved message is inserted, a deleted one is
+removed, and a reaction change rewrites the message's reaction_summary.
+
+Every room also has a version counter, bumped before each update. A buffer
+records the version it is current for, and an update only applies to the
+buffer of the version just before its own. Anything else, such as two
+workers updating at once, an evicted key, or a deletion from a full buffer,
+drops the buffer, and the next read rebuilds it from the database.
+
+Author names, avatars and online state are copied into the rows, so a buffer
+is rebuilt at least every RecentChat.TIMEOUT seconds to refresh them.
+
+Buffers need a cache shared by all workers (REDIS_URL). With a per-process
+cache every worker would keep its own buffer, updated by its own writes
+only, so reads go straight to the database instead.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import is_shared
+from homepage.models import ChatMessage, reactions_summarized
+from .serializers import LeanChatMessageSerializer
+
+
+class RecentChat:
+    """The newest SIZE messages of each chat room (community_id None is the global chat)."""
+
+    SIZE = 50
+    TIMEOUT = 60
+
+    @staticmethod
+    def key(community_id):
+        return f"chat_recent:{community_id or 'global'}"
+
+    @staticmethod
+    def version_key(community_id):
+        return f"chat_recent_version:{community_id or 'global'}"
+
+    @classmethod
+    def load(cls, community_id):
+        return LeanChatMessageSerializer.values(
+            ChatMessage.objects.filter(community_id=community_id).order_by('-created_at')[:cls.SIZE]
+        )
+
+    @classmethod
+    def get(cls, community_id):
+        """Rows of the room's newest messages, newest first; from the database only when cold."""
+        if not is_shared(cache):
+            return cls.load(community_id)
+        key, version_key = cls.key(community_id), cls.version_key(community_id)
+        found = cache.get_many([key, version_key])
+        version = found.get(version_key)
+        if version is None:
+            # Start from the clock: buffers from before an evicted counter must not match again
+            cache.add(version_key, time.time_ns() // 1000, None)
+            version = cache.get(version_key)
+        entry = found.get(key)
+        if entry is not None and entry['version'] == version:
+            return entry['rows']
+
+        # The version is read before the rows, so an update committed meanwhile makes this a miss
+        rows = cls.load(community_id)
+        cache.set(key, {
+            'version': version,
+            'expires_at': time.time() + cls.TIMEOUT,
+            # A full buffer cannot tell which message comes after a deleted one
+            'full': len(rows) >= cls.SIZE,
+            'rows': rows,
+        }, cls.TIMEOUT)
+        return rows
+
+    @classmethod
+    def _update(cls, community_id, change):
+        """Apply change(entry) -> rows, or None to drop the buffer."""
+        if not is_shared(cache):
+            return
+        key = cls.key(community_id)
+        try:
+            version = cache.incr(cls.version_key(community_id))
+        except ValueError:
+            cache.delete(key)
+            return
+        entry = cache.get(key)
+        if entry is None:
+            return
+        rows = change(entry) if entry['version'] == version - 1 else None
+        timeout = entry['expires_at'] - time.time()
+        if rows is None or timeout <= 0:
+            cache.delete(key)
+            return
+        cache.set(key, {**entry, 'version': version, 'rows': rows}, timeout)
+
+    @classmethod
+    def message_saved(cls, message_id, community_id):
+        def change(entry):
+            # Only read when a buffer is there to update
+            saved = LeanChatMessageSerializer.values(ChatMessage.objects.filter(pk=message_id))
+            rows = [row for row in entry['rows'] if row['id'] != message_id] + saved
+            rows.sort(key=lambda row: (row['created_at'], row['id']), reverse=True)
+            return rows[:cls.SIZE]
+        cls._update(community_id, change)
+
+    @classmethod
+    def message_deleted(cls, message_id, community_id):
+        def change(entry):
+            rows = [row for row in entry['rows'] if row['id'] != message_id]
+            if entry['full'] and len(rows) < len(entry['rows']):
+                return None
+            return rows
+        cls._update(community_id, change)
+
+    @classmethod
+    def reactions_changed(cls, message_id, community_id, summary):
+        def change(entry):
+            return [
+                {**row, 'reaction_summary': summary} if row['id'] == message_id else row
+                for row in entry['rows']
+            ]
+        cls._update(community_id, change)
+
+
+# -------------------------------------------------------------
+# SIGNALS
+# -------------------------------------------------------------
+@receiver(post_save, sender=ChatMessage)
+def buffer_saved_message(sender, instance, **kwargs):
+    message_id, community_id = instance.pk, instance.community_id
+    transaction.on_commit(lambda: RecentChat.message_saved(message_id, community_id))
+
+
+@receiver(post_delete, sender=ChatMessage)
+def unbuffer_deleted_message(sender, instance, **kwargs):
+    message_id, community_id = instance.pk, instance.community_id
+    transaction.on_commit(lambda: RecentChat.message_deleted(message_id, community_id))
+
+
+@receiver(reactions_summarized, sender=ChatMessage)
+def buffer_reactions(sender, message, **kwargs):
+    message_id, community_id, summary = message.pk, message.community_id, message.reaction_summary
+    transaction.on_commit(lambda: RecentChat.reactions_changed(message_id, community_id, summary))
@@ -0,0 +1,66 @@
+"""
+orjson-backed drop-in replacements for DRF's JSONRenderer and JSONParser.
+
+The output is byte-for-byte what JSONRenderer produces for API payloads:
+compact separators, UTF-8, datetimes as ISO 8601 with "Z" for UTC,
+Decimal as a number, lazy translation strings forced to str, and
+\\u2028 / \\u2029 escaped. Anything orjson cannot encode natively goes
+through DRF's own JSONEncoder.default. Pretty-printed output (the browsable
+API, `Accept: application/json; indent=4`) still goes through the stdlib
+renderer, because orjson only supports a 2-space indent.
+
+orjson is optional: without it both classes behave exactly like their
+DRF parents.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_drf_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    options = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_drf_default, option=self.options)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits, which the stdlib encoder handles
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same JavaScript-safety escaping as JSONRenderer
+        if b'\xe2\x80' in ret:
+            ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            body = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                body = body.decode(encoding)
+            return orjson.loads(body)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
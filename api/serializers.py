@@ -1,7 +1,11 @@
+from datetime import timedelta
+
 from django.contrib.auth.models import User
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
+from django.utils import timezone
 from django.utils.text import slugify
+from rest_framework.settings import api_settings
 
 
 from homepage.models import (
@@ -18,8 +22,38 @@ from homepage.models import (
     Experience,
     Skill,
     MessageReaction,
-    CommunityMessageReaction,
 )
+from homepage.encryption import MessageEncryption
+from core.media import media_url, media_urls
+
+
+class MediaURLField(serializers.ImageField):
+    """ImageField that renders its URL through core.media (memoized per file name)."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        if not getattr(self, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+            return value.name
+        url = media_url(value)
+        request = self.context.get('request', None)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+def reaction_groups(summary, request):
+    """[{'emoji', 'count', 'users': [{'username', 'is_me'}]}] from a message's
+    reaction_summary (see homepage.models.SummarizesReactions)."""
+    me = request.user.pk if request and request.user.is_authenticated else None
+    return [
+        {
+            'emoji': emoji,
+            'count': len(users),
+            'users': [{'username': username, 'is_me': me is not None and user_id == me} for user_id, username in users],
+        }
+        for emoji, users in summary
+    ]
 
 
 class ChatMessageSerializer(serializers.ModelSerializer):
@@ -36,8 +70,8 @@ class ChatMessageSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'username', 'avatar', 'created_at', 'is_me', 'community_id', 'reactions', 'is_online']
 
     def get_avatar(self, obj):
-        if hasattr(obj.user, 'profile') and obj.user.profile.avatar:
-            return obj.user.profile.avatar.url
+        if hasattr(obj.user, 'profile'):
+            return media_url(obj.user.profile.avatar)
         return None
 
     def get_is_me(self, obj):
@@ -47,23 +81,7 @@ class ChatMessageSerializer(serializers.ModelSerializer):
         return False
     
     def get_reactions(self, obj):
-        from collections import defaultdict
-        reaction_groups = defaultdict(list)
-        
-        for reaction in obj.reactions.all():
-            reaction_groups[reaction.emoji].append({
-                'username': reaction.user.username,
-                'is_me': reaction.user == self.context.get('request').user if self.context.get('request') else False
-            })
-        
-        return [
-            {
-                'emoji': emoji,
-                'count': len(users),
-                'users': users
-            }
-            for emoji, users in reaction_groups.items()
-        ]
+        return reaction_groups(obj.reaction_summary, self.context.get('request'))
     
     def get_is_online(self, obj):
         from datetime import timedelta
@@ -82,9 +100,14 @@ class CommunitySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'slug', 'created_at', 'member_count', 'is_admin']
 
     def get_member_count(self, obj):
+        # Annotated by CommunityListCreateView
+        if hasattr(obj, 'member_count'):
+            return obj.member_count
         return obj.memberships.count()
 
     def get_is_admin(self, obj):
+        if hasattr(obj, 'is_admin'):
+            return obj.is_admin
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
@@ -111,8 +134,8 @@ class CommunityMemberSerializer(serializers.ModelSerializer):
         return obj.user.username
 
     def get_avatar(self, obj):
-        if hasattr(obj.user, 'profile') and obj.user.profile.avatar:
-            return obj.user.profile.avatar.url
+        if hasattr(obj.user, 'profile'):
+            return media_url(obj.user.profile.avatar)
         return None
 
 
@@ -130,11 +153,12 @@ class DirectMessageSerializer(serializers.ModelSerializer):
     avatar = serializers.SerializerMethodField()
     is_me = serializers.SerializerMethodField()
     reactions = serializers.SerializerMethodField()
+    is_read = serializers.SerializerMethodField()
 
     class Meta:
         model = DirectMessage
-        fields = ['id', 'text', 'username', 'avatar', 'created_at', 'is_me', 'reactions']
-        read_only_fields = ['id', 'username', 'avatar', 'created_at', 'is_me', 'reactions']
+        fields = ['id', 'text', 'username', 'avatar', 'created_at', 'is_me', 'reactions', 'is_read']
+        read_only_fields = ['id', 'username', 'avatar', 'created_at', 'is_me', 'reactions', 'is_read']
     
     def to_representation(self, instance):
         """Override to decrypt text when reading."""
@@ -143,8 +167,8 @@ class DirectMessageSerializer(serializers.ModelSerializer):
         return data
 
     def get_avatar(self, obj):
-        if hasattr(obj.sender, 'profile') and obj.sender.profile.avatar:
-            return obj.sender.profile.avatar.url
+        if hasattr(obj.sender, 'profile'):
+            return media_url(obj.sender.profile.avatar)
         return None
 
     def get_is_me(self, obj):
@@ -155,24 +179,109 @@ class DirectMessageSerializer(serializers.ModelSerializer):
     
     def get_reactions(self, obj):
         """Group reactions by emoji with list of users"""
-        from collections import defaultdict
-        reaction_groups = defaultdict(list)
-        
-        for reaction in obj.reactions.all():
-            reaction_groups[reaction.emoji].append({
-                'username': reaction.user.username,
-                'is_me': reaction.user == self.context.get('request').user if self.context.get('request') else False
-            })
-        
-        # Convert to list format
-        return [
-            {
-                'emoji': emoji,
-                'count': len(users),
-                'users': users
-            }
-            for emoji, users in reaction_groups.items()
-        ]
+        return reaction_groups(obj.reaction_summary, self.context.get('request'))
+
+    def get_is_read(self, obj):
+        """Read receipt: has the other participant's read cursor passed this message?"""
+        request = self.context.get('request')
+        if request and obj.sender_id != request.user.pk:
+            return True  # Listing a thread marks everything you received as read
+        return obj.pk <= self.context.get('read_upto', 0)
+
+
+# -------------------------------------------------------------
+# LEAN SERIALIZERS (chat / DM hot paths)
+# -------------------------------------------------------------
+class LeanMessageSerializer(serializers.BaseSerializer):
+    """
+    Read-only fast path for a page of messages. Pass the message queryset
+    (or a list of rows from values(), e.g. from api.recent) as the instance;
+    `.data` is a list with exactly the JSON of the ModelSerializer it
+    mirrors, built from those rows (reactions come from each row's
+    reaction_summary) instead of per-field method calls.
+    """
+    author = None           # FK to the message author ('user' / 'sender')
+    fields = ()             # output keys, in the mirrored serializer's order
+    extra_values = ()       # additional .values() columns needed by subclasses
+
+    _datetime = serializers.DateTimeField()
+    _avatar_storage = Profile._meta.get_field('avatar').storage
+
+    @classmethod
+    def values(cls, queryset):
+        """The rows the output is built from. Nothing in them depends on who asks."""
+        author = cls.author
+        return list(
+            queryset.prefetch_related(None).values(
+                'id', 'text', 'created_at', f'{author}_id', f'{author}__username',
+                f'{author}__profile__avatar', f'{author}__profile__last_activity', 'reaction_summary',
+                *cls.extra_values,
+            )
+        )
+
+    def to_representation(self, queryset):
+        author = self.author
+        rows = queryset if isinstance(queryset, list) else self.values(queryset)
+        request = self.context.get('request')
+        self.me = request.user.pk if request and request.user.is_authenticated else None
+        self.now = timezone.now()
+        self.avatars = media_urls((row[f'{author}__profile__avatar'] for row in rows), self._avatar_storage)
+        return [self.build(row, reaction_groups(row['reaction_summary'], request)) for row in rows]
+
+    def common(self, row, reactions):
+        author = self.author
+        avatar = row[f'{author}__profile__avatar']
+        last_activity = row[f'{author}__profile__last_activity']
+        return {
+            'id': row['id'],
+            'text': row['text'],
+            'username': row[f'{author}__username'],
+            'avatar': self.avatars.get(avatar),
+            'created_at': self._datetime.to_representation(row['created_at']),
+            'is_me': self.me is not None and row[f'{author}_id'] == self.me,
+            'reactions': reactions,
+            'is_online': bool(last_activity) and self.now - last_activity < timedelta(minutes=5),
+        }
+
+    def build(self, row, reactions):
+        data = self.common(row, reactions)
+        return {key: data[key] for key in self.fields if key in data}
+
+
+class LeanChatMessageSerializer(LeanMessageSerializer):
+    """Same JSON as ChatMessageSerializer."""
+    author = 'user'
+    fields = ChatMessageSerializer.Meta.fields
+    extra_values = ('community_id',)
+
+    def common(self, row, reactions):
+        data = super().common(row, reactions)
+        # DRF skips a dotted source ('community.id') through a null FK, so global
+        # messages have no community_id key at all
+        if row['community_id'] is not None:
+            data['community_id'] = row['community_id']
+        return data
+
+
+class LeanDirectMessageSerializer(LeanMessageSerializer):
+    """Same JSON as DirectMessageSerializer (text decrypted, read receipts from context)."""
+    author = 'sender'
+    fields = DirectMessageSerializer.Meta.fields
+
+    def to_representation(self, queryset):
+        data = super().to_representation(queryset)
+        for item, text in zip(data, MessageEncryption.decrypt_many(item['text'] for item in data)):
+            item['text'] = text
+        return data
+
+    def common(self, row, reactions):
+        data = super().common(row, reactions)
+        read_upto = self.context.get('read_upto', 0)
+        if self.context.get('request') and row['sender_id'] != self.me:
+            data['is_read'] = True
+        else:
+            data['is_read'] = row['id'] <= read_upto
+        return data
 
 
 class DirectThreadSerializer(serializers.ModelSerializer):
@@ -201,8 +310,7 @@ class DirectThreadSerializer(serializers.ModelSerializer):
         if hasattr(other, 'profile') and other.profile:
             if hasattr(other.profile, 'display_name'):
                 display_name = other.profile.display_name
-            if other.profile.avatar:
-                avatar_url = other.profile.avatar.url
+            avatar_url = media_url(other.profile.avatar)
             # Check online status (active within 5 minutes)
             if hasattr(other.profile, 'last_activity') and other.profile.last_activity:
                 from datetime import timedelta
@@ -218,7 +326,11 @@ class DirectThreadSerializer(serializers.ModelSerializer):
         }
 
     def get_last_message(self, obj):
-        last = obj.messages.order_by('-created_at').first()
+        # Prefetched (one row per thread) by DirectThreadListCreateView
+        if hasattr(obj, 'latest_messages'):
+            last = obj.latest_messages[0] if obj.latest_messages else None
+        else:
+            last = obj.messages.select_related('sender').order_by('-created_at').first()
         if not last:
             return None
         return {
@@ -229,21 +341,20 @@ class DirectThreadSerializer(serializers.ModelSerializer):
     
     def get_unread_count(self, obj):
         """Count unread messages in this conversation for the current user."""
+        # Annotated by DirectThreadListCreateView in the same query as the thread list
+        if hasattr(obj, 'unread_count'):
+            return obj.unread_count
+
         request = self.context.get('request')
         if not request or not request.user:
             return 0
-        
-        # Count messages sent by other user that haven't been read
-        return obj.messages.filter(
-            is_read=False
-        ).exclude(
-            sender=request.user
-        ).count()
+        return obj.unread_count_for(request.user)
 
 
 class ProfileSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     email = serializers.EmailField(source='user.email', read_only=True)
+    avatar = MediaURLField(allow_null=True, max_length=100, required=False)
 
     class Meta:
         model = Profile
@@ -277,7 +388,7 @@ class CommentSerializer(serializers.ModelSerializer):
 
     username = serializers.CharField(source='user.username', read_only=True)
     avatar = serializers.SerializerMethodField()
-    parent_id = serializers.IntegerField(source='parent.id', read_only=True)
+    parent_id = serializers.IntegerField(read_only=True)
     replies = serializers.SerializerMethodField()
 
     class Meta:
@@ -286,16 +397,22 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'username', 'avatar', 'created_at', 'parent_id', 'replies']
 
     def get_avatar(self, obj):
-        if obj.user.profile.avatar:
-            return obj.user.profile.avatar.url
-        return None
+        return media_url(obj.user.profile.avatar)
 
     def get_replies(self, obj):
-        if obj.replies.exists():
-            return CommentSerializer(obj.replies.all(), many=True).data
-        return []
+        # PhotoCommentListView loads the whole thread in one query and passes
+        # it as {parent_id: [comments]} so nesting costs no extra queries.
+        children = self.context.get('comment_children')
+        if children is not None:
+            replies = children.get(obj.pk, [])
+        elif obj.replies.exists():
+            replies = obj.replies.all()
+        else:
+            replies = []
+        return CommentSerializer(replies, many=True, context=self.context).data
 
 class UserPhotoSerializer(serializers.ModelSerializer):
+    image = MediaURLField(max_length=100)
     is_liked = serializers.SerializerMethodField()
     like_count = serializers.SerializerMethodField()
 
@@ -305,12 +422,17 @@ class UserPhotoSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'is_liked', 'like_count']
 
     def get_is_liked(self, obj):
+        # Annotated by UserPhotoListCreateView
+        if hasattr(obj, 'is_liked'):
+            return obj.is_liked
         user = self.context.get('request').user
         if user.is_authenticated:
             return PhotoLike.objects.filter(user=user, photo=obj).exists()
         return False
 
     def get_like_count(self, obj):
+        if hasattr(obj, 'like_count'):
+            return obj.like_count
         return obj.likes.count()
 
 class UserSearchSerializer(serializers.ModelSerializer):
@@ -325,8 +447,8 @@ class UserSearchSerializer(serializers.ModelSerializer):
         read_only_fields = ['username', 'display_name', 'avatar', 'profile_url']
 
     def get_avatar(self, obj):
-        if hasattr(obj, 'profile') and obj.profile.avatar:
-            return obj.profile.avatar.url
+        if hasattr(obj, 'profile'):
+            return media_url(obj.profile.avatar)
         return None
 
     def get_profile_url(self, obj):
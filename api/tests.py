@@ -1,3 +1,1599 @@
-from django.test import TestCase
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+from uuid import UUID
 
-# Create your tests here.
+from cryptography.fernet import Fernet
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from core import assets, db_router, media, metrics, pubsub
+from core.cache import LayeredCache, is_shared, layered_cache
+from homepage.models import (
+    ChatMessage,
+    Community,
+    CommunityMembership,
+    CommunityMessageReaction,
+    Conversation,
+    ConversationReadCursor,
+    DirectMessage,
+    Education,
+    Experience,
+    MediaObject,
+    MessageReaction,
+    PhotoComment,
+    PhotoLike,
+    Profile,
+    Skill,
+    UserPhoto,
+)
+from homepage.unread import UnreadCounters
+from . import renderers, uploads, urls as api_urls
+
+try:
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+
+PASSWORD = 'Budget#2024'
+
+
+# -------------------------------------------------------------
+# UNREAD COUNTERS
+# -------------------------------------------------------------
+@override_settings(MESSAGE_ENCRYPTION_KEY=Fernet.generate_key().decode())
+class UnreadCounterTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create_user(username='unread_me', password='pass')
+        self.other = User.objects.create_user(username='unread_other', password='pass')
+        self.thread = Conversation.objects.create()
+        self.thread.participants.add(self.me, self.other)
+
+    def test_default_cache_is_per_process_here(self):
+        # django.core.cache.cache is a proxy; the check must look at the backend behind it
+        self.assertFalse(is_shared(cache))
+        self.assertFalse(is_shared(LocMemCache('other', {})))
+
+    def test_per_process_cache_counts_from_database(self):
+        # Two workers, each with its own LocMemCache
+        worker_a, worker_b = LocMemCache('worker-a', {}), LocMemCache('worker-b', {})
+        with mock.patch('homepage.unread.cache', worker_b):
+            self.assertEqual(UnreadCounters.get_total(self.me), 0)
+        with mock.patch('homepage.unread.cache', worker_a):
+            message = DirectMessage.objects.create(conversation=self.thread, sender=self.other, text='hi')
+        with mock.patch('homepage.unread.cache', worker_b):
+            self.assertEqual(UnreadCounters.get_total(self.me), 1)
+        with mock.patch('homepage.unread.cache', worker_a):
+            ConversationReadCursor.mark_read(self.me, self.thread, message.pk)
+        with mock.patch('homepage.unread.cache', worker_b):
+            self.assertEqual(UnreadCounters.get_total(self.me), 0)
+
+    def test_read_cursor_only_moves_forward(self):
+        first, second = (DirectMessage.objects.create(conversation=self.thread, sender=self.other, text=text)
+                         for text in ('one', 'two'))
+        ConversationReadCursor.mark_read(self.me, self.thread, second.pk)
+        # An older poll (or a lagging replica) finishing last
+        ConversationReadCursor.mark_read(self.me, self.thread, first.pk)
+        cursor = ConversationReadCursor.objects.get(user=self.me, conversation=self.thread)
+        self.assertEqual(cursor.last_read_message_id, second.pk)
+        self.assertEqual(UnreadCounters.get_total(self.me), 0)
+
+    def test_shared_cache_keeps_counters(self):
+        with mock.patch('homepage.unread.is_shared', return_value=True):
+            self.assertEqual(UnreadCounters.get_total(self.me), 0)
+            message = DirectMessage.objects.create(conversation=self.thread, sender=self.other, text='hi')
+            with self.assertNumQueries(0):
+                self.assertEqual(UnreadCounters.get_total(self.me), 1)
+            ConversationReadCursor.mark_read(self.me, self.thread, message.pk)
+            with self.assertNumQueries(0):
+                self.assertEqual(UnreadCounters.get_total(self.me), 0)
+
+            # A message that arrives after the page being marked read stays unread
+            seen = DirectMessage.objects.create(conversation=self.thread, sender=self.other, text='seen')
+            DirectMessage.objects.create(conversation=self.thread, sender=self.other, text='late')
+            ConversationReadCursor.mark_read(self.me, self.thread, seen.pk)
+            with self.assertNumQueries(0):
+                self.assertEqual(UnreadCounters.get_total(self.me), 1)
+
+    def test_counts_are_aggregated_in_the_database(self):
+        for text in ('a', 'b', 'c'):
+            DirectMessage.objects.create(conversation=self.thread, sender=self.other, text=text)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(UnreadCounters.count(self.me), {self.thread.pk: 3})
+        self.assertIn('COUNT(', ctx.captured_queries[-1]['sql'])
+        with self.assertNumQueries(1):
+            self.assertEqual(UnreadCounters.get_total(self.me), 3)
+
+
+# -------------------------------------------------------------
+# PUB/SUB
+# -------------------------------------------------------------
+class PubSubTests(APITestCase):
+    def setUp(self):
+        self.broker = pubsub.InMemoryBroker(max_queue=10)
+        patcher = mock.patch.object(pubsub, '_broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_publish_waits_for_commit(self):
+        subscription = self.broker.subscribe(['chat.*'])
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    pubsub.publish(pubsub.chat_topic(), {'id': 1})
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+            pubsub.publish(pubsub.chat_topic(), {'id': 2})
+            self.assertIsNone(subscription.get(timeout=0))
+        self.assertEqual(subscription.get(timeout=0), {'topic': 'chat.global', 'payload': {'id': 2}})
+        self.assertIsNone(subscription.get(timeout=0))
+
+    def test_topic_patterns(self):
+        subscription = self.broker.subscribe([pubsub.dm_topic('*'), pubsub.chat_topic(7)])
+        for topic in (pubsub.dm_topic(4), 'dm.other', pubsub.chat_topic(), pubsub.chat_topic(7)):
+            self.broker.publish(topic, {})
+        self.assertEqual([event['topic'] for event in (subscription.get(0), subscription.get(0))],
+                         ['dm.conversation.4', 'chat.community.7'])
+        self.assertIsNone(subscription.get(timeout=0))
+
+    def test_full_queue_drops_oldest(self):
+        subscription = self.broker.subscribe(['t'], max_queue=2)
+        for n in range(3):
+            self.broker.publish('t', n)
+        self.assertEqual(subscription.dropped, 1)
+        self.assertEqual([subscription.get(0)['payload'], subscription.get(0)['payload']], [1, 2])
+
+    def test_timeout_and_close(self):
+        subscription = self.broker.subscribe(['t'])
+        self.assertIsNone(subscription.get(timeout=0.05))
+        self.assertFalse(subscription.closed)
+
+        self.broker.publish('t', 'queued')
+        threading.Timer(0.05, subscription.close).start()
+        self.assertEqual(list(subscription), [{'topic': 't', 'payload': 'queued'}])
+        self.assertTrue(subscription.closed)
+        self.assertIsNone(subscription.get())   # Returns at once, no timeout needed
+
+        # Closing unsubscribes
+        self.broker.publish('t', 'late')
+        self.assertIsNone(subscription.get(timeout=0))
+        self.assertEqual(self.broker._subscriptions, [])
+
+    def test_backends_must_implement_send(self):
+        class Incomplete(pubsub.BaseBroker):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+
+# -------------------------------------------------------------
+# QUERY BUDGETS
+# -------------------------------------------------------------
+# Maximum SQL queries per (url name, method) on the fixtures below. The
+# fixtures have 50-message threads, nested comments and big communities,
+# so any per-row query blows the budget. Raise a budget only with a reason.
+# Authenticated requests include the 2 queries of ActiveUserMiddleware.
+BUDGETS = {
+    ('api-register', 'POST'): 5,
+    ('resolve-username', 'GET'): 1,
+    ('api-me', 'GET'): 2,
+    ('api-profile', 'GET'): 2,
+    ('api-profile', 'PATCH'): 3,
+    ('api-photos-list', 'GET'): 3,
+    ('api-photos-list', 'POST'): 2,
+    ('api-user-photos', 'GET'): 4,
+    # Likes are loaded for their cache-invalidation signal instead of fast-deleted,
+    # and the image's reference count is decremented
+    ('api-photos-detail', 'DELETE'): 10,
+    ('api-uploads', 'POST'): 2,
+    # The first use of an image inserts its MediaObject (in a savepoint)
+    ('api-uploads-confirm', 'POST'): 10,
+    ('api-uploads-chunked', 'POST'): 2,
+    # A finished upload is answered with its photo (like count and status)
+    ('api-uploads-chunked-detail', 'GET'): 5,
+    ('api-uploads-chunked-detail', 'PUT'): 9,
+    ('api-uploads-chunked-detail', 'DELETE'): 2,
+    ('api-education-list', 'GET'): 3,
+    ('api-education-list', 'POST'): 3,
+    ('api-education-detail', 'GET'): 3,
+    ('api-education-detail', 'DELETE'): 4,
+    ('api-experience-list', 'GET'): 3,
+    ('api-experience-list', 'POST'): 3,
+    ('api-experience-detail', 'GET'): 3,
+    ('api-experience-detail', 'DELETE'): 4,
+    ('api-skills-list', 'GET'): 3,
+    ('api-skills-list', 'POST'): 3,
+    ('api-skills-detail', 'DELETE'): 4,
+    ('token_obtain_pair', 'POST'): 2,
+    ('token_refresh', 'POST'): 1,
+    ('api-photo-like', 'GET'): 5,
+    ('api-photo-like', 'POST'): 6,
+    ('api-photo-like', 'PUT'): 6,
+    ('api-photo-like', 'DELETE'): 6,
+    ('api-photo-likes', 'GET'): 3,
+    ('api-photo-comments', 'GET'): 3,
+    ('api-photo-comments', 'POST'): 5,
+    ('api-comment-delete', 'DELETE'): 11,
+    ('google-auth', 'POST'): 2,
+    # Reactions are read from each message's reaction_summary, not joined
+    ('api-chat-list', 'GET'): 3,
+    ('api-chat-list', 'POST'): 4,
+    ('api-chat-detail', 'DELETE'): 5,
+    # The message row is locked to update its reaction_summary (in a savepoint)
+    ('api-chat-react', 'POST'): 8,
+    ('api-chat-react', 'DELETE'): 8,
+    ('api-community-list', 'GET'): 3,
+    ('api-community-list', 'POST'): 7,
+    ('api-community-members', 'GET'): 5,
+    ('api-community-members', 'POST'): 5,
+    ('api-community-chat-list', 'GET'): 5,
+    ('api-community-chat-list', 'POST'): 6,
+    ('api-community-chat-detail', 'DELETE'): 7,
+    ('api-community-chat-react', 'POST'): 10,
+    ('api-community-chat-react', 'DELETE'): 10,
+    ('api-dm-threads', 'GET'): 6,
+    ('api-dm-threads', 'POST'): 9,
+    ('api-dm-unread', 'GET'): 4,
+    ('api-dm-thread-messages', 'GET'): 8,
+    ('api-dm-thread-messages', 'POST'): 8,
+    # Reactions are loaded for their reaction-summary signal instead of fast-deleted
+    ('api-dm-message-delete', 'DELETE'): 8,
+    ('api-dm-message-react', 'POST'): 10,
+    ('api-dm-message-react', 'DELETE'): 10,
+    ('api-user-search', 'GET'): 3,
+    ('api-call-token', 'GET'): 4,
+    ('api-async-chat-list', 'GET'): 2,
+    ('api-async-community-chat-list', 'GET'): 3,
+    ('api-async-dm-threads', 'GET'): 5,
+    ('api-async-dm-thread-messages', 'GET'): 7,
+    ('api-async-presence', 'GET'): 2,
+    ('api-async-photo-like', 'GET'): 2,
+}
+
+
+@override_settings(
+    MESSAGE_ENCRYPTION_KEY=Fernet.generate_key().decode(),
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class QueryBudgetTests(APITestCase):
+    """Every API route stays within its query budget on realistic fixtures."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.me = User.objects.create_user('budget_me', 'me@example.com', PASSWORD)
+        cls.other = User.objects.create_user('budget_other', 'other@example.com', PASSWORD)
+        cls.crowd = [
+            User.objects.create_user(f'budget_member{i}', f'member{i}@example.com', PASSWORD)
+            for i in range(30)
+        ]
+        for user in [cls.me, cls.other] + cls.crowd:
+            Profile.objects.create(user=user, avatar=f'avatars/{user.username}.png')
+
+        # Community with many members and a busy chat (plus the global chat)
+        cls.community = Community.objects.create(name='Budget club', created_by=cls.me)
+        CommunityMembership.objects.create(
+            community=cls.community, user=cls.me, role=CommunityMembership.ROLE_ADMIN,
+        )
+        CommunityMembership.objects.bulk_create(
+            CommunityMembership(community=cls.community, user=u) for u in [cls.other] + cls.crowd
+        )
+        for community in (cls.community, None):
+            for i in range(50):
+                message = ChatMessage.objects.create(
+                    user=cls.crowd[i % 30], community=community, text=f'chat {i}',
+                )
+                for reactor in cls.crowd[:3]:
+                    CommunityMessageReaction.objects.create(message=message, user=reactor, emoji='👍')
+        cls.community_message = ChatMessage.objects.filter(community=cls.community).first()
+        cls.global_message = ChatMessage.objects.filter(community__isnull=True).first()
+
+        # A 50-message thread with reactions, plus more threads for the inbox
+        cls.thread = Conversation.objects.create()
+        cls.thread.participants.add(cls.me, cls.other)
+        for i in range(50):
+            message = DirectMessage.objects.create(
+                conversation=cls.thread, sender=cls.other if i % 2 else cls.me, text=f'dm {i}',
+            )
+            MessageReaction.objects.create(message=message, user=cls.other, emoji='❤️')
+        cls.dm_message = DirectMessage.objects.filter(sender=cls.me).first()
+        for user in cls.crowd[:10]:
+            thread = Conversation.objects.create()
+            thread.participants.add(cls.me, user)
+            DirectMessage.objects.create(conversation=thread, sender=user, text='hello')
+
+        # Photos with likes and nested comments
+        cls.photos = [UserPhoto.objects.create(user=cls.me, image=f'gallery/{i}.jpg') for i in range(10)]
+        for photo in cls.photos:
+            for user in cls.crowd[:5]:
+                PhotoLike.objects.create(user=user, photo=photo)
+            for i in range(5):
+                top = PhotoComment.objects.create(user=cls.crowd[i], photo=photo, text='top')
+                reply = PhotoComment.objects.create(user=cls.other, photo=photo, text='reply', parent=top)
+                PhotoComment.objects.create(user=cls.me, photo=photo, text='reply 2', parent=reply)
+        cls.photo = cls.photos[0]
+
+        cls.education = Education.objects.create(user=cls.me, organization='Uni', start_year=2015)
+        cls.experience = Experience.objects.create(
+            user=cls.me, title='Dev', employment_type='FULL_TIME', company='Co', start_date='2020-01-01',
+        )
+        cls.skill = Skill.objects.create(user=cls.me, name='Django')
+
+    def setUp(self):
+        layered_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.me)
+
+    def assertWithinBudget(self, name, method, kwargs=None, data=None, query='', client=None, status=None):
+        budget = BUDGETS[(name, method)]
+        url = reverse(name, kwargs=kwargs) + query
+        client = client or self.client
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(client, method.lower())(url, data, format='json')
+        if status is not None:
+            self.assertEqual(response.status_code, status, response.content[:300])
+        executed = '\n'.join(q['sql'] for q in ctx.captured_queries)
+        self.assertLessEqual(
+            len(ctx), budget,
+            f"{method} {name} ran {len(ctx)} queries (budget {budget}):\n{executed}",
+        )
+        return response
+
+    def test_every_route_has_a_budget(self):
+        names = {p.name for p in api_urls.urlpatterns}
+        budgeted = {name for name, _ in BUDGETS}
+        self.assertEqual(names - budgeted, set(), 'Add a query budget for new routes')
+
+    def test_account_endpoints(self):
+        anonymous = APIClient()
+        self.assertWithinBudget('api-register', 'POST', client=anonymous, status=201, data={
+            'username': 'newbie', 'email': 'newbie@example.com', 'password': PASSWORD, 'password2': PASSWORD,
+        })
+        self.assertWithinBudget('resolve-username', 'GET', client=anonymous, query='?email=me@example.com', status=200)
+        self.assertWithinBudget('api-me', 'GET', status=200)
+        self.assertWithinBudget('api-profile', 'GET', status=200)
+        self.assertWithinBudget('api-profile', 'PATCH', data={'title': 'New title'}, status=200)
+        tokens = self.assertWithinBudget('token_obtain_pair', 'POST', client=anonymous, status=200, data={
+            'username': 'budget_me', 'password': PASSWORD,
+        }).json()
+        self.assertWithinBudget('token_refresh', 'POST', client=anonymous, data={'refresh': tokens['refresh']}, status=200)
+
+        with mock.patch('google.oauth2.id_token.verify_oauth2_token',
+                        return_value={'email': 'me@example.com', 'name': 'Me'}):
+            self.assertWithinBudget('google-auth', 'POST', client=anonymous, data={'token': 'x'}, status=200)
+
+    def test_resume_endpoints(self):
+        self.assertWithinBudget('api-education-list', 'GET', status=200)
+        self.assertWithinBudget('api-education-list', 'POST', status=201,
+                                data={'organization': 'School', 'start_year': 2010})
+        self.assertWithinBudget('api-education-detail', 'GET', {'pk': self.education.pk}, status=200)
+        self.assertWithinBudget('api-education-detail', 'DELETE', {'pk': self.education.pk}, status=204)
+        self.assertWithinBudget('api-experience-list', 'GET', status=200)
+        self.assertWithinBudget('api-experience-list', 'POST', status=201, data={
+            'title': 'Intern', 'employment_type': 'INTERNSHIP', 'company': 'Co', 'start_date': '2019-01-01',
+        })
+        self.assertWithinBudget('api-experience-detail', 'GET', {'pk': self.experience.pk}, status=200)
+        self.assertWithinBudget('api-experience-detail', 'DELETE', {'pk': self.experience.pk}, status=204)
+        self.assertWithinBudget('api-skills-list', 'GET', status=200)
+        self.assertWithinBudget('api-skills-list', 'POST', data={'name': 'Python'}, status=201)
+        self.assertWithinBudget('api-skills-detail', 'DELETE', {'pk': self.skill.pk}, status=204)
+
+    def test_gallery_endpoints(self):
+        self.assertWithinBudget('api-photos-list', 'GET', status=200)
+        self.assertWithinBudget('api-photos-list', 'POST', status=400)  # Rejected before touching the DB
+        page = self.assertWithinBudget('api-user-photos', 'GET', {'username': 'budget_me'}, query='?limit=4',
+                                       status=200).json()
+        self.assertWithinBudget('api-user-photos', 'GET', {'username': 'budget_me'},
+                                query=page['next'].split('/photos/')[1], status=200)
+        self.assertWithinBudget('api-photo-like', 'GET', {'photo_id': self.photo.pk}, status=200)
+        self.assertWithinBudget('api-photo-like', 'POST', {'photo_id': self.photo.pk}, status=200)
+        self.assertWithinBudget('api-photo-like', 'PUT', {'photo_id': self.photo.pk}, status=200)
+        self.assertWithinBudget('api-photo-like', 'DELETE', {'photo_id': self.photo.pk}, status=200)
+        ids = ','.join(str(photo.pk) for photo in self.photos)
+        self.assertWithinBudget('api-photo-likes', 'GET', query=f'?ids={ids}', status=200)
+        self.assertWithinBudget('api-photo-comments', 'GET', {'photo_id': self.photo.pk}, status=200)
+        self.assertWithinBudget('api-photo-comments', 'POST', {'photo_id': self.photo.pk},
+                                data={'text': 'hi'}, status=201)
+        comment = PhotoComment.objects.filter(photo=self.photo, parent=None).first()
+        self.assertWithinBudget('api-comment-delete', 'DELETE', {'pk': comment.pk}, status=204)
+        self.assertWithinBudget('api-photos-detail', 'DELETE', {'pk': self.photos[1].pk}, status=204)
+        self.assertWithinBudget('api-async-photo-like', 'GET', {'photo_id': self.photo.pk}, status=200)
+
+    def test_chat_endpoints(self):
+        community = {'community_id': self.community.pk}
+        self.assertWithinBudget('api-chat-list', 'GET', status=200)
+        self.assertWithinBudget('api-chat-list', 'POST', data={'text': 'hi'}, status=201)
+        self.assertWithinBudget('api-chat-react', 'POST', {'message_id': self.global_message.pk},
+                                data={'emoji': '🔥'}, status=201)
+        self.assertWithinBudget('api-chat-react', 'DELETE', {'message_id': self.global_message.pk},
+                                data={'emoji': '🔥'}, status=200)
+        mine = ChatMessage.objects.filter(user=self.me, community__isnull=True).first()
+        self.assertWithinBudget('api-chat-detail', 'DELETE', {'pk': mine.pk}, status=204)
+
+        self.assertWithinBudget('api-community-list', 'GET', status=200)
+        self.assertWithinBudget('api-community-list', 'POST', data={'name': 'New club'}, status=201)
+        self.assertWithinBudget('api-community-members', 'GET', community, status=200)
+        self.assertWithinBudget('api-community-members', 'POST', community,
+                                data={'username': 'newcomer'}, status=404)
+        self.assertWithinBudget('api-community-chat-list', 'GET', community, status=200)
+        self.assertWithinBudget('api-community-chat-list', 'POST', community, data={'text': 'hi'}, status=201)
+        message = {**community, 'message_id': self.community_message.pk}
+        self.assertWithinBudget('api-community-chat-react', 'POST', message, data={'emoji': '🔥'}, status=201)
+        self.assertWithinBudget('api-community-chat-react', 'DELETE', message, data={'emoji': '🔥'}, status=200)
+        mine = ChatMessage.objects.filter(user=self.me, community=self.community).first()
+        self.assertWithinBudget('api-community-chat-detail', 'DELETE', {**community, 'pk': mine.pk}, status=204)
+
+        self.assertWithinBudget('api-user-search', 'GET', query='?q=budget', status=200)
+
+    def test_direct_message_endpoints(self):
+        thread = {'thread_id': self.thread.pk}
+        self.assertWithinBudget('api-dm-threads', 'GET', status=200)
+        self.assertWithinBudget('api-dm-threads', 'POST', data={'username': 'budget_other'}, status=201)
+        self.assertWithinBudget('api-dm-unread', 'GET', status=200)
+        self.assertWithinBudget('api-dm-thread-messages', 'GET', thread, status=200)
+        self.assertWithinBudget('api-dm-thread-messages', 'POST', thread, data={'text': 'hi'}, status=201)
+        self.assertWithinBudget('api-dm-message-react', 'POST', {'message_id': self.dm_message.pk},
+                                data={'emoji': '🔥'}, status=201)
+        self.assertWithinBudget('api-dm-message-react', 'DELETE', {'message_id': self.dm_message.pk},
+                                data={'emoji': '🔥'}, status=200)
+        self.assertWithinBudget('api-dm-message-delete', 'DELETE', {'pk': self.dm_message.pk}, status=204)
+
+        with mock.patch.dict('os.environ', {'AGORA_APP_ID': 'a' * 32, 'AGORA_APP_CERTIFICATE': 'b' * 32}):
+            self.assertWithinBudget('api-call-token', 'GET', thread, status=200)
+
+    def test_async_endpoints(self):
+        token = str(RefreshToken.for_user(self.me).access_token)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertWithinBudget('api-async-chat-list', 'GET', client=client, status=200)
+        self.assertWithinBudget('api-async-community-chat-list', 'GET', {'community_id': self.community.pk},
+                                client=client, status=200)
+        self.assertWithinBudget('api-async-dm-threads', 'GET', client=client, status=200)
+        self.assertWithinBudget('api-async-dm-thread-messages', 'GET', {'thread_id': self.thread.pk},
+                                client=client, status=200)
+        self.assertWithinBudget('api-async-presence', 'GET', client=client,
+                                query='?usernames=budget_other,budget_member1', status=200)
+
+
+# -------------------------------------------------------------
+# TIMING / METRICS
+# -------------------------------------------------------------
+@override_settings(MESSAGE_ENCRYPTION_KEY=Fernet.generate_key().decode(), METRICS_TOKEN='scrape-me')
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        for histogram in metrics.REGISTRY:
+            histogram.clear()
+        self.me = User.objects.create_user('metrics_me', 'metrics@example.com', PASSWORD)
+        Profile.objects.create(user=self.me)
+        ChatMessage.objects.create(user=self.me, text='hi')
+        self.client.force_authenticate(self.me)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('api-chat-list'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(timing, r'serialize;dur=[\d.]+')
+
+    def test_metrics_are_labelled_by_route_name(self):
+        self.client.get(reverse('api-chat-list'))
+        body = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-me').content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{route="api-chat-list",method="GET",status="200"} 1', body,
+        )
+        self.assertIn('http_request_db_queries_bucket{route="api-chat-list",method="GET",le="+Inf"} 1', body)
+        self.assertNotIn('route="metrics"', body)
+
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_metrics_closed_without_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+# -------------------------------------------------------------
+# PROFILING
+# -------------------------------------------------------------
+class RequestProfilingTests(APITestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.staff = User.objects.create_user('profile_staff', 'staff@example.com', PASSWORD, is_staff=True)
+        self.user = User.objects.create_user('profile_user', 'user@example.com', PASSWORD)
+        ChatMessage.objects.create(user=self.user, text='hi')
+        cache.clear()   # so the chat is read from the database, not its ring buffer
+
+    def get_chat(self, user, **headers):
+        token = str(RefreshToken.for_user(user).access_token)
+        return self.client.get(reverse('api-chat-list'), HTTP_AUTHORIZATION=f'Bearer {token}', **headers)
+
+    def test_staff_header_writes_profile_and_sql(self):
+        with self.settings(PROFILE_DIR=self.dir, PROFILE_SAMPLE_RATE=0):
+            response = self.get_chat(self.staff, HTTP_X_PROFILE='1')
+        stem = response['X-Profile-Id']
+        self.assertTrue((self.dir / f'{stem}.prof').exists())
+        meta = json.loads((self.dir / f'{stem}.json').read_text())
+        self.assertEqual(meta['route'], 'api-chat-list')
+        self.assertTrue(any('homepage_chatmessage' in q['sql'] for q in meta['queries']))
+
+        out = StringIO()
+        with self.settings(PROFILE_DIR=self.dir):
+            call_command('profile_summary', stdout=out)
+        self.assertIn('api-chat-list', out.getvalue())
+        self.assertIn('homepage_chatmessage', out.getvalue())
+
+    def test_header_ignored_for_non_staff(self):
+        with self.settings(PROFILE_DIR=self.dir, PROFILE_SAMPLE_RATE=0):
+            response = self.get_chat(self.user, HTTP_X_PROFILE='1')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(list(self.dir.iterdir()), [])
+
+    def test_sampling_rotates_old_profiles(self):
+        with self.settings(PROFILE_DIR=self.dir, PROFILE_SAMPLE_RATE=1, PROFILE_KEEP=2):
+            for _ in range(4):
+                self.get_chat(self.user)
+        self.assertEqual(len(list(self.dir.glob('*.prof'))), 2)
+        self.assertEqual(len(list(self.dir.glob('*.json'))), 2)
+
+
+# -------------------------------------------------------------
+# LEAN SERIALIZERS
+# -------------------------------------------------------------
+@override_settings(MESSAGE_ENCRYPTION_KEY=Fernet.generate_key().decode())
+class LeanSerializerTests(APITestCase):
+    """The lean chat/DM serializers render exactly what the DRF ones do."""
+
+    def setUp(self):
+        cache.clear()   # chat ring buffers (api.recent)
+        self.me = User.objects.create_user('lean_me', 'lean_me@example.com', PASSWORD)
+        self.other = User.objects.create_user('lean_other', 'lean_other@example.com', PASSWORD)
+        self.ghost = User.objects.create_user('lean_ghost', 'lean_ghost@example.com', PASSWORD)  # no profile
+        Profile.objects.create(user=self.me, avatar='avatars/me.png')
+        Profile.objects.create(user=self.other)
+        self.community = Community.objects.create(name='Lean', created_by=self.me)
+
+        for i, user in enumerate([self.me, self.other, self.ghost] * 3):
+            message = ChatMessage.objects.create(
+                user=user, text=f'chat {i}', community=self.community if i % 2 else None,
+            )
+            for reactor, emoji in [(self.other, '👍'), (self.me, '👍'), (self.ghost, '🔥')][:i % 4]:
+                CommunityMessageReaction.objects.create(message=message, user=reactor, emoji=emoji)
+
+        self.thread = Conversation.objects.create()
+        self.thread.participants.add(self.me, self.other)
+        for i in range(6):
+            message = DirectMessage.objects.create(
+                conversation=self.thread, sender=self.other if i % 2 else self.me, text=f'dm {i}',
+            )
+            if i % 3 == 0:
+                MessageReaction.objects.create(message=message, user=self.other, emoji='❤️')
+        self.request = mock.Mock(user=self.me)
+
+    def test_chat_matches_model_serializer(self):
+        from .serializers import ChatMessageSerializer, LeanChatMessageSerializer
+
+        queryset = ChatMessage.objects.select_related('user__profile', 'community').order_by('-created_at')[:50]
+        context = {'request': self.request}
+        self.assertEqual(
+            LeanChatMessageSerializer(queryset, context=context).data,
+            ChatMessageSerializer(queryset, many=True, context=context).data,
+        )
+
+    def test_direct_messages_match_model_serializer(self):
+        from .serializers import DirectMessageSerializer, LeanDirectMessageSerializer
+
+        queryset = DirectMessage.objects.filter(conversation=self.thread).select_related('sender__profile') \
+            .order_by('-created_at')[:50]
+        read_upto = DirectMessage.objects.filter(sender=self.me).order_by('pk')[1].pk
+        context = {'request': self.request, 'read_upto': read_upto}
+        lean = LeanDirectMessageSerializer(queryset, context=context).data
+        self.assertEqual(lean, DirectMessageSerializer(queryset, many=True, context=context).data)
+        self.assertEqual(lean[-1]['text'], 'dm 0')
+
+    def test_views_can_switch_back_to_model_serializer(self):
+        from .views import ChatListCreateView, DirectMessageListCreateView
+
+        self.client.force_authenticate(self.me)
+        urls = {
+            ChatListCreateView: reverse('api-chat-list'),
+            DirectMessageListCreateView: reverse('api-dm-thread-messages', kwargs={'thread_id': self.thread.pk}),
+        }
+        for view, url in urls.items():
+            lean = self.client.get(url).json()
+            with mock.patch.object(view, 'lean_serializer_class', None):
+                self.assertEqual(self.client.get(url).json(), lean)
+
+
+# -------------------------------------------------------------
+# JSON RENDERER / PARSER
+# -------------------------------------------------------------
+@skipUnless(renderers.orjson, 'orjson is not installed')
+class ORJSONRendererTests(APITestCase):
+    payload = {
+        'aware': datetime(2026, 10, 19, 12, 30, 5, 123456, tzinfo=dt_timezone.utc),
+        'offset': datetime(2026, 10, 19, 12, 30, tzinfo=dt_timezone(timedelta(hours=5, minutes=30))),
+        'naive': datetime(2026, 10, 19, 12, 30),
+        'day': date(2026, 10, 19),
+        'clock': time(12, 30, 5),
+        'span': timedelta(minutes=90),
+        'price': Decimal('12.50'),
+        'lazy': gettext_lazy('Password'),
+        'uuid': UUID('12345678-1234-5678-1234-567812345678'),
+        'text': 'héllo 👋 line\u2028para\u2029 "quoted"',
+        'nested': [{1: None, 'ok': True, 'f': 0.1}, (1, 2)],
+        'big': 2 ** 70,
+    }
+
+    def test_matches_drf_renderer(self):
+        self.assertEqual(
+            renderers.ORJSONRenderer().render(self.payload),
+            JSONRenderer().render(self.payload),
+        )
+
+    def test_indent_falls_back_to_stdlib(self):
+        media_type = 'application/json; indent=4'
+        self.assertEqual(
+            renderers.ORJSONRenderer().render({'a': [1]}, media_type),
+            JSONRenderer().render({'a': [1]}, media_type),
+        )
+
+    def test_parser(self):
+        parsed = renderers.ORJSONParser().parse(BytesIO('{"text": "héllo", "n": [1, 2.5]}'.encode()))
+        self.assertEqual(parsed, {'text': 'héllo', 'n': [1, 2.5]})
+        with self.assertRaises(ParseError):
+            renderers.ORJSONParser().parse(BytesIO(b'{"broken": '))
+
+
+# -------------------------------------------------------------
+# STARTUP
+# -------------------------------------------------------------
+class StartupTests(SimpleTestCase):
+    """Cold-start regression guard. Timings are left to benchmarks/startup.py:
+    wall-clock budgets flake on busy CI runners."""
+
+    def test_heavy_modules_load_on_first_use(self):
+        # A fresh process: this one has imported them for other tests
+        script = Path(__file__).resolve().parent.parent / 'benchmarks' / 'startup.py'
+        output = subprocess.run(
+            [sys.executable, str(script), '--json', '--rounds', '1'],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output)
+
+        loaded = [name for name, is_loaded in result['loaded'].items() if is_loaded]
+        self.assertEqual(loaded, [], 'These should only be imported on first use; '
+                                     'run `python benchmarks/startup.py` for the import breakdown')
+
+    def test_public_storage_urls_match_s3(self):
+        from storages.backends.s3 import S3Storage
+
+        from core.storage import PublicS3Storage
+
+        lazy, real = PublicS3Storage(), S3Storage()
+        for name in ['avatars/me.png', 'gallery/with space é.jpg', '/gallery/../gallery/x.jpg', 'a\\b.png']:
+            self.assertEqual(lazy.url(name), real.url(name))
+        self.assertEqual(lazy.url('x.png', parameters={'v': 1}), real.url('x.png', parameters={'v': 1}))
+
+
+# -------------------------------------------------------------
+# READ REPLICAS
+# -------------------------------------------------------------
+@mock.patch('core.db_router.replica_aliases', return_value=['replica1'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def route(self, request, write=False):
+        """Run the middleware; return (read alias before/after a write, response)."""
+        router = db_router.ReplicaRouter()
+        seen = {}
+
+        def view(request):
+            seen['read'] = router.db_for_read(User)
+            if write:
+                seen['write'] = router.db_for_write(User)
+                seen['read_after_write'] = router.db_for_read(User)
+            return HttpResponse()
+
+        response = db_router.ReplicaRoutingMiddleware(view)(request)
+        return seen, response
+
+    def test_safe_requests_read_from_replica_until_they_write(self, _):
+        seen, response = self.route(RequestFactory().get('/api/chat/'), write=True)
+        self.assertEqual(seen, {'read': 'replica1', 'write': 'default', 'read_after_write': 'default'})
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+
+    def test_writes_pin_the_client_to_default(self, _):
+        seen, response = self.route(RequestFactory().post('/api/chat/'))
+        self.assertEqual(seen['read'], 'default')
+        self.assertEqual(response.cookies[db_router.PIN_COOKIE]['max-age'], settings.REPLICA_PIN_SECONDS)
+
+        pinned = RequestFactory().get('/api/chat/')
+        pinned.COOKIES[db_router.PIN_COOKIE] = '1'
+        seen, _ = self.route(pinned)
+        self.assertEqual(seen['read'], 'default')
+
+    def test_outside_requests_use_default(self, _):
+        self.assertEqual(db_router.ReplicaRouter().db_for_read(User), 'default')
+
+    def test_middleware_disabled_without_replicas(self, replica_aliases):
+        replica_aliases.return_value = []
+        with self.assertRaises(MiddlewareNotUsed):
+            db_router.ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+
+# -------------------------------------------------------------
+# LAYERED CACHE
+# -------------------------------------------------------------
+class LayeredCacheTests(APITestCase):
+    def setUp(self):
+        self.cache = LayeredCache(local_max_entries=3, lock_timeout=2)
+        self.cache.clear()
+        layered_cache.clear()
+
+    def test_tag_invalidation(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(self.cache.get_or_set('k', compute, 60, tags=['user:1']), 1)
+        self.assertEqual(self.cache.get_or_set('k', compute, 60, tags=['user:1']), 1)
+        self.cache.invalidate('user:2')
+        self.assertEqual(self.cache.get_or_set('k', compute, 60, tags=['user:1']), 1)
+        self.cache.invalidate('user:1')
+        self.assertEqual(self.cache.get_or_set('k', compute, 60, tags=['user:1']), 2)
+
+    def test_other_process_invalidation_reaches_shared_level(self):
+        self.cache.set('k', 'old', 60, tags=['photo:9'])
+        # Another worker bumps the version; this process only loses its level 1
+        LayeredCache().invalidate('photo:9')
+        self.cache.local.clear()
+        self.assertIsNone(self.cache.get('k'))
+
+    def test_local_level_is_an_lru(self):
+        for key in 'abcd':
+            self.cache.set(key, key, 60)
+        self.assertEqual(len(self.cache.local), 3)
+        self.assertIs(self.cache.local.get('a'), self.cache.local.get('missing'))
+
+    def test_concurrent_misses_compute_once(self):
+        calls, started = [], threading.Barrier(8)
+
+        def compute():
+            calls.append(1)
+            threading.Event().wait(0.2)
+            return 'value'
+
+        def worker(results):
+            started.wait()
+            results.append(self.cache.get_or_set('hot', compute, 60))
+
+        results = []
+        threads = [threading.Thread(target=worker, args=(results,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 8)
+        self.assertEqual(len(calls), 1)
+
+    def test_waits_for_the_process_holding_the_lock(self):
+        self.cache.shared.add(self.cache._key('lock:hot'), 'other-worker', 2)
+        other = LayeredCache()
+        threading.Timer(0.2, other.set, args=('hot', 'theirs', 60)).start()
+        self.assertEqual(self.cache.get_or_set('hot', lambda: 'ours', 60), 'theirs')
+
+    def test_cached_view_is_invalidated_by_model_signals(self):
+        me = User.objects.create_user(username='cache_me', password='pass')
+        fan = User.objects.create_user(username='cache_fan', password='pass')
+        photo = UserPhoto.objects.create(user=me, image='gallery/a.jpg')
+        client = APIClient()
+        client.force_authenticate(me)
+        url = reverse('api-photos-list')
+
+        self.assertEqual(client.get(url)['X-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['results'][0]['like_count'], 0)
+        self.assertEqual(len(ctx.captured_queries), 2)   # ActiveUserMiddleware only
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PhotoLike.objects.create(user=fan, photo=photo)
+        response = client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['like_count'], 1)
+
+        # Per user: someone else's like status is not served from my entry
+        like_url = reverse('api-photo-like', kwargs={'photo_id': photo.pk})
+        self.assertFalse(client.get(like_url).data['is_liked'])
+        client.force_authenticate(fan)
+        self.assertTrue(client.get(like_url).data['is_liked'])
+
+    def test_errors_are_not_cached(self):
+        url = reverse('api-photo-like', kwargs={'photo_id': 999999})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertNotIn('X-Cache', self.client.get(url))
+
+
+# -------------------------------------------------------------
+# ASSET BUNDLES
+# -------------------------------------------------------------
+class AssetBundleTests(SimpleTestCase):
+    FRONTEND = Path(settings.BASE_DIR) / 'frontend'
+
+    def read(self, path):
+        return (self.FRONTEND / path).read_text(encoding='utf-8')
+
+    def test_page_bundle_holds_only_its_modules(self):
+        bundle = assets.bundle_js('pages/landing.js', self.read)
+        self.assertIn('const __module_js_utils = ', bundle)
+        self.assertIn('initAuth();', bundle)
+        self.assertNotIn('initDashboard', bundle)
+        self.assertNotRegex(bundle, r'(?m)^\s*(import|export)\s')
+
+    def test_unsupported_syntax_fails_the_build(self):
+        sources = {'pages/x.js': "import helper from '../js/y.js';\nhelper();\n"}
+        with self.assertRaisesMessage(assets.BundleError, 'pages/x.js:1'):
+            assets.bundle_js('pages/x.js', sources.__getitem__)
+
+    def test_collectstatic_builds_fingerprinted_compressed_bundles(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        # frontend/ only: compressing the admin and DRF assets too takes seconds
+        finders = ['django.contrib.staticfiles.finders.FileSystemFinder']
+        with override_settings(STATIC_ROOT=static_root, STATICFILES_FINDERS=finders, ASSET_BUNDLES=True, DEBUG=False):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            html = Template("{% load assets %}{% page_styles %}{% page_script 'dashboard' %}").render(Context())
+            self.assertRegex(html, r'/static/bundles/styles\.[0-9a-f]{12}\.css')
+            script = re.search(r'/static/(bundles/dashboard\.[0-9a-f]{12}\.js)', html).group(1)
+            self.assertTrue(os.path.exists(os.path.join(static_root, script + '.gz')))
+
+            response = self.client.get('/static/' + script, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertIn('immutable', response['Cache-Control'])
+            response.close()
+
+    def test_development_serves_unbundled_modules(self):
+        with override_settings(ASSET_BUNDLES=False, STORAGES={
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        }):
+            html = Template("{% load assets %}{% page_script 'landing' %}").render(Context())
+        self.assertEqual(html, '<script type="module" src="/static/pages/landing.js"></script>')
+
+
+# -------------------------------------------------------------
+# MEDIA URLS
+# -------------------------------------------------------------
+class MediaURLTests(SimpleTestCase):
+    def setUp(self):
+        media._resolvers.clear()
+
+    def test_urls_match_the_storage_and_are_memoized(self):
+        profile = Profile(avatar='avatars/a b.png')
+        storage, expected = profile.avatar.storage, profile.avatar.url
+        with mock.patch.object(storage, 'url', wraps=storage.url) as url:
+            self.assertEqual(media.media_url(profile.avatar), expected)
+            self.assertEqual(media.media_url('avatars/a b.png', storage), expected)
+            self.assertEqual(media.media_urls(['avatars/a b.png', None, '']), {'avatars/a b.png': expected})
+        self.assertEqual(url.call_count, 1)
+        self.assertIsNone(media.media_url(Profile().avatar))
+
+    def test_signed_urls_are_not_memoized(self):
+        storage = mock.Mock(querystring_auth=True)
+        storage.url.side_effect = ['signed-1', 'signed-2']
+        self.assertEqual([media.media_url('x.png', storage), media.media_url('x.png', storage)], ['signed-1', 'signed-2'])
+
+    def test_template_filter(self):
+        html = Template('{% load media %}<img src="{{ profile.avatar|media_url }}">').render(
+            Context({'profile': Profile(avatar='avatars/me.png')}),
+        )
+        self.assertEqual(html, f'<img src="{Profile(avatar="avatars/me.png").avatar.url}">')
+
+
+# -------------------------------------------------------------
+# DIRECT UPLOADS
+# -------------------------------------------------------------
+def image_bytes(format='PNG', size=(4, 4), noise=False):
+    from PIL import Image
+
+    buffer = BytesIO()
+    if noise:
+        # Incompressible, so the file is about width * height * 3 bytes
+        Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3)).save(buffer, format)
+    else:
+        Image.new('RGB', size).save(buffer, format)
+    return buffer.getvalue()
+
+
+@skipUnless(mock_aws, 'needs moto, the in-process S3 stand-in')
+class DirectUploadTests(APITestCase):
+    def setUp(self):
+        from storages.backends.s3 import S3Storage
+
+        aws = mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+        # The media storage, pointed at moto instead of the real bucket
+        self.s3 = S3Storage(
+            endpoint_url=None, custom_domain=None, region_name='us-east-1', access_key='test', secret_key='test',
+        )
+        self.s3.bucket.create()
+        patcher = mock.patch.object(UserPhoto._meta.get_field('image').storage, 'backend', self.s3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(username='uploader', password=PASSWORD)
+        Profile.objects.create(user=self.user)
+        self.client.force_authenticate(self.user)
+
+    def upload(self, data, kind='photo', content_type='image/png', size=None):
+        response = self.client.post(reverse('api-uploads'), {
+            'kind': kind, 'content_type': content_type, 'size': size or len(data),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['method'], 'PUT')
+        import requests
+
+        put = requests.put(response.data['url'], data=data, headers=response.data['headers'])
+        self.assertEqual(put.status_code, 200)
+        return response.data['upload_id']
+
+    def confirm(self, upload_id, **extra):
+        return self.client.post(reverse('api-uploads-confirm'), {'upload_id': upload_id, **extra}, format='json')
+
+    def keys(self):
+        return sorted(obj.key for obj in self.s3.bucket.objects.all())
+
+    def test_photo_upload_is_confirmed_once(self):
+        upload_id = self.upload(image_bytes())
+        self.assertEqual(len(self.keys()), 1)
+        self.assertTrue(self.keys()[0].startswith('uploads/pending/'))
+
+        response = self.confirm(upload_id, caption='sunset')
+        self.assertEqual(response.status_code, 201, response.data)
+        photo = UserPhoto.objects.get(user=self.user)
+        self.assertEqual((photo.caption, response.data['id']), ('sunset', photo.pk))
+        self.assertEqual(self.keys(), [photo.image.name])
+        self.assertTrue(photo.image.name.startswith('gallery/'))
+
+        again = self.confirm(upload_id)
+        self.assertEqual((again.status_code, again.data['id']), (200, photo.pk))
+        self.assertEqual(UserPhoto.objects.count(), 1)
+
+    def test_avatar_upload(self):
+        response = self.confirm(self.upload(image_bytes('JPEG'), kind='avatar', content_type='image/jpeg'))
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertRegex(Profile.objects.get(user=self.user).avatar.name, r'^avatars/[0-9a-f]{32}\.jpg$')
+
+    def test_rejected_uploads_are_deleted(self):
+        response = self.confirm(self.upload(b'not an image at all'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.keys(), [])
+
+        # Announced as PNG, is a GIF
+        self.assertEqual(self.confirm(self.upload(image_bytes('GIF'))).status_code, 400)
+        with override_settings(UPLOAD_MAX_PIXELS=100):
+            self.assertEqual(self.confirm(self.upload(image_bytes(size=(20, 20)))).status_code, 400)
+        self.assertEqual(UserPhoto.objects.count(), 0)
+
+    def test_limits_and_tickets(self):
+        with override_settings(UPLOAD_MAX_BYTES=10):
+            response = self.client.post(reverse('api-uploads'), {
+                'kind': 'photo', 'content_type': 'image/png', 'size': 11,
+            }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.confirm('forged').status_code, 400)
+
+        upload_id = self.upload(image_bytes())
+        self.client.force_authenticate(User.objects.create_user(username='thief', password=PASSWORD))
+        self.assertEqual(self.confirm(upload_id).status_code, 400)
+        self.assertEqual(self.confirm(uploads.make_ticket(self.user, 'photo', 'x', 'image/png', 1)).status_code, 400)
+
+
+def use_local_media(test):
+    """Store media in a temporary directory instead of the bucket for `test`; returns the directory."""
+    from django.core.files.storage import FileSystemStorage
+
+    media_root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media_root)
+    patcher = mock.patch.object(UserPhoto._meta.get_field('image').storage, 'backend',
+                                FileSystemStorage(location=media_root))
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return Path(media_root)
+
+
+class ChunkedUploadTests(APITestCase):
+    def setUp(self):
+        use_local_media(self)
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        # Smallest chunks allowed, so a 400x400 image takes two
+        settings_patch = override_settings(UPLOAD_TEMP_DIR=Path(temp_dir), UPLOAD_CHUNK_SIZE=1)
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+        self.temp_dir = Path(temp_dir)
+
+        self.user = User.objects.create_user(username='chunky', password=PASSWORD)
+        Profile.objects.create(user=self.user)
+        self.client.force_authenticate(self.user)
+
+    def start(self, data, kind='photo', content_type='image/png', **extra):
+        response = self.client.post(reverse('api-uploads-chunked'), {
+            'kind': kind, 'content_type': content_type, 'size': len(data), **extra,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['offset'], 0)
+        return response.data['upload_id'], response.data['chunk_size']
+
+    def put(self, upload_id, offset, chunk, **extra):
+        return self.client.put(reverse('api-uploads-chunked-detail', args=[upload_id]), chunk,
+                               content_type='application/octet-stream', **{'HTTP_UPLOAD_OFFSET': str(offset), **extra})
+
+    def offset(self, upload_id):
+        return self.client.get(reverse('api-uploads-chunked-detail', args=[upload_id]))
+
+    def test_resumed_photo_upload(self):
+        data = image_bytes(size=(400, 400), noise=True)
+        upload_id, chunk = self.start(data, caption='big one')
+        self.assertEqual(chunk, uploads.HEADER_BYTES)
+        self.assertGreater(len(data), chunk)
+
+        first = self.put(upload_id, 0, data[:chunk])
+        self.assertEqual((first.status_code, first.data['offset'], first['Upload-Offset']), (200, chunk, str(chunk)))
+        # The connection drops halfway through the second chunk: nothing of it is kept
+        upload = uploads.ChunkedUpload(uploads.read_ticket(upload_id, self.user, salt=uploads.CHUNKED_SALT)['name'],
+                                       len(data))
+        self.assertFalse(upload.write(BytesIO(data[chunk:chunk + 100]), chunk, len(data) - chunk))
+        self.assertEqual(self.offset(upload_id).data['offset'], chunk)
+        # Out of order, and the wrong length
+        self.assertEqual(self.put(upload_id, 0, data[:chunk]).status_code, 409)
+        self.assertEqual(self.put(upload_id, chunk, data[chunk:-1]).status_code, 400)
+
+        done = self.put(upload_id, chunk, data[chunk:])
+        self.assertEqual(done.status_code, 201, done.data)
+        photo = UserPhoto.objects.get(user=self.user)
+        self.assertEqual((photo.caption, done.data['id']), ('big one', photo.pk))
+        self.assertTrue(photo.image.name.startswith('gallery/'))
+        with photo.image.open() as stored:
+            self.assertEqual(stored.read(), data)
+        # Only the marker that answers retries is left
+        self.assertEqual([path.suffix for path in self.temp_dir.iterdir()], ['.done'])
+
+        # The client lost the last response and retries
+        again = self.put(upload_id, chunk, data[chunk:])
+        self.assertEqual((again.status_code, again.data['id']), (200, photo.pk))
+        self.assertEqual(self.offset(upload_id).data['offset'], len(data))
+        self.assertEqual(UserPhoto.objects.count(), 1)
+
+    def test_one_writer_per_upload_across_workers(self):
+        data = image_bytes(size=(400, 400), noise=True)
+        upload_id, chunk = self.start(data)
+        name = uploads.read_ticket(upload_id, self.user, salt=uploads.CHUNKED_SALT)['name']
+        # Another worker is writing a chunk: its own open file holds the lock
+        other = uploads.ChunkedUpload(name, len(data))
+        self.assertTrue(other.lock())
+        self.assertFalse(uploads.ChunkedUpload(name, len(data)).lock())
+        self.assertEqual(self.put(upload_id, 0, data[:chunk]).status_code, 409)
+        other.unlock()
+        self.assertEqual(self.put(upload_id, 0, data[:chunk]).status_code, 200)
+
+    def test_avatar_in_one_chunk(self):
+        data = image_bytes('JPEG')
+        upload_id, _ = self.start(data, kind='avatar', content_type='image/jpeg')
+        response = self.put(upload_id, 0, data)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertRegex(Profile.objects.get(user=self.user).avatar.name, r'^avatars/[0-9a-f]{64}\.jpg$')
+
+    def test_first_chunk_is_checked(self):
+        data = image_bytes(size=(400, 400), noise=True)
+        with override_settings(UPLOAD_MAX_PIXELS=100):
+            upload_id, chunk = self.start(data)
+            self.assertEqual(self.put(upload_id, 0, data[:chunk]).status_code, 400)
+        self.assertEqual(self.offset(upload_id).status_code, 404)
+
+        upload_id, chunk = self.start(data, content_type='image/webp')
+        self.assertEqual(self.put(upload_id, 0, data[:chunk]).status_code, 400)
+        self.assertEqual(list(self.temp_dir.iterdir()), [])
+        self.assertEqual(UserPhoto.objects.count(), 0)
+
+    def test_limits_tickets_and_cleanup(self):
+        with override_settings(UPLOAD_MAX_BYTES=10):
+            response = self.client.post(reverse('api-uploads-chunked'), {
+                'kind': 'photo', 'content_type': 'image/png', 'size': 11,
+            }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        data = image_bytes()
+        upload_id, _ = self.start(data)
+        self.assertEqual(self.put(upload_id, 0, data, HTTP_UPLOAD_OFFSET='').status_code, 400)
+        # Direct-upload tickets are not chunked ones, and the other way round
+        direct = uploads.make_ticket(self.user, 'photo', 'uploads/pending/x.png', 'image/png', 1)
+        self.assertEqual(self.offset(direct).status_code, 400)
+        self.client.force_authenticate(User.objects.create_user(username='thief', password=PASSWORD))
+        self.assertEqual(self.offset(upload_id).status_code, 400)
+        self.client.force_authenticate(self.user)
+
+        self.assertEqual(self.client.delete(reverse('api-uploads-chunked-detail', args=[upload_id])).status_code, 204)
+        self.assertEqual(self.offset(upload_id).status_code, 404)
+
+        # Partial uploads nobody came back to are deleted when the next one starts
+        self.start(data)
+        stale = next(self.temp_dir.iterdir())
+        os.utime(stale, (0, 0))
+        self.start(data)
+        self.assertFalse(stale.exists())
+        self.assertEqual(len(list(self.temp_dir.iterdir())), 1)
+
+
+# -------------------------------------------------------------
+# CONTENT-ADDRESSED MEDIA
+# -------------------------------------------------------------
+class MediaDedupTests(APITestCase):
+    def setUp(self):
+        self.media_root = use_local_media(self)
+        self.users = [User.objects.create_user(username=f'dedup{i}', password=PASSWORD) for i in range(2)]
+        for user in self.users:
+            Profile.objects.create(user=user)
+
+    def post_photo(self, user, data, name='holiday.PNG'):
+        self.client.force_authenticate(user)
+        response = self.client.post(reverse('api-photos-list'), {
+            'image': SimpleUploadedFile(name, data, content_type='image/png'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+        return UserPhoto.objects.get(pk=response.data['id'])
+
+    def stored_files(self):
+        return sorted(str(path.relative_to(self.media_root)) for path in self.media_root.rglob('*') if path.is_file())
+
+    def refs(self, name):
+        return MediaObject.objects.get(name=name).refs
+
+    def test_identical_uploads_are_stored_once(self):
+        data = image_bytes()
+        first = self.post_photo(self.users[0], data)
+        second = self.post_photo(self.users[1], data, name='copy.png')
+        again = self.post_photo(self.users[0], data)
+        name = f'gallery/{hashlib.sha256(data).hexdigest()}.png'
+        self.assertEqual({first.image.name, second.image.name, again.image.name}, {name})
+        self.assertEqual(self.stored_files(), [name])
+        self.assertEqual(self.refs(name), 3)
+
+        other = self.post_photo(self.users[0], image_bytes(size=(5, 5)))
+        self.assertEqual(len(self.stored_files()), 2)
+        self.assertEqual(self.refs(other.image.name), 1)
+
+    def test_references_follow_changes_and_purge(self):
+        data = image_bytes()
+        photos = [self.post_photo(user, data) for user in self.users]
+        name = photos[0].image.name
+
+        # A profile can use the same bytes as its avatar; changing it releases the old one
+        profile = Profile.objects.get(user=self.users[0])
+        profile.avatar.save('me.png', ContentFile(data))
+        self.assertEqual(profile.avatar.name, name.replace('gallery/', 'avatars/'))
+        profile = Profile.objects.get(pk=profile.pk)
+        profile.avatar.save('me.png', ContentFile(image_bytes(size=(6, 6))))
+        self.assertEqual(self.refs(name.replace('gallery/', 'avatars/')), 0)
+
+        photos[0].delete()
+        self.assertEqual(self.refs(name), 1)
+        output = StringIO()
+        call_command('purge_media', '--grace-hours=0', stdout=output)   # only the old avatar
+        self.assertIn('Deleted 1', output.getvalue())
+        self.assertEqual(self.stored_files(), sorted([name, profile.avatar.name]))
+
+        photos[1].delete()
+        self.assertEqual(self.refs(name), 0)
+        output = StringIO()
+        call_command('purge_media', stdout=output)   # still in the grace period
+        self.assertIn('Deleted 0', output.getvalue())
+        call_command('purge_media', '--grace-hours=0', stdout=output)
+        self.assertIn('Deleted 1', output.getvalue())
+        self.assertEqual(self.stored_files(), [profile.avatar.name])
+        self.assertEqual(list(MediaObject.objects.values_list('name', 'refs')), [(profile.avatar.name, 1)])
+
+    def test_reuse_during_purge_keeps_the_file(self):
+        data = image_bytes()
+        self.post_photo(self.users[0], data).delete()
+        MediaObject.objects.update(updated_at=datetime.now(dt_timezone.utc) - timedelta(days=2))
+        backend = UserPhoto._meta.get_field('image').storage.backend
+        exists = backend.exists
+
+        def exists_then_purge(name):
+            # purge_media runs between the upload's existence check and its reference count
+            found = exists(name)
+            call_command('purge_media', stdout=StringIO())
+            return found
+
+        with mock.patch.object(backend, 'exists', side_effect=exists_then_purge):
+            photo = self.post_photo(self.users[1], data)
+        self.assertEqual(self.stored_files(), [photo.image.name])
+        self.assertEqual(self.refs(photo.image.name), 1)
+
+    def test_recount(self):
+        photo = self.post_photo(self.users[0], image_bytes())
+        MediaObject.objects.update(refs=5)
+        MediaObject.objects.create(name='gallery/orphan.png', refs=2)
+        self.assertEqual(MediaObject.recount(), 1)
+        self.assertEqual(dict(MediaObject.objects.values_list('name', 'refs')),
+                         {photo.image.name: 1, 'gallery/orphan.png': 0})
+
+
+# -------------------------------------------------------------
+# KEYSET PAGINATION
+# -------------------------------------------------------------
+class KeysetPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='prolific', password=PASSWORD)
+        Profile.objects.create(user=cls.user)
+        cls.photos = [UserPhoto.objects.create(user=cls.user, image=f'gallery/{i}.jpg') for i in range(7)]
+        # Ties on created_at are broken by id
+        UserPhoto.objects.filter(pk__in=[p.pk for p in cls.photos[2:5]]).update(created_at=cls.photos[2].created_at)
+
+    def walk(self, url, client=None):
+        ids = []
+        while url:
+            response = (client or self.client).get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def expected(self):
+        return list(UserPhoto.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def test_pages_cover_the_gallery_once(self):
+        self.assertEqual(self.walk(reverse('api-user-photos', args=['prolific']) + '?limit=2'), self.expected())
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.walk(reverse('api-photos-list') + '?limit=3'), self.expected())
+
+    def test_new_photos_do_not_shift_pages(self):
+        url = reverse('api-user-photos', args=['prolific']) + '?limit=3'
+        first = self.client.get(url).data
+        UserPhoto.objects.create(user=self.user, image='gallery/new.jpg')
+        rest = self.walk(first['next'])
+        self.assertEqual([row['id'] for row in first['results']] + rest, self.expected()[1:])
+
+    def test_bad_input(self):
+        url = reverse('api-user-photos', args=['prolific'])
+        self.assertEqual(self.client.get(url + '?cursor=garbage').status_code, 400)
+        self.assertEqual(self.client.get(url + '?cursor=' + 'MjAyNnwx').status_code, 400)   # "2026|1"
+        self.assertEqual(self.client.get(reverse('api-user-photos', args=['nobody'])).status_code, 404)
+        self.assertEqual(len(self.client.get(url + '?limit=1000').data['results']), 7)
+
+    def test_public_profile_renders_first_page(self):
+        UserPhoto.objects.bulk_create(UserPhoto(user=self.user, image=f'gallery/more{i}.jpg') for i in range(20))
+        with override_settings(ASSET_BUNDLES=False, STORAGES={
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        }):
+            response = self.client.get(reverse('public-profile', args=['prolific']))
+        self.assertEqual(response.status_code, 200)
+        shown = [photo.pk for photo in response.context['photos']]
+        self.assertEqual(len(shown), 24)
+        self.assertContains(response, f'data-next="{response.context["photos_next"]}"')
+        self.assertEqual(shown + self.walk(response.context['photos_next']), self.expected())
+
+
+# -------------------------------------------------------------
+# BATCH LIKE STATUS
+# -------------------------------------------------------------
+class LikeStatusBatchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner, cls.fan = (User.objects.create_user(username=name, password=PASSWORD) for name in ('owner', 'fan'))
+        cls.photos = [UserPhoto.objects.create(user=cls.owner, image=f'gallery/{i}.jpg') for i in range(3)]
+        PhotoLike.objects.create(user=cls.fan, photo=cls.photos[0])
+        PhotoLike.objects.create(user=cls.owner, photo=cls.photos[0])
+        PhotoLike.objects.create(user=cls.owner, photo=cls.photos[1])
+
+    def status(self, ids, client=None):
+        return (client or self.client).get(reverse('api-photo-likes') + f'?ids={ids}')
+
+    def test_matches_the_single_photo_endpoint(self):
+        ids = ','.join(str(photo.pk) for photo in self.photos) + ',999999'
+        for user in (None, self.fan):
+            self.client.force_authenticate(user)
+            batch = self.status(ids).data
+            self.assertEqual(set(batch), {str(photo.pk) for photo in self.photos})
+            for photo in self.photos:
+                single = self.client.get(reverse('api-photo-like', args=[photo.pk])).data
+                self.assertEqual(batch[str(photo.pk)], dict(single))
+        self.assertEqual(self.status(ids).data[str(self.photos[0].pk)], {'is_liked': True, 'like_count': 2})
+
+    def test_idempotent_like_writes(self):
+        photo = self.photos[2]
+        url = reverse('api-photo-like', args=[photo.pk])
+        self.client.force_authenticate(self.fan)
+        self.assertEqual(self.client.get(url).data['like_count'], 0)   # now cached
+
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.put(url)
+            self.assertEqual(response.data, {'is_liked': True, 'like_count': 1})
+        self.assertEqual(self.client.get(url).data, {'is_liked': True, 'like_count': 1})
+
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.delete(url)
+            self.assertEqual(response.data, {'is_liked': False, 'like_count': 0})
+        self.assertEqual(self.client.get(url).data, {'is_liked': False, 'like_count': 0})
+
+        # Unliking is one DELETE, with no SELECT of the likes first
+        self.client.put(url)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.delete(url)
+        likes = [q['sql'] for q in ctx.captured_queries if 'FROM "homepage_photolike"' in q['sql']]
+        self.assertEqual(len(likes), 1, likes)
+        self.assertTrue(likes[0].startswith('DELETE'))
+
+        missing = reverse('api-photo-like', args=[999999])
+        self.assertEqual(self.client.put(missing).status_code, 404)
+        self.assertEqual(self.client.delete(missing).status_code, 404)
+        self.assertFalse(PhotoLike.objects.filter(photo_id=999999).exists())
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.put(url).status_code, 401)
+
+    def test_bad_ids(self):
+        self.assertEqual(self.status('').data, {})
+        self.assertEqual(self.status('1,x').status_code, 400)
+        too_many = ','.join(str(i) for i in range(1, 102))
+        self.assertEqual(self.status(too_many).status_code, 400)
+
+
+# -------------------------------------------------------------
+# REACTION SUMMARIES
+# -------------------------------------------------------------
+@override_settings(MESSAGE_ENCRYPTION_KEY=Fernet.generate_key().decode())
+class ReactionSummaryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me, self.other = (User.objects.create_user(username=name, password=PASSWORD) for name in ('rs_me', 'rs_other'))
+        self.message = ChatMessage.objects.create(user=self.other, text='hi')
+        self.url = reverse('api-chat-react', args=[self.message.pk])
+
+    def react(self, user, method, emoji):
+        self.client.force_authenticate(user)
+        return getattr(self.client, method)(self.url, {'emoji': emoji}, format='json')
+
+    def summary(self):
+        self.message.refresh_from_db()
+        return self.message.reaction_summary
+
+    def test_writes_keep_the_summary(self):
+        self.react(self.other, 'post', '👍')
+        self.react(self.me, 'post', '👍')
+        self.assertEqual(self.summary(), [['👍', [[self.other.pk, 'rs_other'], [self.me.pk, 'rs_me']]]])
+
+        # Changing the emoji is one upsert: still one reaction per user
+        self.react(self.me, 'post', '🔥')
+        self.assertEqual(CommunityMessageReaction.objects.filter(message=self.message, user=self.me).count(), 1)
+        self.assertEqual(self.summary(), [['👍', [[self.other.pk, 'rs_other']]], ['🔥', [[self.me.pk, 'rs_me']]]])
+
+        self.assertEqual(self.react(self.me, 'delete', '👍').data, {'deleted': False})
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.react(self.me, 'delete', '🔥').data, {'deleted': True})
+        # One DELETE, with no SELECT of the reactions first
+        reactions = [q['sql'] for q in ctx.captured_queries if 'FROM "homepage_communitymessagereaction"' in q['sql']]
+        self.assertEqual(len(reactions), 1, reactions)
+        self.assertTrue(reactions[0].startswith('DELETE'))
+        self.assertEqual(self.summary(), [['👍', [[self.other.pk, 'rs_other']]]])
+
+        self.client.force_authenticate(self.me)
+        reactions = self.client.get(reverse('api-chat-list')).json()[0]['reactions']
+        self.assertEqual(reactions, [{'emoji': '👍', 'count': 1, 'users': [{'username': 'rs_other', 'is_me': False}]}])
+
+    def test_other_writes_rebuild_the_summary(self):
+        reaction = CommunityMessageReaction.objects.create(message=self.message, user=self.me, emoji='🎉')
+        self.assertEqual(self.summary(), [['🎉', [[self.me.pk, 'rs_me']]]])
+        reaction.emoji = '👀'
+        reaction.save()
+        self.assertEqual(self.summary(), [['👀', [[self.me.pk, 'rs_me']]]])
+
+        # A deleted account's reactions disappear from the summary
+        self.me.delete()
+        self.assertEqual(self.summary(), [])
+
+        dm = DirectMessage.objects.create(
+            conversation=Conversation.objects.create(), sender=self.other, text='x',
+        )
+        MessageReaction.objects.create(message=dm, user=self.other, emoji='❤️')
+        dm.refresh_from_db()
+        self.assertEqual(dm.reaction_summary, [['❤️', [[self.other.pk, 'rs_other']]]])
+        dm.delete()   # no summary update for a message that is gone
+
+
+# -------------------------------------------------------------
+# RECENT CHAT RING BUFFERS
+# -------------------------------------------------------------
+class RecentChatTests(APITestCase):
+    def setUp(self):
+        from .recent import RecentChat
+
+        cache.clear()
+        self.RecentChat = RecentChat
+        # Buffers are only kept in a cache all workers share
+        patcher = mock.patch('api.recent.is_shared', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.me, self.other = (User.objects.create_user(username=name, password=PASSWORD) for name in ('rc_me', 'rc_other'))
+        self.community = Community.objects.create(name='Recent', created_by=self.me)
+        CommunityMembership.objects.create(community=self.community, user=self.me)
+        self.first = ChatMessage.objects.create(user=self.other, text='first')
+        self.client.force_authenticate(self.me)
+        self.url = reverse('api-chat-list')
+
+    def texts(self, url=None, queries=None):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(url or self.url).json()
+        if queries is not None:
+            # Authentication and last_activity (middleware) only: no message query
+            self.assertEqual(len(ctx), queries, '\n'.join(q['sql'] for q in ctx.captured_queries))
+        return [message['text'] for message in data]
+
+    def test_warm_reads_skip_the_database(self):
+        self.assertEqual(self.texts(), ['first'])
+        self.assertEqual(self.texts(queries=2), ['first'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {'text': 'second'}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('api-chat-react', args=[self.first.pk]), {'emoji': '👍'}, format='json')
+        self.assertEqual(self.texts(queries=2), ['first', 'second'])
+        self.assertEqual(self.client.get(self.url).json()[0]['reactions'][0]['users'],
+                         [{'username': 'rc_me', 'is_me': True}])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.delete()
+        self.assertEqual(self.texts(queries=2), ['second'])
+
+        # Rooms are separate buffers
+        community_url = reverse('api-community-chat-list', args=[self.community.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(community_url, {'text': 'club'}, format='json')
+        self.assertEqual(self.texts(community_url), ['club'])
+        self.assertEqual(self.texts(), ['second'])
+
+    def test_full_buffer_keeps_the_window(self):
+        with mock.patch.object(self.RecentChat, 'SIZE', 2):
+            for text in ('second', 'third'):
+                ChatMessage.objects.create(user=self.me, text=text)
+            self.assertEqual([row['text'] for row in self.RecentChat.get(None)], ['third', 'second'])
+            newest = ChatMessage.objects.get(text='third')
+            with self.captureOnCommitCallbacks(execute=True):
+                newest.delete()
+            # The message before the window is unknown to the buffer: it is rebuilt
+            self.assertIsNone(cache.get(self.RecentChat.key(None)))
+            self.assertEqual([row['text'] for row in self.RecentChat.get(None)], ['second', 'first'])
+
+    def test_out_of_order_updates_drop_the_buffer(self):
+        self.RecentChat.get(None)
+        # Another worker bumped the version without updating the buffer (e.g. it raced this one)
+        cache.incr(self.RecentChat.version_key(None))
+        self.RecentChat.reactions_changed(self.first.pk, None, [])
+        self.assertIsNone(cache.get(self.RecentChat.key(None)))
+
+        # Messages written while the buffer is cold are read from the database
+        ChatMessage.objects.create(user=self.me, text='unseen')
+        self.assertEqual(len(self.RecentChat.get(None)), 2)
+
+    def test_workers_with_their_own_cache_read_the_database(self):
+        # Two workers, each with its own LocMemCache, as without REDIS_URL
+        worker_a, worker_b = LocMemCache('worker-a', {}), LocMemCache('worker-b', {})
+        with mock.patch('api.recent.is_shared', return_value=False):
+            with mock.patch('api.recent.cache', worker_b):
+                self.assertEqual(self.texts(), ['first'])
+            with mock.patch('api.recent.cache', worker_a), self.captureOnCommitCallbacks(execute=True):
+                self.client.post(self.url, {'text': 'second'}, format='json')
+            with mock.patch('api.recent.cache', worker_b):
+                self.assertEqual(self.texts(queries=3), ['first', 'second'])
+        self.assertIsNone(worker_b.get(self.RecentChat.key(None)))
+
+
+# -------------------------------------------------------------
+# RATE LIMITS
+# -------------------------------------------------------------
+@override_settings(RATE_LIMITS={
+    'resolve-username': {'GET': [('ip', '2/min')]},
+    'api-chat-list': {'POST': [('user', '1/s')]},
+})
+class RateLimitTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice, self.bob = (User.objects.create_user(username=name, password=PASSWORD) for name in ('rl_alice', 'rl_bob'))
+
+    def resolve(self, ip='10.0.0.1', **extra):
+        return self.client.get(reverse('resolve-username') + '?email=nobody@example.com', REMOTE_ADDR=ip, **extra)
+
+    def test_ip_scope(self):
+        self.assertEqual([self.resolve().status_code for _ in range(2)], [404, 404])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.resolve()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(len(ctx), 0)
+        self.assertEqual(self.resolve('10.0.0.2').status_code, 404)
+
+        # Behind a proxy the client is the address it forwarded, not the proxy's
+        with override_settings(RATE_LIMIT_PROXIES=1):
+            self.assertEqual(self.resolve(HTTP_X_FORWARDED_FOR='10.0.0.3').status_code, 404)
+            self.assertEqual(self.resolve(HTTP_X_FORWARDED_FOR='10.0.0.3, 10.0.0.1').status_code, 429)
+
+    def test_user_scope_refills(self):
+        def post(user, **extra):
+            token = str(RefreshToken.for_user(user).access_token) if user else 'garbage'
+            return self.client.post(reverse('api-chat-list'), {'text': 'hi'}, format='json',
+                                    HTTP_AUTHORIZATION=f'Bearer {token}', **extra)
+
+        now = 1_000_000.0
+        with mock.patch('core.throttling.time.time', side_effect=lambda: now):
+            self.assertEqual(post(self.alice).status_code, 201)
+            self.assertEqual(post(self.alice).status_code, 429)
+            # Buckets are per user, whatever the address
+            self.assertEqual(post(self.bob).status_code, 201)
+            # Without a valid token the address is the scope
+            self.assertEqual(post(None).status_code, 401)
+            self.assertEqual(post(None).status_code, 429)
+            now += 1
+            self.assertEqual(post(self.alice).status_code, 201)
+
+    def test_bad_tokens_fall_back_to_the_address(self):
+        expired = AccessToken.for_user(self.alice)
+        expired.set_exp(lifetime=-timedelta(seconds=1))
+
+        for ip, header in (('10.0.0.5', 'Bearer a b'), ('10.0.0.6', f'Bearer {expired}')):
+            responses = [
+                self.client.post(reverse('api-chat-list'), {'text': 'hi'}, format='json',
+                                 HTTP_AUTHORIZATION=header, REMOTE_ADDR=ip)
+                for _ in range(2)
+            ]
+            self.assertEqual([response.status_code for response in responses], [401, 429], header)
+
+    def test_parse_rate(self):
+        from core.throttling import parse_rate
+
+        self.assertEqual(parse_rate('30/min'), (30, 0.5))
+        self.assertEqual(parse_rate('10/s'), (10, 10))
+        self.assertEqual(parse_rate('24/day'), (24, 24 / 86400))
@@ -0,0 +1,325 @@
+"""
+Direct-to-storage uploads for gallery photos and avatars.
+
+Image bytes go from the browser straight to the bucket instead of through a
+Django worker (api/views_uploads.py):
+
+  1. POST /api/uploads/ {"kind": "photo" | "avatar", "content_type", "size"}
+     returns a presigned PUT (or POST form, see UPLOAD_PRESIGN_METHOD) for a
+     fresh key under UPLOAD_PENDING_PREFIX, plus an `upload_id`.
+  2. The client sends the file to the bucket with it.
+  3. POST /api/uploads/confirm/ {"upload_id", "caption"} checks the object:
+     its size, and that its first bytes are an allowed image format within
+     UPLOAD_MAX_PIXELS. It then copies the object into gallery/ or avatars/
+     inside the bucket and creates the UserPhoto or sets Profile.avatar.
+
+The upload_id is a signed ticket (django.core.signing), so nothing is stored
+between the two calls. Objects that are never confirmed stay under
+UPLOAD_PENDING_PREFIX; expire them with a bucket lifecycle rule.
+
+Any S3-compatible endpoint works. Point AWS_S3_ENDPOINT_URL at MinIO or
+`moto_server` to try it locally; api.tests uses moto's in-process mock.
+
+Chunked uploads go through Django instead, for clients that need to resume
+after a dropped connection and for media storages other than S3:
+
+  1. POST /api/uploads/chunked/ {"kind", "content_type", "size", "caption"}
+     returns an `upload_id` and the `chunk_size`.
+  2. PUT /api/uploads/chunked/<upload_id>/ with an Upload-Offset header and
+     the raw bytes of one chunk as the body, in order. Every chunk is
+     exactly chunk_size bytes except the last. The first chunk is checked
+     like a direct upload, so a wrong or oversized image is rejected before
+     the rest is sent.
+  3. After a dropped connection, GET /api/uploads/chunked/<upload_id>/ says
+     which offset to resume from.
+
+Chunks are appended to a file in UPLOAD_TEMP_DIR. When the last one is in,
+the file is saved to the media storage as the photo or avatar.
+"""
+import fcntl
+import posixpath
+import time
+from io import BytesIO
+from pathlib import Path
+from uuid import uuid4
+
+from django.conf import settings
+from django.core import signing
+from rest_framework import serializers
+from storages.utils import clean_name, safe_join
+
+from homepage.models import Profile, UserPhoto
+
+# content type -> (file extension, Pillow format)
+IMAGE_TYPES = {
+    'image/jpeg': ('.jpg', 'JPEG'),
+    'image/png': ('.png', 'PNG'),
+    'image/webp': ('.webp', 'WEBP'),
+    'image/gif': ('.gif', 'GIF'),
+}
+# Where each kind of upload ends up
+KINDS = {
+    'photo': UserPhoto._meta.get_field('image'),
+    'avatar': Profile._meta.get_field('avatar'),
+}
+# Enough of the file for Pillow to read the header (JPEG EXIF can be 64 KB)
+HEADER_BYTES = 256 * 1024
+TICKET_SALT = 'api.uploads'
+
+
+class UploadRequestSerializer(serializers.Serializer):
+    kind = serializers.ChoiceField(choices=list(KINDS))
+    content_type = serializers.ChoiceField(choices=list(IMAGE_TYPES))
+    size = serializers.IntegerField(min_value=1)
+
+    def validate_size(self, value):
+        if value > settings.UPLOAD_MAX_BYTES:
+            raise serializers.ValidationError(f'Images can be at most {settings.UPLOAD_MAX_BYTES} bytes.')
+        return value
+
+
+class UploadConfirmSerializer(serializers.Serializer):
+    upload_id = serializers.CharField()
+    caption = serializers.CharField(max_length=200, required=False, allow_blank=True, default='')
+
+
+def inspect_image(header, content_type):
+    """Check the first bytes of an upload; raises ValidationError if they are not
+    an image of `content_type` within UPLOAD_MAX_PIXELS. Returns (width, height)."""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        image = Image.open(BytesIO(header))
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise serializers.ValidationError('The file is not a supported image.')
+    if image.format != IMAGE_TYPES[content_type][1]:
+        raise serializers.ValidationError(f'The file is not {content_type}.')
+    width, height = image.size
+    if width * height > settings.UPLOAD_MAX_PIXELS:
+        raise serializers.ValidationError(f'Images can have at most {settings.UPLOAD_MAX_PIXELS} pixels.')
+    return width, height
+
+
+# -------------------------------------------------------------
+# TICKETS
+# -------------------------------------------------------------
+def make_ticket(user, kind, name, content_type, size, salt=TICKET_SALT, **extra):
+    return signing.dumps(
+        {'user': user.pk, 'kind': kind, 'name': name, 'content_type': content_type, 'size': size, **extra},
+        salt=salt,
+    )
+
+
+def read_ticket(upload_id, user, salt=TICKET_SALT, max_age=None):
+    """The ticket's payload; ValidationError if it is forged, expired or someone else's."""
+    if max_age is None:
+        # Confirming may happen a while after the upload URL expired
+        max_age = settings.UPLOAD_URL_EXPIRES * 2
+    try:
+        ticket = signing.loads(upload_id, salt=salt, max_age=max_age)
+    except signing.BadSignature:
+        ticket = None
+    if not ticket or ticket['user'] != user.pk:
+        raise serializers.ValidationError({'upload_id': 'Invalid or expired upload.'})
+    return ticket
+
+
+def pending_name(content_type):
+    return f'{settings.UPLOAD_PENDING_PREFIX}{uuid4().hex}{IMAGE_TYPES[content_type][0]}'
+
+
+def final_name(kind, pending):
+    """Storage name in the model field's upload_to; fixed per upload, so confirm is idempotent."""
+    return posixpath.join(KINDS[kind].upload_to, posixpath.basename(pending))
+
+
+# -------------------------------------------------------------
+# BUCKET ACCESS
+# -------------------------------------------------------------
+class Bucket:
+    """The S3 bucket behind the media storage, talked to with the storage's own client."""
+
+    def __init__(self, storage):
+        self.s3 = getattr(storage, 'backend', storage)   # PublicS3Storage wraps S3Storage
+        self.client = self.s3.bucket.meta.client
+        self.name = self.s3.bucket_name
+
+    @classmethod
+    def for_media(cls):
+        """None when media is not stored in S3 (direct uploads need a bucket)."""
+        storage = UserPhoto._meta.get_field('image').storage
+        if not hasattr(getattr(storage, 'backend', storage), 'bucket_name'):
+            return None
+        return cls(storage)
+
+    def key(self, name):
+        return safe_join(self.s3.location, clean_name(name))
+
+    def _acl(self):
+        return {'ACL': self.s3.default_acl} if self.s3.default_acl else {}
+
+    def presign(self, name, content_type, size):
+        expires = settings.UPLOAD_URL_EXPIRES
+        if settings.UPLOAD_PRESIGN_METHOD == 'post':
+            fields = {'Content-Type': content_type}
+            conditions = [{'Content-Type': content_type}, ['content-length-range', 1, size]]
+            if self.s3.default_acl:
+                fields['acl'] = self.s3.default_acl
+                conditions.append({'acl': self.s3.default_acl})
+            post = self.client.generate_presigned_post(
+                self.name, self.key(name), Fields=fields, Conditions=conditions, ExpiresIn=expires,
+            )
+            return {'method': 'POST', 'url': post['url'], 'fields': post['fields'], 'expires_in': expires}
+
+        # PUT: type, length and ACL are signed, so the client must send exactly these
+        params = {'Bucket': self.name, 'Key': self.key(name), 'ContentType': content_type, 'ContentLength': size}
+        params.update(self._acl())
+        url = self.client.generate_presigned_url('put_object', Params=params, ExpiresIn=expires)
+        headers = {'Content-Type': content_type}
+        if self.s3.default_acl:
+            headers['x-amz-acl'] = self.s3.default_acl
+        return {'method': 'PUT', 'url': url, 'headers': headers, 'expires_in': expires}
+
+    def size(self, name):
+        """Size in bytes, or None if there is no such object."""
+        try:
+            return self.client.head_object(Bucket=self.name, Key=self.key(name))['ContentLength']
+        except self.client.exceptions.ClientError as exc:
+            if exc.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def header(self, name):
+        response = self.client.get_object(Bucket=self.name, Key=self.key(name), Range=f'bytes=0-{HEADER_BYTES - 1}')
+        return response['Body'].read()
+
+    def move(self, source, target, content_type):
+        """Server-side copy, then delete the source: no bytes pass through this process."""
+        params = {
+            **self.s3.get_object_parameters(target), **self._acl(),
+            'ContentType': content_type, 'MetadataDirective': 'REPLACE',
+        }
+        self.client.copy_object(
+            Bucket=self.name, Key=self.key(target), CopySource={'Bucket': self.name, 'Key': self.key(source)}, **params,
+        )
+        self.delete(source)
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.name, Key=self.key(name))
+
+
+# -------------------------------------------------------------
+# CHUNKED UPLOADS
+# -------------------------------------------------------------
+CHUNKED_SALT = 'api.uploads.chunked'
+# Request bodies are copied to disk in blocks of this size
+STREAM_BLOCK = 64 * 1024
+
+
+class ChunkedUploadRequestSerializer(UploadRequestSerializer):
+    caption = serializers.CharField(max_length=200, required=False, allow_blank=True, default='')
+
+
+def chunk_size():
+    # The first chunk must hold the whole image header (see inspect_image)
+    return max(settings.UPLOAD_CHUNK_SIZE, HEADER_BYTES)
+
+
+def purge_chunked_uploads():
+    """Delete partial uploads nobody has written to in UPLOAD_CHUNKED_EXPIRES."""
+    cutoff = time.time() - settings.UPLOAD_CHUNKED_EXPIRES
+    for path in Path(settings.UPLOAD_TEMP_DIR).glob('*'):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class ChunkedUpload:
+    """
+    A partly received file in UPLOAD_TEMP_DIR. Only complete chunks are
+    kept, so the file's length is always the offset to resume from.
+    """
+
+    def __init__(self, name, size):
+        self.size = size
+        self.path = Path(settings.UPLOAD_TEMP_DIR) / posixpath.basename(name)
+        # Once saved: the stored file's name, for clients retrying the last chunk
+        self.done_path = self.path.with_name(self.path.name + '.done')
+        self._lock_file = None
+
+    def create(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=False)
+
+    @property
+    def offset(self):
+        """Bytes received so far; None once the upload is finished, abandoned or purged."""
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return None
+
+    def expected(self, offset):
+        """Length of the chunk that starts at `offset`."""
+        return min(chunk_size(), self.size - offset)
+
+    def lock(self):
+        """One request writes an upload at a time, across workers. False if another one is.
+
+        An flock on the file itself: UPLOAD_TEMP_DIR is shared by every worker
+        (the cache may not be), and the lock goes away with a crashed process.
+        """
+        try:
+            self._lock_file = open(self.path, 'rb')
+        except FileNotFoundError:
+            return True   # Nothing left to write; the caller finds the offset gone
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.unlock()
+            return False
+        return True
+
+    def unlock(self):
+        if self._lock_file is not None:
+            self._lock_file.close()   # Releases the flock
+            self._lock_file = None
+
+    def write(self, stream, offset, length):
+        """Copy `length` bytes from `stream` to `offset`. If the stream ends
+        early (the connection dropped), nothing is kept and False is returned."""
+        with open(self.path, 'r+b') as out:
+            out.seek(offset)
+            remaining = length
+            while remaining:
+                block = stream.read(min(STREAM_BLOCK, remaining))
+                if not block:
+                    out.truncate(offset)
+                    return False
+                out.write(block)
+                remaining -= len(block)
+        return True
+
+    def header(self):
+        with open(self.path, 'rb') as source:
+            return source.read(HEADER_BYTES)
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    def finish(self, stored_name):
+        self.done_path.write_text(stored_name)
+        self.path.unlink()
+
+    def stored_name(self):
+        """Name the finished file was saved under; None if it was not."""
+        try:
+            return self.done_path.read_text()
+        except FileNotFoundError:
+            return None
+
+    def discard(self):
+        self.path.unlink(missing_ok=True)
+        self.done_path.unlink(missing_ok=True)
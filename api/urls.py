@@ -2,11 +2,11 @@ from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .views import (
     RegisterView, resolve_username, me_view, 
-    ProfileDetailView, UserPhotoListCreateView, UserPhotoDetailView,
+    ProfileDetailView, UserPhotoListCreateView, UserPhotoDetailView, PublicPhotoListView,
     EducationListCreateView, EducationDetailView,
     ExperienceListCreateView, ExperienceDetailView,
     SkillListCreateView, SkillDetailView,
-    toggle_like, PhotoCommentListView, PhotoCommentDetailView,
+    toggle_like, like_status_batch, PhotoCommentListView, PhotoCommentDetailView,
     google_auth,
     ChatListCreateView,
     ChatDetailView,
@@ -18,11 +18,13 @@ from .views import (
     DirectThreadListCreateView,
     DirectMessageListCreateView,
     DirectMessageDetailView,
+    dm_unread_count,
     message_reaction_view,
     chat_reaction_view,
     community_chat_reaction_view,
 )
 from .views_call import get_call_token
+from . import views_async, views_uploads
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='api-register'),
@@ -33,6 +35,14 @@ urlpatterns = [
     path('profile/', ProfileDetailView.as_view(), name='api-profile'),
     path('photos/', UserPhotoListCreateView.as_view(), name='api-photos-list'),
     path('photos/<int:pk>/', UserPhotoDetailView.as_view(), name='api-photos-detail'),
+    path('users/<str:username>/photos/', PublicPhotoListView.as_view(), name='api-user-photos'),
+
+    # Direct-to-bucket uploads (presigned)
+    path('uploads/', views_uploads.create_upload, name='api-uploads'),
+    path('uploads/confirm/', views_uploads.confirm_upload, name='api-uploads-confirm'),
+    # Chunked, resumable uploads through Django
+    path('uploads/chunked/', views_uploads.create_chunked_upload, name='api-uploads-chunked'),
+    path('uploads/chunked/<str:upload_id>/', views_uploads.chunked_upload, name='api-uploads-chunked-detail'),
 
     # Education
     path('education/', EducationListCreateView.as_view(), name='api-education-list'),
@@ -51,6 +61,7 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     # Likes & Comments
     path('photos/<int:photo_id>/like/', toggle_like, name='api-photo-like'),
+    path('photos/likes/', like_status_batch, name='api-photo-likes'),
     path('photos/<int:photo_id>/comments/', PhotoCommentListView.as_view(), name='api-photo-comments'),
     path('comments/<int:pk>/', PhotoCommentDetailView.as_view(), name='api-comment-delete'),
 
@@ -71,6 +82,7 @@ urlpatterns = [
 
     # Direct Messages (1:1)
     path('dm/threads/', DirectThreadListCreateView.as_view(), name='api-dm-threads'),
+    path('dm/unread/', dm_unread_count, name='api-dm-unread'),
     path('dm/threads/<int:thread_id>/messages/', DirectMessageListCreateView.as_view(), name='api-dm-thread-messages'),
     path('dm/messages/<int:pk>/', DirectMessageDetailView.as_view(), name='api-dm-message-delete'),
     path('dm/messages/<int:message_id>/react/', message_reaction_view, name='api-dm-message-react'), # Added message reaction URL
@@ -80,4 +92,12 @@ urlpatterns = [
 
     # Calling
     path('call/token/<int:thread_id>/', get_call_token, name='api-call-token'),
+
+    # Async variants of the hot read paths (serve under ASGI)
+    path('async/chat/', views_async.chat_list, name='api-async-chat-list'),
+    path('async/communities/<int:community_id>/chat/', views_async.community_chat_list, name='api-async-community-chat-list'),
+    path('async/dm/threads/', views_async.dm_threads, name='api-async-dm-threads'),
+    path('async/dm/threads/<int:thread_id>/messages/', views_async.dm_messages, name='api-async-dm-thread-messages'),
+    path('async/presence/', views_async.presence, name='api-async-presence'),
+    path('async/photos/<int:photo_id>/like/', views_async.like_status, name='api-async-photo-like'),
 ]
@@ -1,10 +1,15 @@
 import time
 import os
 from rest_framework.exceptions import APIException
-try:
-    from agora_token_builder import RtcTokenBuilder
-except ImportError:
-    RtcTokenBuilder = None
+
+
+def _token_builder():
+    """agora_token_builder, imported on the first call; None if not installed."""
+    try:
+        from agora_token_builder import RtcTokenBuilder
+    except ImportError:
+        return None
+    return RtcTokenBuilder
 
 def generate_agora_token(channel_name, uid=0, role=1, expire_time_in_seconds=3600):
     """
@@ -25,6 +30,7 @@ def generate_agora_token(channel_name, uid=0, role=1, expire_time_in_seconds=360
     if not app_id or not app_certificate:
         raise APIException("Agora credentials not configured on server")
         
+    RtcTokenBuilder = _token_builder()
     if not RtcTokenBuilder:
         raise APIException("Agora library not installed")
 
@@ -9,6 +9,8 @@ from rest_framework.exceptions import PermissionDenied
 
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from core.media import media_url
+
 from .serializers import RegisterSerializer
 
 
@@ -91,7 +93,7 @@ def me_view(request):
         "profile": {
             "title": user.profile.title,
             "description": user.profile.description,
-            "avatar": user.profile.avatar.url if user.profile.avatar else None
+            "avatar": media_url(user.profile.avatar)
         }
     })
 
@@ -99,12 +101,20 @@ def me_view(request):
 # -------------------------------------------------------------
 # PROFILE MANAGEMENT (GET / UPDATE)
 # -------------------------------------------------------------
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from core.cache import CachedResponseMixin, cache_response, invalidate
+from core.pagination import KeysetPagination
 from homepage.models import Profile, UserPhoto, Education, Experience, Skill
 from .serializers import ProfileSerializer, UserPhotoSerializer, EducationSerializer, ExperienceSerializer, SkillSerializer
 
-class ProfileDetailView(generics.RetrieveUpdateAPIView):
+class ProfileDetailView(CachedResponseMixin, generics.RetrieveUpdateAPIView):
     serializer_class = ProfileSerializer
     permission_classes = [IsAuthenticated]
+    cache_timeout = 300
+    cache_tags = ('user:{user}',)
 
     def get_object(self):
         # Return the profile of the currently logged-in user
@@ -113,16 +123,51 @@ class ProfileDetailView(generics.RetrieveUpdateAPIView):
 # -------------------------------------------------------------
 # GALLERY MANAGEMENT (UPLOAD / LIST / DELETE)
 # -------------------------------------------------------------
-class UserPhotoListCreateView(generics.ListCreateAPIView):
+def photos_with_likes(photos, user):
+    """Annotate like_count and is_liked (for `user`) with per-row subqueries.
+
+    Unlike Count('likes') this needs no GROUP BY over the whole gallery, so
+    a LIMITed page only counts the likes of its own rows.
+    """
+    likes = PhotoLike.objects.filter(photo=OuterRef('pk')).order_by().values('photo').annotate(n=Count('*')).values('n')
+    if user.is_authenticated:
+        is_liked = Exists(PhotoLike.objects.filter(user=user, photo=OuterRef('pk')))
+    else:
+        is_liked = Value(False)
+    return photos.annotate(like_count=Coalesce(Subquery(likes), 0), is_liked=is_liked)
+
+
+class UserPhotoListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
+    """
+    GET /api/photos/?cursor=&limit=  -> The user's gallery, newest first, one page at a time
+    POST /api/photos/                -> Upload a photo
+    """
     serializer_class = UserPhotoSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    cache_timeout = 300
+    cache_tags = ('user:{user}',)
+    # like_count changes with every like
+    cache_item_tags = ('photo:{id}',)
 
     def get_queryset(self):
-        return UserPhoto.objects.filter(user=self.request.user).order_by('-created_at')
+        return photos_with_likes(UserPhoto.objects.filter(user=self.request.user), self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+class PublicPhotoListView(generics.ListAPIView):
+    """
+    GET /api/users/<username>/photos/?cursor=&limit=  -> Anyone's gallery, newest first (Public)
+    """
+    serializer_class = UserPhotoSerializer
+    permission_classes = [AllowAny]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        owner = get_object_or_404(User, username=self.kwargs['username'])
+        return photos_with_likes(UserPhoto.objects.filter(user=owner), self.request.user)
+
 class UserPhotoDetailView(generics.DestroyAPIView):
     queryset = UserPhoto.objects.all()
     serializer_class = UserPhotoSerializer
@@ -230,17 +275,25 @@ from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticate
 # -------------------------------------------------------------
 # LIKE FEATURE
 # -------------------------------------------------------------
-from homepage.models import PhotoLike, PhotoComment
+from collections import defaultdict
+
+from homepage.models import PhotoLike, PhotoComment, delete_rows
 from .serializers import CommentSerializer
 
-@api_view(['GET', 'POST'])
+@api_view(['GET', 'POST', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticatedOrReadOnly])
+@cache_response(timeout=300, tags=('photo:{photo_id}',))
 def toggle_like(request, photo_id):
     """
-    GET /api/photos/<id>/like/  -> Check status (Public)
-    POST /api/photos/<id>/like/ -> Toggle status (Auth only)
+    GET /api/photos/<id>/like/    -> Check status (Public)
+    POST /api/photos/<id>/like/   -> Toggle status (Auth only)
+    PUT /api/photos/<id>/like/    -> Like; liking twice is a no-op (Auth only)
+    DELETE /api/photos/<id>/like/ -> Unlike; likewise idempotent (Auth only)
     Returns: { "is_liked": bool, "like_count": int }
     """
+    if request.method in ('PUT', 'DELETE'):
+        return _set_like(request.user, photo_id, request.method == 'PUT')
+
     try:
         photo = UserPhoto.objects.get(id=photo_id)
     except UserPhoto.DoesNotExist:
@@ -276,6 +329,56 @@ def toggle_like(request, photo_id):
         "like_count": photo.likes.count()
     })
 
+def _set_like(user, photo_id, liked):
+    """One INSERT ... ON CONFLICT DO NOTHING or one DELETE, then the count, in one transaction.
+
+    Double clicks and retries cannot fail on unique_user_photo_like and
+    always end in the same state.
+    """
+    with transaction.atomic():
+        if liked:
+            PhotoLike.objects.bulk_create([PhotoLike(user=user, photo_id=photo_id)], ignore_conflicts=True)
+        else:
+            # One DELETE statement, without the post_delete signal (see below)
+            delete_rows(PhotoLike, user=user.pk, photo=photo_id)
+        like_count = (
+            UserPhoto.objects.filter(pk=photo_id).annotate(like_count=Count('likes'))
+            .values_list('like_count', flat=True).first()
+        )
+        if like_count is None:
+            transaction.set_rollback(True)
+            return Response({"detail": "Photo not found"}, status=404)
+    # No model signals were sent, so invalidate here (see homepage/signals.py)
+    invalidate(f'photo:{photo_id}')
+    return Response({"is_liked": liked, "like_count": like_count})
+
+# Most photos one like_status_batch call may ask about
+LIKES_BATCH_MAX = 100
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def like_status_batch(request):
+    """
+    GET /api/photos/likes/?ids=1,2,3  -> Like status of many photos at once (Public)
+    Returns: { "<id>": { "is_liked": bool, "like_count": int }, ... }
+    Unknown ids are left out. One query, however many photos.
+    """
+    try:
+        ids = {int(part) for part in request.query_params.get('ids', '').split(',') if part.strip()}
+    except ValueError:
+        return Response({"detail": "ids must be comma-separated photo ids."}, status=400)
+    if len(ids) > LIKES_BATCH_MAX:
+        return Response({"detail": f"Ask for at most {LIKES_BATCH_MAX} photos at a time."}, status=400)
+    if not ids:
+        return Response({})
+
+    rows = photos_with_likes(UserPhoto.objects.filter(pk__in=ids), request.user).values_list(
+        'pk', 'is_liked', 'like_count',
+    )
+    return Response({
+        str(pk): {"is_liked": is_liked, "like_count": like_count} for pk, is_liked, like_count in rows
+    })
+
 # -------------------------------------------------------------
 # COMMENT FEATURE
 # -------------------------------------------------------------
@@ -292,6 +395,23 @@ class PhotoCommentListView(generics.ListCreateAPIView):
         # Return only top-level comments (parent=None)
         return PhotoComment.objects.filter(photo_id=photo_id, parent=None).order_by('created_at')
 
+    def list(self, request, *args, **kwargs):
+        # Load the whole thread once and nest replies in Python instead of
+        # querying each comment's replies (and their authors) separately.
+        comments = (
+            PhotoComment.objects.filter(photo_id=self.kwargs['photo_id'])
+            .select_related('user__profile')
+            .order_by('created_at')
+        )
+        children = defaultdict(list)
+        for comment in comments:
+            children[comment.parent_id].append(comment)
+
+        context = self.get_serializer_context()
+        context['comment_children'] = children
+        serializer = self.get_serializer_class()(children[None], many=True, context=context)
+        return Response(serializer.data)
+
     def perform_create(self, serializer):
         photo_id = self.kwargs['photo_id']
         parent_id = self.request.data.get('parent_id')
@@ -335,8 +455,6 @@ class PhotoCommentDetailView(generics.DestroyAPIView):
 # -------------------------------------------------------------
 # GOOGLE AUTH LOGIN
 # -------------------------------------------------------------
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
 from django.conf import settings
 from django.contrib.auth import login
 
@@ -351,6 +469,10 @@ def google_auth(request):
     if not token:
         return Response({"detail": "Token required"}, status=400)
 
+    # Imported here: google.auth (and its crypto backends) is only needed for this endpoint
+    from google.oauth2 import id_token
+    from google.auth.transport import requests as google_requests
+
     try:
         # Verify Token
         CLIENT_ID = settings.GOOGLE_CLIENT_ID
@@ -404,18 +526,24 @@ def google_auth(request):
 # -------------------------------------------------------------
 # COMMUNITY CHAT (GLOBAL)
 # -------------------------------------------------------------
-from django.db.models import Count, Q
+from django.db.models import Count, Exists, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
 
 from homepage.models import (
     ChatMessage,
-    Community, CommunityMembership, Conversation, DirectMessage, MessageReaction, CommunityMessageReaction
+    Community, CommunityMembership, Conversation, ConversationReadCursor, DirectMessage,
 )
+from core.pubsub import chat_topic, community_members_topic, dm_topic, publish
+from homepage.unread import UnreadCounters
+from .recent import RecentChat
 from .serializers import (
     ChatMessageSerializer,
     CommunitySerializer,
     CommunityMemberSerializer,
     DirectThreadSerializer,
     DirectMessageSerializer,
+    LeanChatMessageSerializer,
+    LeanDirectMessageSerializer,
 )
 
 class ChatListCreateView(generics.ListCreateAPIView):
@@ -424,16 +552,26 @@ class ChatListCreateView(generics.ListCreateAPIView):
     POST /api/chat/ -> Post new message
     """
     serializer_class = ChatMessageSerializer
+    # Renders GET pages from .values() rows; set to None to use serializer_class
+    lean_serializer_class = LeanChatMessageSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         # Global chat = messages with no community
-        return ChatMessage.objects.filter(community__isnull=True).order_by('-created_at')[:50]
+        return (
+            ChatMessage.objects.filter(community__isnull=True)
+            .select_related('user__profile', 'community')
+            .order_by('-created_at')[:50]
+        )
 
     def list(self, request, *args, **kwargs):
         # We want oldest first for chat flow, so fetch recent desc -> reverse
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(reversed(queryset), many=True)
+        if self.lean_serializer_class:
+            # Served from the room's ring buffer: no query while it is warm
+            rows = RecentChat.get(None)
+            data = self.lean_serializer_class(rows, context=self.get_serializer_context()).data
+            return Response(data[::-1])
+        serializer = self.get_serializer(reversed(self.get_queryset()), many=True)
         return Response(serializer.data)
 
     def perform_create(self, serializer):
@@ -455,13 +593,32 @@ class ChatDetailView(generics.DestroyAPIView):
 # -------------------------------------------------------------
 # PRIVATE COMMUNITIES
 # -------------------------------------------------------------
-class CommunityListCreateView(generics.ListCreateAPIView):
+class CommunityListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
     serializer_class = CommunitySerializer
     permission_classes = [IsAuthenticated]
+    cache_timeout = 300
+    cache_tags = ('user:{user}',)
+    # member_count changes when anyone joins
+    cache_item_tags = ('community:{id}',)
 
     def get_queryset(self):
+        member_count = (
+            CommunityMembership.objects.filter(community=OuterRef('pk'))
+            .order_by()
+            .values('community')
+            .annotate(c=Count('pk'))
+            .values('c')
+        )
         return (
             Community.objects.filter(memberships__user=self.request.user)
+            .annotate(
+                member_count=Subquery(member_count),
+                is_admin=Exists(CommunityMembership.objects.filter(
+                    community=OuterRef('pk'),
+                    user=self.request.user,
+                    role=CommunityMembership.ROLE_ADMIN,
+                )),
+            )
             .distinct()
             .order_by('name')
         )
@@ -479,6 +636,10 @@ class CommunityListCreateView(generics.ListCreateAPIView):
             role=CommunityMembership.ROLE_ADMIN,
             added_by=self.request.user,
         )
+        publish(community_members_topic(community.pk), {
+            'event': 'membership.changed',
+            'user_id': self.request.user.pk,
+        })
 
 
 class CommunityMembersView(generics.ListCreateAPIView):
@@ -527,12 +688,18 @@ class CommunityMembersView(generics.ListCreateAPIView):
         if not created:
             return Response({'detail': 'User is already a member'}, status=status.HTTP_400_BAD_REQUEST)
 
+        publish(community_members_topic(community.pk), {
+            'event': 'membership.changed',
+            'user_id': user.pk,
+        })
+
         serializer = self.get_serializer(membership)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 class CommunityChatListCreateView(generics.ListCreateAPIView):
     serializer_class = ChatMessageSerializer
+    lean_serializer_class = LeanChatMessageSerializer
     permission_classes = [IsAuthenticated]
 
     def _get_community(self):
@@ -545,11 +712,20 @@ class CommunityChatListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         community = self._get_community()
         self._require_member(community)
-        return ChatMessage.objects.filter(community=community).order_by('-created_at')[:50]
+        return (
+            ChatMessage.objects.filter(community=community)
+            .select_related('user__profile', 'community')
+            .order_by('-created_at')[:50]
+        )
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(reversed(queryset), many=True)
+        if self.lean_serializer_class:
+            community = self._get_community()
+            self._require_member(community)
+            rows = RecentChat.get(community.pk)
+            data = self.lean_serializer_class(rows, context=self.get_serializer_context()).data
+            return Response(data[::-1])
+        serializer = self.get_serializer(reversed(self.get_queryset()), many=True)
         return Response(serializer.data)
 
     def perform_create(self, serializer):
@@ -622,14 +798,35 @@ class DirectThreadListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         # Important: we must count *all* participants, not only the join rows filtered by the current user.
         # We do this via conditional aggregates.
+        user = self.request.user
+        my_cursor = ConversationReadCursor.objects.filter(
+            conversation=OuterRef('conversation'), user=user,
+        ).values('last_read_message_id')[:1]
+        unread = (
+            DirectMessage.objects
+            .filter(conversation=OuterRef('pk'), pk__gt=Coalesce(Subquery(my_cursor), 0))
+            .exclude(sender=user)
+            .order_by()
+            .values('conversation')
+            .annotate(c=Count('pk'))
+            .values('c')
+        )
         return (
             Conversation.objects
             .annotate(
                 pcount=Count('participants', distinct=True),
-                me_count=Count('participants', filter=Q(participants=self.request.user), distinct=True),
+                me_count=Count('participants', filter=Q(participants=user), distinct=True),
+                unread_count=Coalesce(Subquery(unread), 0),
             )
             .filter(me_count=1, pcount=2)
-            .prefetch_related('participants', 'participants__profile', 'messages')
+            .prefetch_related(
+                'participants', 'participants__profile',
+                Prefetch(
+                    'messages',
+                    queryset=DirectMessage.objects.select_related('sender').order_by('-created_at')[:1],
+                    to_attr='latest_messages',
+                ),
+            )
             .order_by('-updated_at')
         )
 
@@ -681,35 +878,49 @@ class DirectMessageListCreateView(generics.ListCreateAPIView):
     """
 
     serializer_class = DirectMessageSerializer
+    lean_serializer_class = LeanDirectMessageSerializer
     permission_classes = [IsAuthenticated]
 
     def _get_thread(self):
-        thread = get_object_or_404(Conversation, pk=self.kwargs['thread_id'])
-        if not thread.participants.filter(pk=self.request.user.pk).exists():
-            raise PermissionDenied('You are not a participant in this thread.')
-        return thread
+        # Cached per request: list() needs the thread after get_queryset() already loaded it
+        if getattr(self, '_thread', None) is None:
+            thread = get_object_or_404(Conversation, pk=self.kwargs['thread_id'])
+            if not thread.participants.filter(pk=self.request.user.pk).exists():
+                raise PermissionDenied('You are not a participant in this thread.')
+            self._thread = thread
+        return self._thread
 
     def get_queryset(self):
         thread = self._get_thread()
-        return DirectMessage.objects.filter(conversation=thread).order_by('-created_at')[:50]
+        return (
+            DirectMessage.objects.filter(conversation=thread)
+            .select_related('sender__profile')
+            .order_by('-created_at')[:50]
+        )
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
-        
-        # Mark all unread messages from other users as read
         thread = self._get_thread()
-        thread.messages.filter(
-            is_read=False
-        ).exclude(
-            sender=request.user
-        ).update(is_read=True)
-        
-        serializer = self.get_serializer(reversed(queryset), many=True)
-        return Response(serializer.data)
+
+        # The other participant's cursor tells which of my messages they have read
+        cursors = dict(thread.read_cursors.values_list('user_id', 'last_read_message_id'))
+        my_cursor = cursors.pop(request.user.pk, 0)
+        self.read_upto = next(iter(cursors.values()), 0)
+
+        if self.lean_serializer_class:
+            data = self.lean_serializer_class(queryset, context=self.get_serializer_context()).data
+        else:
+            data = self.get_serializer(queryset, many=True).data
+
+        # Mark the thread read up to the newest message, unless it already is
+        if data and data[0]['id'] > my_cursor:
+            ConversationReadCursor.mark_read(request.user, thread, data[0]['id'])
+        return Response(data[::-1])
 
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
         ctx['request'] = self.request
+        ctx['read_upto'] = getattr(self, 'read_upto', 0)
         return ctx
 
     def perform_create(self, serializer):
@@ -728,6 +939,24 @@ class DirectMessageDetailView(generics.DestroyAPIView):
     def get_queryset(self):
         return DirectMessage.objects.filter(sender=self.request.user)
 
+    def perform_destroy(self, instance):
+        recipients = list(
+            instance.conversation.participants.exclude(pk=instance.sender_id).values_list('pk', flat=True)
+        )
+        instance.delete()
+        # The deleted message may still be counted in the recipients' badges
+        UnreadCounters.invalidate(recipients)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dm_unread_count(request):
+    """
+    GET /api/dm/unread/
+    Returns: { "unread_count": int } (total unread DMs, served from cache)
+    """
+    return Response({'unread_count': UnreadCounters.get_total(request.user)})
+
 
 # -------------------------------------------------------------
 # MESSAGE REACTIONS
@@ -750,18 +979,11 @@ def message_reaction_view(request, message_id):
         if not emoji:
             return Response({'detail': 'emoji is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Delete any existing reaction from this user on this message (to enforce one reaction per user)
-        MessageReaction.objects.filter(
-            message=message,
-            user=request.user
-        ).delete()
-        
-        # Create the new reaction
-        reaction = MessageReaction.objects.create(
-            message=message,
-            user=request.user,
-            emoji=emoji
-        )
+        # One upsert on (message, user): adds the reaction or replaces its emoji
+        message.set_reaction(request.user, emoji)
+        publish(dm_topic(message.conversation_id), {
+            'event': 'reaction.changed', 'message_id': message.pk, 'user_id': request.user.pk,
+        })
         
         return Response({
             'emoji': emoji,
@@ -773,14 +995,14 @@ def message_reaction_view(request, message_id):
         if not emoji:
             return Response({'detail': 'emoji is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        deleted = MessageReaction.objects.filter(
-            message=message,
-            user=request.user,
-            emoji=emoji
-        ).delete()[0]
+        deleted = message.remove_reaction(request.user, emoji)
+        if deleted:
+            publish(dm_topic(message.conversation_id), {
+                'event': 'reaction.changed', 'message_id': message.pk, 'user_id': request.user.pk,
+            })
         
         return Response({
-            'deleted': deleted > 0
+            'deleted': deleted
         }, status=status.HTTP_200_OK)
 # Add these two functions to the end of api/views.py
 
@@ -799,18 +1021,11 @@ def chat_reaction_view(request, message_id):
         if not emoji:
             return Response({'detail': 'emoji is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Delete any existing reaction to enforce one reaction per user
-        CommunityMessageReaction.objects.filter(
-            message=message,
-            user=request.user
-        ).delete()
-        
-        # Create new reaction
-        CommunityMessageReaction.objects.create(
-            message=message,
-            user=request.user,
-            emoji=emoji
-        )
+        # One upsert on (message, user): adds the reaction or replaces its emoji
+        message.set_reaction(request.user, emoji)
+        publish(chat_topic(None), {
+            'event': 'reaction.changed', 'message_id': message.pk, 'user_id': request.user.pk,
+        })
         
         return Response({'emoji': emoji, 'created': True}, status=status.HTTP_201_CREATED)
     
@@ -819,13 +1034,13 @@ def chat_reaction_view(request, message_id):
         if not emoji:
             return Response({'detail': 'emoji is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        deleted = CommunityMessageReaction.objects.filter(
-            message=message,
-            user=request.user,
-            emoji=emoji
-        ).delete()[0]
+        deleted = message.remove_reaction(request.user, emoji)
+        if deleted:
+            publish(chat_topic(None), {
+                'event': 'reaction.changed', 'message_id': message.pk, 'user_id': request.user.pk,
+            })
         
-        return Response({'deleted': deleted > 0}, status=status.HTTP_200_OK)
+        return Response({'deleted': deleted}, status=status.HTTP_200_OK)
 
 
 @api_view(['POST', 'DELETE'])
@@ -844,18 +1059,11 @@ def community_chat_reaction_view(request, community_id, message_id):
         if not emoji:
             return Response({'detail': 'emoji is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Delete any existing reaction to enforce one reaction per user
-        CommunityMessageReaction.objects.filter(
-            message=message,
-            user=request.user
-        ).delete()
-        
-        # Create new reaction
-        CommunityMessageReaction.objects.create(
-            message=message,
-            user=request.user,
-            emoji=emoji
-        )
+        # One upsert on (message, user): adds the reaction or replaces its emoji
+        message.set_reaction(request.user, emoji)
+        publish(chat_topic(community.pk), {
+            'event': 'reaction.changed', 'message_id': message.pk, 'user_id': request.user.pk,
+        })
         
         return Response({'emoji': emoji, 'created': True}, status=status.HTTP_201_CREATED)
     
@@ -864,10 +1072,10 @@ def community_chat_reaction_view(request, community_id, message_id):
         if not emoji:
             return Response({'detail': 'emoji is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        deleted = CommunityMessageReaction.objects.filter(
-            message=message,
-            user=request.user,
-            emoji=emoji
-        ).delete()[0]
+        deleted = message.remove_reaction(request.user, emoji)
+        if deleted:
+            publish(chat_topic(community.pk), {
+                'event': 'reaction.changed', 'message_id': message.pk, 'user_id': request.user.pk,
+            })
         
-        return Response({'deleted': deleted > 0}, status=status.HTTP_200_OK)
+        return Response({'deleted': deleted}, status=status.HTTP_200_OK)
@@ -0,0 +1,231 @@
+"""
+Async variants of the hottest read endpoints.
+
+DRF 3.14 views are synchronous, so these are plain Django async views that
+mirror the JSON of their DRF counterparts. Under an ASGI server
+(gunicorn -k uvicorn.workers.UvicornWorker core.asgi:application) a worker
+keeps serving other polls while one waits on the database.
+
+Routes live under /api/async/ next to the sync ones, so clients can switch
+per endpoint.
+"""
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from homepage.models import (
+    ChatMessage,
+    CommunityMembership,
+    Conversation,
+    ConversationReadCursor,
+    DirectMessage,
+    PhotoLike,
+    Profile,
+    UserPhoto,
+)
+from .serializers import ChatMessageSerializer, DirectMessageSerializer, DirectThreadSerializer
+
+
+ONLINE_WINDOW = timedelta(minutes=5)
+
+
+class _Request:
+    """Minimal stand-in for a DRF request so the existing serializers can be reused."""
+
+    def __init__(self, user):
+        self.user = user
+
+
+def _json(data, status=200):
+    # DRF's encoder handles datetimes the same way the sync endpoints do
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder)
+
+
+async def _authenticate(request):
+    """JWT user for the request or None. Token validation does one DB lookup."""
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def _unauthorized():
+    return _json({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+
+# -------------------------------------------------------------
+# CHAT (GLOBAL + COMMUNITY)
+# -------------------------------------------------------------
+async def _chat_messages(queryset, user):
+    messages = [
+        m async for m in queryset
+        .select_related('user__profile', 'community')
+        .order_by('-created_at')[:50]
+    ]
+    # Everything the serializer touches is loaded, so no DB access happens here
+    return ChatMessageSerializer(
+        reversed(messages), many=True, context={'request': _Request(user)}
+    ).data
+
+
+@require_GET
+async def chat_list(request):
+    """
+    GET /api/async/chat/ -> last 50 global messages (oldest first)
+    """
+    user = await _authenticate(request)
+    if not user:
+        return _unauthorized()
+    return _json(await _chat_messages(ChatMessage.objects.filter(community__isnull=True), user))
+
+
+@require_GET
+async def community_chat_list(request, community_id):
+    """
+    GET /api/async/communities/<id>/chat/ -> last 50 community messages (oldest first)
+    """
+    user = await _authenticate(request)
+    if not user:
+        return _unauthorized()
+    if not await CommunityMembership.objects.filter(community_id=community_id, user=user).aexists():
+        return _json({'detail': 'You are not a member of this community.'}, status=403)
+    return _json(await _chat_messages(ChatMessage.objects.filter(community_id=community_id), user))
+
+
+# -------------------------------------------------------------
+# DIRECT MESSAGES
+# -------------------------------------------------------------
+@require_GET
+async def dm_messages(request, thread_id):
+    """
+    GET /api/async/dm/threads/<id>/messages/ -> last 50 messages (oldest first)
+    Marks the thread read, like the sync endpoint.
+    """
+    user = await _authenticate(request)
+    if not user:
+        return _unauthorized()
+
+    thread = await Conversation.objects.filter(pk=thread_id).afirst()
+    if not thread:
+        return _json({'detail': 'No Conversation matches the given query.'}, status=404)
+    if not await thread.participants.filter(pk=user.pk).aexists():
+        return _json({'detail': 'You are not a participant in this thread.'}, status=403)
+
+    messages = [
+        m async for m in DirectMessage.objects
+        .filter(conversation=thread)
+        .select_related('sender__profile')
+        .order_by('-created_at')[:50]
+    ]
+    cursors = {
+        user_id: last_read async for user_id, last_read
+        in thread.read_cursors.values_list('user_id', 'last_read_message_id')
+    }
+    my_cursor = cursors.pop(user.pk, 0)
+    read_upto = next(iter(cursors.values()), 0)
+    if messages and messages[0].pk > my_cursor:
+        await sync_to_async(ConversationReadCursor.mark_read)(user, thread, messages[0].pk)
+
+    data = DirectMessageSerializer(
+        reversed(messages), many=True,
+        context={'request': _Request(user), 'read_upto': read_upto},
+    ).data
+    return _json(data)
+
+
+@require_GET
+async def dm_threads(request):
+    """
+    GET /api/async/dm/threads/ -> user's 1:1 threads, newest activity first
+    """
+    user = await _authenticate(request)
+    if not user:
+        return _unauthorized()
+
+    my_cursor = ConversationReadCursor.objects.filter(
+        conversation=OuterRef('conversation'), user=user,
+    ).values('last_read_message_id')[:1]
+    unread = (
+        DirectMessage.objects
+        .filter(conversation=OuterRef('pk'), pk__gt=Coalesce(Subquery(my_cursor), 0))
+        .exclude(sender=user)
+        .order_by()
+        .values('conversation')
+        .annotate(c=Count('pk'))
+        .values('c')
+    )
+    threads = [
+        t async for t in Conversation.objects
+        .annotate(
+            pcount=Count('participants', distinct=True),
+            me_count=Count('participants', filter=Q(participants=user), distinct=True),
+            unread_count=Coalesce(Subquery(unread), 0),
+        )
+        .filter(me_count=1, pcount=2)
+        .prefetch_related(
+            'participants', 'participants__profile',
+            Prefetch(
+                'messages',
+                queryset=DirectMessage.objects.select_related('sender').order_by('-created_at')[:1],
+                to_attr='latest_messages',
+            ),
+        )
+        .order_by('-updated_at')
+    ]
+
+    data = DirectThreadSerializer(threads, many=True, context={'request': _Request(user)}).data
+    return _json(data)
+
+
+# -------------------------------------------------------------
+# PRESENCE
+# -------------------------------------------------------------
+@require_GET
+async def presence(request):
+    """
+    GET /api/async/presence/?usernames=alice,bob
+    Returns: { "alice": true, "bob": false } (active within 5 minutes)
+    """
+    user = await _authenticate(request)
+    if not user:
+        return _unauthorized()
+
+    usernames = [u for u in request.GET.get('usernames', '').split(',') if u][:100]
+    cutoff = timezone.now() - ONLINE_WINDOW
+    online = {
+        username async for username in Profile.objects
+        .filter(user__username__in=usernames, last_activity__gte=cutoff)
+        .values_list('user__username', flat=True)
+    }
+    return _json({username: username in online for username in usernames})
+
+
+# -------------------------------------------------------------
+# LIKE STATUS
+# -------------------------------------------------------------
+@require_GET
+async def like_status(request, photo_id):
+    """
+    GET /api/async/photos/<id>/like/ -> { "is_liked": bool, "like_count": int }
+    Public, like the sync endpoint; is_liked is only true for a valid token.
+    """
+    if not await UserPhoto.objects.filter(pk=photo_id).aexists():
+        return _json({'detail': 'Photo not found'}, status=404)
+
+    user = await _authenticate(request)
+    is_liked = False
+    if user:
+        is_liked = await PhotoLike.objects.filter(user=user, photo_id=photo_id).aexists()
+    return _json({
+        'is_liked': is_liked,
+        'like_count': await PhotoLike.objects.filter(photo_id=photo_id).acount(),
+    })
@@ -0,0 +1,234 @@
+"""
+Upload endpoints that keep image bytes off the Django workers (see api/uploads.py).
+"""
+import posixpath
+
+from django.conf import settings
+from django.core.files import File
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from homepage.models import Profile, UserPhoto
+from .serializers import ProfileSerializer, UserPhotoSerializer
+from .uploads import (
+    CHUNKED_SALT,
+    Bucket,
+    ChunkedUpload,
+    ChunkedUploadRequestSerializer,
+    UploadConfirmSerializer,
+    UploadRequestSerializer,
+    chunk_size,
+    final_name,
+    inspect_image,
+    make_ticket,
+    pending_name,
+    purge_chunked_uploads,
+    read_ticket,
+)
+
+
+def _finished(request, kind, target):
+    """The response for an upload already saved as `target`, or None."""
+    context = {'request': request}
+    if kind == 'photo':
+        # Newest first: with content-addressed names the user may have the same image twice
+        photo = UserPhoto.objects.filter(user=request.user, image=target).order_by('-pk').first()
+        if photo is not None:
+            return Response(UserPhotoSerializer(photo, context=context).data)
+    elif Profile.objects.filter(user=request.user, avatar=target).exists():
+        return Response(ProfileSerializer(request.user.profile, context=context).data)
+    return None
+
+
+def _not_s3():
+    return Response(
+        {"detail": "Direct uploads need S3 media storage; upload through /api/photos/ or /api/profile/."},
+        status=status.HTTP_501_NOT_IMPLEMENTED,
+    )
+
+
+# -------------------------------------------------------------
+# DIRECT UPLOADS (PRESIGNED)
+# -------------------------------------------------------------
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_upload(request):
+    """
+    POST /api/uploads/ {"kind": "photo" | "avatar", "content_type": "image/jpeg", "size": 123456}
+    Returns: { "upload_id", "method", "url", "headers" (PUT) | "fields" (POST), "expires_in" }
+    """
+    serializer = UploadRequestSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    bucket = Bucket.for_media()
+    if bucket is None:
+        return _not_s3()
+
+    kind, content_type, size = (serializer.validated_data[key] for key in ('kind', 'content_type', 'size'))
+    name = pending_name(content_type)
+    return Response({
+        'upload_id': make_ticket(request.user, kind, name, content_type, size),
+        **bucket.presign(name, content_type, size),
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def confirm_upload(request):
+    """
+    POST /api/uploads/confirm/ {"upload_id": "...", "caption": "..."}
+    Verifies the uploaded object, then creates the photo (201) or sets the
+    avatar (200). Confirming the same upload again returns the same result.
+    """
+    serializer = UploadConfirmSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ticket = read_ticket(serializer.validated_data['upload_id'], request.user)
+    bucket = Bucket.for_media()
+    if bucket is None:
+        return _not_s3()
+
+    kind, pending, content_type = ticket['kind'], ticket['name'], ticket['content_type']
+    target = final_name(kind, pending)
+    context = {'request': request}
+
+    # Already confirmed (e.g. the client retried after a timeout)
+    finished = _finished(request, kind, target)
+    if finished is not None:
+        return finished
+
+    size = bucket.size(pending)
+    if size is None:
+        return Response({"detail": "Nothing was uploaded for this upload_id."}, status=status.HTTP_400_BAD_REQUEST)
+    if size > ticket['size']:
+        bucket.delete(pending)
+        return Response({"detail": "The file is larger than announced."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        inspect_image(bucket.header(pending), content_type)
+    except ValidationError:
+        bucket.delete(pending)
+        raise
+
+    bucket.move(pending, target, content_type)
+    if kind == 'photo':
+        photo = UserPhoto.objects.create(user=request.user, image=target, caption=serializer.validated_data['caption'])
+        return Response(UserPhotoSerializer(photo, context=context).data, status=status.HTTP_201_CREATED)
+    profile = request.user.profile
+    profile.avatar = target
+    profile.save(update_fields=['avatar'])
+    return Response(ProfileSerializer(profile, context=context).data)
+
+
+# -------------------------------------------------------------
+# CHUNKED, RESUMABLE UPLOADS
+# -------------------------------------------------------------
+def _progress(upload, offset, status_code=status.HTTP_200_OK):
+    return Response(
+        {'offset': offset, 'size': upload.size, 'chunk_size': chunk_size()},
+        status=status_code, headers={'Upload-Offset': str(offset)},
+    )
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_chunked_upload(request):
+    """
+    POST /api/uploads/chunked/ {"kind": "photo" | "avatar", "content_type", "size", "caption"}
+    Returns: { "upload_id", "offset": 0, "size", "chunk_size" }
+    """
+    serializer = ChunkedUploadRequestSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    purge_chunked_uploads()
+
+    name = pending_name(data['content_type'])
+    upload = ChunkedUpload(name, data['size'])
+    upload.create()
+    upload_id = make_ticket(
+        request.user, data['kind'], name, data['content_type'], data['size'],
+        salt=CHUNKED_SALT, caption=data['caption'],
+    )
+    return Response({'upload_id': upload_id, 'offset': 0, 'size': upload.size, 'chunk_size': chunk_size()},
+                    status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def chunked_upload(request, upload_id):
+    """
+    GET    /api/uploads/chunked/<upload_id>/ -> { "offset", "size", "chunk_size" }: where to resume
+    PUT    /api/uploads/chunked/<upload_id>/ with header Upload-Offset: <offset>
+           and the chunk's raw bytes as the body. Returns the new offset; after
+           the last chunk, the photo (201) or profile (200).
+    DELETE /api/uploads/chunked/<upload_id>/ -> abandon the upload
+    """
+    ticket = read_ticket(upload_id, request.user, salt=CHUNKED_SALT, max_age=settings.UPLOAD_CHUNKED_EXPIRES)
+    upload = ChunkedUpload(ticket['name'], ticket['size'])
+    if request.method == 'DELETE':
+        upload.discard()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    if upload.offset is None:
+        # Finished already: the client lost the response to its last chunk
+        stored_name = upload.stored_name()
+        finished = stored_name and _finished(request, ticket['kind'], stored_name)
+        if not finished:
+            return Response({"detail": "Unknown or abandoned upload."}, status=status.HTTP_404_NOT_FOUND)
+        return _progress(upload, upload.size) if request.method == 'GET' else finished
+    if request.method == 'GET':
+        return _progress(upload, upload.offset)
+
+    try:
+        start = int(request.headers['Upload-Offset'])
+    except (KeyError, ValueError):
+        return Response({"detail": "Send the chunk's position in the Upload-Offset header."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if not upload.lock():
+        return Response({"detail": "Another chunk of this upload is being written."}, status=status.HTTP_409_CONFLICT)
+    try:
+        offset = upload.offset
+        if offset is None:
+            return Response({"detail": "Unknown or abandoned upload."}, status=status.HTTP_404_NOT_FOUND)
+        if start != offset:
+            return _progress(upload, offset, status.HTTP_409_CONFLICT)
+        if offset < upload.size:
+            length = upload.expected(offset)
+            # Checked before reading the body: nothing past the announced size is ever read
+            if request.META.get('CONTENT_LENGTH') != str(length):
+                return Response({"detail": f"The chunk at offset {offset} must be {length} bytes."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if not upload.write(request.stream, offset, length):
+                return Response({"detail": "The chunk was cut off; resend it."}, status=status.HTTP_400_BAD_REQUEST)
+            if offset == 0:
+                try:
+                    inspect_image(upload.header(), ticket['content_type'])
+                except ValidationError:
+                    upload.discard()
+                    raise
+            if offset + length < upload.size:
+                return _progress(upload, offset + length)
+        return _save_chunked(request, ticket, upload)
+    finally:
+        upload.unlock()
+
+
+def _save_chunked(request, ticket, upload):
+    """Store the assembled file as the photo or avatar, then drop the temp file."""
+    name = posixpath.basename(ticket['name'])   # the field's upload_to is prepended
+    context = {'request': request}
+    with upload.open() as assembled:
+        if ticket['kind'] == 'photo':
+            photo = UserPhoto(user=request.user, caption=ticket['caption'])
+            photo.image.save(name, File(assembled), save=False)
+            photo.save()
+            stored = photo.image
+        else:
+            profile = request.user.profile
+            profile.avatar.save(name, File(assembled), save=False)
+            profile.save(update_fields=['avatar'])
+            stored = profile.avatar
+    upload.finish(stored.name)
+    if ticket['kind'] == 'photo':
+        return Response(UserPhotoSerializer(photo, context=context).data, status=status.HTTP_201_CREATED)
+    return Response(ProfileSerializer(profile, context=context).data)
@@ -0,0 +1,72 @@
+"""
+First-load JavaScript/CSS per page: unbundled modules against the bundles
+collectstatic builds (core/assets.py).
+
+Unbundled is what the browser fetched before: styles.css, plus the entry
+module and every module it imports, each as its own uncompressed request.
+Bundled is one stylesheet and one script, with the Brotli (or gzip) size
+WhiteNoise serves to browsers that accept it. No database or collectstatic
+run is needed.
+
+Usage (from the project root):
+    python benchmarks/assets.py
+"""
+import gzip
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from core.assets import STYLES, _parse, build_bundles  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FRONTEND = ROOT / 'frontend'
+
+
+def read(path):
+    return (FRONTEND / path).read_text(encoding='utf-8')
+
+
+def module_graph(entry):
+    seen, pending = [], [entry]
+    while pending:
+        path = pending.pop()
+        if path not in seen:
+            seen.append(path)
+            pending.extend(target for _, target in _parse(path, read(path))[0])
+    return seen
+
+
+def compressed(data):
+    return len(brotli.compress(data)) if brotli else len(gzip.compress(data, 9))
+
+
+def main():
+    pages = sorted(f'pages/{path.name}' for path in (FRONTEND / 'pages').glob('*.js'))
+    bundles = {name: content.encode() for name, content in build_bundles(read, pages).items()}
+    css = bundles['bundles/' + STYLES]
+    encoding = 'br' if brotli else 'gzip'
+
+    print(f"{'page':<18}{'unbundled':>20}{'bundled':>20}{'bundled, ' + encoding:>18}")
+    for page in pages:
+        graph = [STYLES] + module_graph(page)
+        raw = sum(len((FRONTEND / path).read_bytes()) for path in graph)
+        script = bundles['bundles/' + Path(page).name]
+        bundled = len(script) + len(css)
+        print(f'{Path(page).stem:<18}{raw:>10} B, {len(graph)} req{bundled:>12} B, 2 req'
+              f'{compressed(script) + compressed(css):>13} B')
+
+
+if __name__ == '__main__':
+    main()
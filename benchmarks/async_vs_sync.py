@@ -0,0 +1,198 @@
+"""
+Throughput of the async read endpoints (ASGI / uvicorn workers) against the
+sync DRF endpoints (gunicorn sync workers) at an equal memory budget.
+
+Each server kind is first booted with one worker to measure its resident
+memory; the worker count is then chosen so both kinds fit the same budget.
+Both servers share one database seeded by this script.
+
+Usage (from the project root, Linux):
+    DATABASE_URL=sqlite:////tmp/bench.sqlite3 python benchmarks/async_vs_sync.py \
+        --memory-budget 512 --concurrency 64 --duration 15
+"""
+import argparse
+import http.client
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from homepage.models import ChatMessage, Conversation, DirectMessage, Profile, UserPhoto  # noqa: E402
+
+
+# (label, sync path, async path); {thread} / {photo} are filled from the seed
+ENDPOINTS = [
+    ('chat list', '/api/chat/', '/api/async/chat/'),
+    ('dm messages', '/api/dm/threads/{thread}/messages/', '/api/async/dm/threads/{thread}/messages/'),
+    ('dm threads', '/api/dm/threads/', '/api/async/dm/threads/'),
+    ('like status', '/api/photos/{photo}/like/', '/api/async/photos/{photo}/like/'),
+]
+
+SERVERS = {
+    'sync': ['gunicorn', 'core.wsgi:application'],
+    'async': ['gunicorn', 'core.asgi:application', '-k', 'uvicorn.workers.UvicornWorker'],
+}
+
+
+def seed():
+    call_command('migrate', verbosity=0)
+    me, _ = User.objects.get_or_create(username='bench_me', defaults={'email': 'bench_me@example.com'})
+    other, _ = User.objects.get_or_create(username='bench_other', defaults={'email': 'bench_other@example.com'})
+    for user in (me, other):
+        Profile.objects.get_or_create(user=user)
+
+    thread = Conversation.objects.filter(participants=me).filter(participants=other).first()
+    if not thread:
+        thread = Conversation.objects.create()
+        thread.participants.add(me, other)
+        for i in range(50):
+            DirectMessage.objects.create(conversation=thread, sender=other if i % 2 else me, text=f'bench {i}')
+            ChatMessage.objects.create(user=other if i % 2 else me, text=f'bench {i}')
+
+    photo = UserPhoto.objects.filter(user=other).first() or UserPhoto.objects.create(
+        user=other, image='gallery/bench.jpg'
+    )
+    token = str(RefreshToken.for_user(me).access_token)
+    return {'thread': thread.pk, 'photo': photo.pk}, token
+
+
+# -------------------------------------------------------------
+# SERVER PROCESSES
+# -------------------------------------------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid):
+    """Resident memory of a process and all its descendants, in MB."""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            status = Path(f'/proc/{current}/status').read_text()
+            total += int(next(line.split()[1] for line in status.splitlines() if line.startswith('VmRSS')))
+            for task in Path(f'/proc/{current}/task').iterdir():
+                pending.extend(int(c) for c in (task / 'children').read_text().split())
+        except (FileNotFoundError, StopIteration, ProcessLookupError):
+            continue
+    return total / 1024
+
+
+def start_server(kind, workers, port):
+    cmd = SERVERS[kind] + ['-w', str(workers), '-b', f'127.0.0.1:{port}', '--log-level', 'warning']
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=os.environ.copy())
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/async/presence/')
+            conn.getresponse().read()
+            time.sleep(1)  # let every worker finish booting
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f'{kind} server did not start')
+
+
+def stop_server(proc):
+    proc.send_signal(signal.SIGTERM)
+    proc.wait(timeout=30)
+
+
+# -------------------------------------------------------------
+# LOAD
+# -------------------------------------------------------------
+def drive(port, path, token, concurrency, duration):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def worker():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local = []
+        while time.time() < stop_at:
+            started = time.perf_counter()
+            try:
+                conn.request('GET', path, headers={'Authorization': f'Bearer {token}'})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    raise OSError(response.status)
+                local.append(time.perf_counter() - started)
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--memory-budget', type=float, default=512, help='MB available to each server kind')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=15, help='seconds per endpoint')
+    args = parser.parse_args()
+
+    ids, token = seed()
+
+    workers = {}
+    for kind in SERVERS:
+        port = free_port()
+        proc = start_server(kind, 1, port)
+        per_worker = rss_mb(proc.pid)
+        stop_server(proc)
+        workers[kind] = max(1, int(args.memory_budget // per_worker))
+        print(f'{kind}: ~{per_worker:.0f} MB with one worker -> {workers[kind]} worker(s)')
+
+    print(f"\n{'endpoint':<14}{'server':<8}{'workers':>8}{'RSS MB':>9}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}")
+    for kind in SERVERS:
+        port = free_port()
+        proc = start_server(kind, workers[kind], port)
+        try:
+            for label, sync_path, async_path in ENDPOINTS:
+                path = (sync_path if kind == 'sync' else async_path).format(**ids)
+                latencies, errors = drive(port, path, token, args.concurrency, args.duration)
+                memory = rss_mb(proc.pid)
+                if latencies:
+                    q = statistics.quantiles(latencies, n=20)
+                    p50, p95 = statistics.median(latencies) * 1000, q[18] * 1000
+                else:
+                    p50 = p95 = float('nan')
+                print(f'{label:<14}{kind:<8}{workers[kind]:>8}{memory:>9.0f}'
+                      f'{len(latencies) / args.duration:>10.1f}{p50:>9.1f}{p95:>9.1f}{errors:>8}')
+        finally:
+            stop_server(proc)
+
+
+if __name__ == '__main__':
+    main()
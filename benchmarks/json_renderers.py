@@ -0,0 +1,95 @@
+"""
+Encode time of DRF's stdlib JSONRenderer against api.renderers.ORJSONRenderer
+on the payloads of GET /api/chat/ (50 messages with reactions) and
+GET /api/dm/threads/ (an inbox of 50 threads).
+
+The payloads are produced by the real views once; only rendering is timed.
+
+Usage (from the project root):
+    python benchmarks/json_renderers.py --rounds 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench_json.sqlite3'}"
+if not os.environ.get('MESSAGE_ENCRYPTION_KEY'):
+    from cryptography.fernet import Fernet
+    os.environ['MESSAGE_ENCRYPTION_KEY'] = Fernet.generate_key().decode()
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api.renderers import ORJSONRenderer, orjson  # noqa: E402
+from homepage.models import (  # noqa: E402
+    ChatMessage, CommunityMessageReaction, Conversation, DirectMessage, Profile,
+)
+
+
+def seed():
+    call_command('migrate', verbosity=0)
+    me, created = User.objects.get_or_create(username='bench_json_me')
+    Profile.objects.get_or_create(user=me, defaults={'avatar': 'avatars/bench_me.png'})
+    if created:
+        for i in range(50):
+            friend = User.objects.create(username=f'bench_json_{i}')
+            Profile.objects.create(user=friend, avatar=f'avatars/bench_{i}.png')
+            thread = Conversation.objects.create()
+            thread.participants.add(me, friend)
+            DirectMessage.objects.create(conversation=thread, sender=friend, text=f'hello from {i} 👋')
+            message = ChatMessage.objects.create(user=friend, text=f'chat message {i} with some text')
+            for reactor in (me, friend):
+                CommunityMessageReaction.objects.create(message=message, user=reactor, emoji='👍')
+    return me
+
+
+def payloads(me):
+    client = APIClient()
+    client.force_authenticate(me)
+    out = {}
+    for label, url in [('/api/chat/', '/api/chat/'), ('/api/dm/threads/', '/api/dm/threads/')]:
+        response = client.get(url)
+        assert response.status_code == 200, response.content[:200]
+        out[label] = response.data
+    return out
+
+
+def per_call(render, data, rounds):
+    render(data)  # warm up
+    started = time.perf_counter()
+    for _ in range(rounds):
+        render(data)
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=2000, help='renders per payload and renderer')
+    args = parser.parse_args()
+    if orjson is None:
+        sys.exit('orjson is not installed: pip install orjson')
+
+    stdlib, fast = JSONRenderer(), ORJSONRenderer()
+    print(f"{'payload':<20}{'bytes':>8}{'stdlib us':>12}{'orjson us':>12}{'speedup':>10}")
+    for label, data in payloads(seed()).items():
+        assert stdlib.render(data) == fast.render(data), f'{label}: renderers disagree'
+        slow_s, fast_s = per_call(stdlib.render, data, args.rounds), per_call(fast.render, data, args.rounds)
+        print(f'{label:<20}{len(fast.render(data)):>8}{slow_s * 1e6:>12.1f}{fast_s * 1e6:>12.1f}'
+              f'{slow_s / fast_s:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,326 @@
+"""
+Scenario-based load test for the API.
+
+Boots the project in-process on a threaded WSGI server against a local
+database (a fresh SQLite file unless DATABASE_URL is set), seeds users,
+threads, a community and a gallery, then replays realistic traffic:
+
+  dm       each virtual user polls its DM thread every 1s, sends now and then
+  chat     each virtual user polls community chat every 3s, posts now and then
+  gallery  browsing photos: like status, comments, like toggles
+  login    bursts of concurrent logins against /api/token/
+
+and reports, per endpoint: throughput, p50/p95/p99 latency, error count and
+SQL queries per request (counted server-side).
+
+Usage (from the project root):
+    python benchmarks/loadtest.py --users 20 --duration 30
+    python benchmarks/loadtest.py --scenarios dm,chat --users 50
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'loadtest.sqlite3'}"
+if not os.environ.get('MESSAGE_ENCRYPTION_KEY'):
+    from cryptography.fernet import Fernet
+    os.environ['MESSAGE_ENCRYPTION_KEY'] = Fernet.generate_key().decode()
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.urls import Resolver404, resolve  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from homepage.models import (  # noqa: E402
+    ChatMessage, Community, CommunityMembership, Conversation, DirectMessage,
+    PhotoComment, Profile, UserPhoto,
+)
+
+PASSWORD = 'Loadtest#2024'
+
+
+# -------------------------------------------------------------
+# STATS
+# -------------------------------------------------------------
+class Stats:
+    """Client-side latencies and server-side query counts, keyed by endpoint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.queries = defaultdict(list)
+
+    def record(self, key, seconds, ok):
+        with self.lock:
+            if ok:
+                self.latencies[key].append(seconds)
+            else:
+                self.errors[key] += 1
+
+    def record_queries(self, key, count):
+        with self.lock:
+            self.queries[key].append(count)
+
+    def report(self, duration):
+        keys = sorted(set(self.latencies) | set(self.errors))
+        print(f"\n{'endpoint':<38}{'reqs':>7}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}"
+              f"{'p99 ms':>9}{'errors':>8}{'q/req':>7}{'q max':>7}")
+        for key in keys:
+            lat = sorted(self.latencies[key])
+            queries = self.queries.get(key) or [0]
+            if len(lat) >= 2:
+                cuts = statistics.quantiles(lat, n=100)
+                p50, p95, p99 = (statistics.median(lat) * 1000, cuts[94] * 1000, cuts[98] * 1000)
+            elif lat:
+                p50 = p95 = p99 = lat[0] * 1000
+            else:
+                p50 = p95 = p99 = float('nan')
+            print(f"{key:<38}{len(lat):>7}{len(lat) / duration:>8.1f}{p50:>9.1f}{p95:>9.1f}"
+                  f"{p99:>9.1f}{self.errors[key]:>8}{statistics.mean(queries):>7.1f}{max(queries):>7}")
+
+
+def endpoint_key(method, path):
+    try:
+        name = resolve(path.split('?')[0]).url_name
+    except Resolver404:
+        name = path
+    return f"{method} {name}"
+
+
+# -------------------------------------------------------------
+# SERVER
+# -------------------------------------------------------------
+def serve(stats):
+    """Start the project on a random local port; returns the base URL."""
+    django_app = get_wsgi_application()
+
+    def app(environ, start_response):
+        # Runs in the request thread, so the wrapper sees exactly this request's SQL
+        count = [0]
+
+        def counter(execute, sql, params, many, context):
+            count[0] += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(counter):
+            response = django_app(environ, start_response)
+        stats.record_queries(endpoint_key(environ['REQUEST_METHOD'], environ['PATH_INFO']), count[0])
+        return response
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler, allow_reuse_address=True)
+    server.daemon_threads = True
+    server.set_app(app)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+# -------------------------------------------------------------
+# SEED
+# -------------------------------------------------------------
+def seed(users):
+    call_command('migrate', verbosity=0)
+    password = make_password(PASSWORD)
+    User.objects.filter(username__startswith='load_').delete()
+    people = User.objects.bulk_create(
+        User(username=f'load_{i}', email=f'load_{i}@example.com', password=password)
+        for i in range(users)
+    )
+    Profile.objects.bulk_create(Profile(user=u, title=f'{u.username} profile') for u in people)
+
+    community = Community.objects.create(name='Load test', created_by=people[0])
+    CommunityMembership.objects.bulk_create(
+        CommunityMembership(community=community, user=u,
+                            role=CommunityMembership.ROLE_ADMIN if i == 0 else CommunityMembership.ROLE_MEMBER)
+        for i, u in enumerate(people)
+    )
+    for i in range(50):
+        ChatMessage.objects.create(user=people[i % users], community=community, text=f'seed {i}')
+
+    # Pair users into DM threads
+    threads = {}
+    for i in range(0, users - 1, 2):
+        a, b = people[i], people[i + 1]
+        thread = Conversation.objects.create()
+        thread.participants.add(a, b)
+        for n in range(20):
+            DirectMessage.objects.create(conversation=thread, sender=a if n % 2 else b, text=f'seed {n}')
+        threads[a.pk] = threads[b.pk] = thread.pk
+
+    photos = []
+    for u in people:
+        for n in range(5):
+            photo = UserPhoto.objects.create(user=u, image=f'gallery/load_{u.pk}_{n}.jpg')
+            photos.append(photo.pk)
+            top = PhotoComment.objects.create(user=u, photo=photo, text='nice')
+            PhotoComment.objects.create(user=people[0], photo=photo, text='thanks', parent=top)
+
+    return {
+        'users': [
+            {'username': u.username, 'token': str(RefreshToken.for_user(u).access_token),
+             'thread': threads.get(u.pk)}
+            for u in people
+        ],
+        'community': community.pk,
+        'photos': photos,
+    }
+
+
+# -------------------------------------------------------------
+# CLIENT
+# -------------------------------------------------------------
+class Client:
+    def __init__(self, base, stats, token=None):
+        self.base, self.stats, self.token = base, stats, token
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base + path, data=data, method=method, headers=headers)
+        started = time.perf_counter()
+        ok = True
+        payload = None
+        try:
+            with urllib.request.urlopen(req, timeout=30) as res:
+                payload = res.read()
+        except (urllib.error.URLError, OSError):
+            ok = False
+        self.stats.record(endpoint_key(method, path), time.perf_counter() - started, ok)
+        return json.loads(payload) if ok and payload else None
+
+
+def paced(stop, interval, fn):
+    """Call fn every `interval` seconds (with jitter) until stop is set."""
+    time.sleep(random.uniform(0, interval))
+    while not stop.is_set():
+        started = time.time()
+        fn()
+        stop.wait(max(0.0, interval - (time.time() - started)))
+
+
+def dm_user(base, stats, user, stop):
+    if not user['thread']:
+        return
+    client = Client(base, stats, user['token'])
+    path = f"/api/dm/threads/{user['thread']}/messages/"
+    ticks = [0]
+
+    def tick():
+        client.request('GET', path)
+        ticks[0] += 1
+        if ticks[0] % 5 == 0:
+            client.request('GET', '/api/dm/threads/')
+        if random.random() < 0.1:
+            client.request('POST', path, {'text': 'load test message'})
+
+    paced(stop, 1.0, tick)
+
+
+def chat_user(base, stats, user, community, stop):
+    client = Client(base, stats, user['token'])
+    path = f'/api/communities/{community}/chat/'
+
+    def tick():
+        client.request('GET', path)
+        if random.random() < 0.05:
+            client.request('POST', path, {'text': 'load test chat'})
+
+    paced(stop, 3.0, tick)
+
+
+def gallery_user(base, stats, user, photos, stop):
+    client = Client(base, stats, user['token'])
+
+    def tick():
+        photo = random.choice(photos)
+        client.request('GET', f'/api/photos/{photo}/like/')
+        client.request('GET', f'/api/photos/{photo}/comments/')
+        if random.random() < 0.3:
+            client.request('POST', f'/api/photos/{photo}/like/')
+
+    paced(stop, 2.0, tick)
+
+
+def login_bursts(base, stats, users, burst, stop):
+    anonymous = Client(base, stats)
+
+    def tick():
+        batch = [threading.Thread(target=anonymous.request, args=(
+            'POST', '/api/token/', {'username': random.choice(users)['username'], 'password': PASSWORD},
+        )) for _ in range(burst)]
+        for t in batch:
+            t.start()
+        for t in batch:
+            t.join()
+
+    paced(stop, 10.0, tick)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20, help='virtual users per scenario')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of traffic')
+    parser.add_argument('--scenarios', default='dm,chat,gallery,login')
+    parser.add_argument('--login-burst', type=int, default=10, help='concurrent logins per burst')
+    args = parser.parse_args()
+    scenarios = set(args.scenarios.split(','))
+
+    print(f"Database: {connection.settings_dict['NAME']}")
+    data = seed(max(args.users, 2))
+    stats = Stats()
+    base = serve(stats)
+    stop = threading.Event()
+
+    workers = []
+    for user in data['users'][:args.users]:
+        if 'dm' in scenarios:
+            workers.append(threading.Thread(target=dm_user, args=(base, stats, user, stop)))
+        if 'chat' in scenarios:
+            workers.append(threading.Thread(target=chat_user, args=(base, stats, user, data['community'], stop)))
+        if 'gallery' in scenarios:
+            workers.append(threading.Thread(target=gallery_user, args=(base, stats, user, data['photos'], stop)))
+    if 'login' in scenarios:
+        workers.append(threading.Thread(
+            target=login_bursts, args=(base, stats, data['users'], args.login_burst, stop)))
+
+    print(f"Replaying {', '.join(sorted(scenarios))} with {args.users} users for {args.duration:.0f}s against {base}")
+    started = time.time()
+    for t in workers:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in workers:
+        t.join()
+    stats.report(time.time() - started)
+
+
+if __name__ == '__main__':
+    main()
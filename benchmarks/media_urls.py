@@ -0,0 +1,73 @@
+"""
+Per-row `.url` calls against core.media's memoized URL resolution.
+
+Builds one page worth of rows (default: 50, the chat/DM page size) whose
+avatars come from --distinct different files, as in a chat where a few
+people write most messages, and times rendering all their URLs:
+
+  * per-row .url    what serializers did: FieldFile -> storage.url per row
+  * media_url       core.media.media_url per row (memoized per file name)
+  * media_urls      one bulk call for the page (the lean serializers)
+
+The storage is the configured default (PublicS3Storage with the public
+custom domain), so no network or database is involved.
+
+Usage (from the project root):
+    python benchmarks/media_urls.py --rows 50 --distinct 10
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+
+import django  # noqa: E402
+
+django.setup()
+
+from core.media import media_url, media_urls  # noqa: E402
+from homepage.models import Profile  # noqa: E402
+
+
+def per_page(render, rounds):
+    render()  # warm up (fills the memo for the media_* variants)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        render()
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50, help='rows per page')
+    parser.add_argument('--distinct', type=int, default=10, help='different avatar files on the page')
+    parser.add_argument('--rounds', type=int, default=2000, help='pages rendered per variant')
+    args = parser.parse_args()
+
+    profiles = [Profile(avatar=f'avatars/user_{i % args.distinct}_photo.png') for i in range(args.rows)]
+    names = [profile.avatar.name for profile in profiles]
+
+    variants = {
+        'per-row .url': lambda: [profile.avatar.url for profile in profiles],
+        'media_url': lambda: [media_url(profile.avatar) for profile in profiles],
+        'media_urls (bulk)': lambda: media_urls(names),
+    }
+    expected = variants['per-row .url']()
+    assert variants['media_url']() == expected
+    assert [variants['media_urls (bulk)']()[name] for name in names] == expected
+
+    baseline = None
+    print(f"{'variant':<20}{'us / page':>12}{'speedup':>10}")
+    for label, render in variants.items():
+        seconds = per_page(render, args.rounds)
+        baseline = baseline or seconds
+        print(f'{label:<20}{seconds * 1e6:>12.1f}{baseline / seconds:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Rows per second of the lean chat/DM serializers against the DRF
+ModelSerializers they mirror.
+
+Each round renders one 50-message page exactly as the list views do:
+fetch (select_related for DRF, .values() for lean; both read reactions
+from each message's reaction_summary) and build the output dicts. Messages
+carry a few reactions each.
+
+Usage (from the project root):
+    python benchmarks/serializers.py --rounds 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench_serializers.sqlite3'}"
+if not os.environ.get('MESSAGE_ENCRYPTION_KEY'):
+    from cryptography.fernet import Fernet
+    os.environ['MESSAGE_ENCRYPTION_KEY'] = Fernet.generate_key().decode()
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+
+from api.serializers import (  # noqa: E402
+    ChatMessageSerializer, DirectMessageSerializer, LeanChatMessageSerializer, LeanDirectMessageSerializer,
+)
+from homepage.models import (  # noqa: E402
+    ChatMessage, CommunityMessageReaction, Conversation, DirectMessage, MessageReaction, Profile,
+)
+
+PAGE = 50
+
+
+class FakeRequest:
+    def __init__(self, user):
+        self.user = user
+
+
+def seed():
+    call_command('migrate', verbosity=0)
+    users = []
+    for i in range(5):
+        user, _ = User.objects.get_or_create(username=f'bench_ser_{i}')
+        Profile.objects.get_or_create(user=user, defaults={'avatar': f'avatars/bench_{i}.png'})
+        users.append(user)
+
+    if not ChatMessage.objects.filter(user=users[0]).exists():
+        thread = Conversation.objects.create()
+        thread.participants.add(users[0], users[1])
+        for i in range(PAGE):
+            chat = ChatMessage.objects.create(user=users[i % 5], text=f'bench chat {i}')
+            dm = DirectMessage.objects.create(conversation=thread, sender=users[i % 2], text=f'bench dm {i}')
+            for reactor in users[:i % 4]:
+                CommunityMessageReaction.objects.create(message=chat, user=reactor, emoji='👍')
+                MessageReaction.objects.create(message=dm, user=reactor, emoji='❤️')
+
+    thread = Conversation.objects.filter(participants=users[0]).filter(participants=users[1]).first()
+    return users[0], thread
+
+
+def rate(render, rounds):
+    render()  # warm up
+    started = time.perf_counter()
+    rows = 0
+    for _ in range(rounds):
+        rows += len(render())
+    return rows / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=200, help='pages rendered per serializer')
+    args = parser.parse_args()
+
+    me, thread = seed()
+    context = {'request': FakeRequest(me), 'read_upto': 0}
+
+    def chat_page():
+        return (
+            ChatMessage.objects.filter(community__isnull=True)
+            .select_related('user__profile', 'community')
+            .order_by('-created_at')[:PAGE]
+        )
+
+    def dm_page():
+        return (
+            DirectMessage.objects.filter(conversation=thread)
+            .select_related('sender__profile')
+            .order_by('-created_at')[:PAGE]
+        )
+
+    cases = [
+        ('chat', lambda: ChatMessageSerializer(chat_page(), many=True, context=context).data,
+         lambda: LeanChatMessageSerializer(chat_page(), context=context).data),
+        ('dm', lambda: DirectMessageSerializer(dm_page(), many=True, context=context).data,
+         lambda: LeanDirectMessageSerializer(dm_page(), context=context).data),
+    ]
+
+    print(f"{'page':<8}{'DRF rows/s':>14}{'lean rows/s':>14}{'speedup':>10}")
+    for label, drf, lean in cases:
+        assert drf() == lean(), f'{label}: lean output differs from DRF'
+        drf_rate, lean_rate = rate(drf, args.rounds), rate(lean, args.rounds)
+        print(f'{label:<8}{drf_rate:>14.0f}{lean_rate:>14.0f}{lean_rate / drf_rate:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
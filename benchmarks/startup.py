@@ -0,0 +1,126 @@
+"""
+Worker cold-start cost: what a fresh gunicorn worker pays before it can
+answer its first request.
+
+Boots the project in a clean child process the way core/wsgi.py does, then
+sends one request straight to the WSGI handler (GET /api/chat/ without a
+token: URL resolution, middleware, DRF and api.views all load, no database
+needed) and builds one media URL, as every chat/DM/gallery page does.
+It reports:
+
+  * time to first request (median of --rounds fresh processes)
+  * an `-X importtime` summary: the slowest top-level imports and the
+    project modules, cumulative
+  * which heavy optional libraries got imported (they should load on first
+    use only)
+
+Usage (from the project root):
+    python benchmarks/startup.py
+    python benchmarks/startup.py --json      # machine-readable, used by api.tests
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Loaded lazily by the project; none of them may be imported to serve the first request
+LAZY_MODULES = ['boto3', 'botocore', 'google.oauth2.id_token', 'agora_token_builder', 'cryptography.fernet']
+PROJECT_PACKAGES = ('api', 'core', 'homepage')
+
+CHILD = r"""
+import json, os, sys, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+booted = time.perf_counter()
+
+from wsgiref.util import setup_testing_defaults
+environ = {'PATH_INFO': '/api/chat/', 'REQUEST_METHOD': 'GET'}
+setup_testing_defaults(environ)
+status = []
+body = b''.join(application(environ, lambda s, h, exc_info=None: status.append(s)))
+# Every chat/DM/gallery page renders media URLs
+from django.core.files.storage import default_storage
+default_storage.url('avatars/startup-probe.png')
+done = time.perf_counter()
+print(json.dumps({
+    'boot_ms': (booted - started) * 1000,
+    'first_request_ms': (done - started) * 1000,
+    'status': status[0],
+    'loaded': {name: name in sys.modules for name in %r},
+}))
+""" % (LAZY_MODULES,)
+
+
+def run_child(importtime=False):
+    env = os.environ.copy()
+    env.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+    cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', CHILD]
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def parse_importtime(stderr):
+    """[(module, cumulative_us, depth)] from `-X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # One space after the bar, then two per nesting level
+        rows.append((name.strip(), int(cumulative), (len(name) - len(name.lstrip()) - 1) // 2))
+    return rows
+
+
+def measure(rounds=3, top=15):
+    timings = [run_child()[0] for _ in range(rounds)]
+    result, stderr = run_child(importtime=True)
+    rows = parse_importtime(stderr)
+    top_level = sorted((r for r in rows if r[2] == 0), key=lambda r: -r[1])[:top]
+    project = sorted(
+        ((name, us) for name, us, _ in rows if name.split('.')[0] in PROJECT_PACKAGES), key=lambda r: -r[1],
+    )[:top]
+    return {
+        'first_request_ms': statistics.median(t['first_request_ms'] for t in timings),
+        'boot_ms': statistics.median(t['boot_ms'] for t in timings),
+        'status': result['status'],
+        'loaded': result['loaded'],
+        'total_import_ms': sum(us for _, us, depth in rows if depth == 0) / 1000,
+        'top_imports': [(name, us / 1000) for name, us, _ in top_level],
+        'project_imports': [(name, us / 1000) for name, us in project],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=3, help='fresh processes to time')
+    parser.add_argument('--json', action='store_true', help='print the raw result as JSON')
+    args = parser.parse_args()
+
+    result = measure(args.rounds)
+    if args.json:
+        print(json.dumps(result))
+        return
+
+    print(f"Boot (django.setup + WSGI handler): {result['boot_ms']:.0f} ms")
+    print(f"Time to first request:             {result['first_request_ms']:.0f} ms  ({result['status']})")
+    print(f"Imports (-X importtime, total):     {result['total_import_ms']:.0f} ms\n")
+    print('Slowest top-level imports (cumulative ms):')
+    for name, ms in result['top_imports']:
+        print(f'  {ms:8.1f}  {name}')
+    print('\nProject modules (cumulative ms):')
+    for name, ms in result['project_imports']:
+        print(f'  {ms:8.1f}  {name}')
+    print('\nLazy dependencies imported by the first request:')
+    for name, loaded in result['loaded'].items():
+        print(f"  {'YES' if loaded else 'no ':>4}  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Per-page JavaScript bundles and minified CSS, built during collectstatic.
+
+Every page has an entry module in frontend/pages/ (landing.js,
+dashboard.js, ...). Unbundled, a page loads its entry plus each module it
+imports, one request apiece. BundledStaticFilesStorage turns every entry
+into a single bundles/<page>.js: the modules it imports, each wrapped in
+its own function scope (two modules may both declare QUICK_EMOJIS) and
+in dependency order, then minified. styles.css becomes bundles/styles.css.
+
+The bundles then go through the usual staticfiles pipeline: the manifest
+fingerprints their names (bundles/landing.3f2a9c1b7e4d.js) and WhiteNoise
+writes .gz and .br variants. It serves fingerprinted files with a
+far-future, immutable Cache-Control.
+
+The bundler covers the module syntax frontend/ uses: named imports from
+relative paths and `export` in front of a function, class or const/let/var
+declaration. Anything else fails the build instead of shipping a broken
+bundle.
+
+Minifying uses rjsmin and rcssmin, and Brotli variants need the brotli
+package. Without them, bundles are only concatenated and only gzip is
+written.
+
+Templates include a page's assets with {% page_styles %} and
+{% page_script 'dashboard' %} (homepage/templatetags/assets.py). When
+ASSET_BUNDLES is off (the default with DEBUG), they load the entry module
+and styles.css directly, so no build step is needed in development.
+"""
+import posixpath
+import re
+
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+PAGES_DIR = 'pages'
+BUNDLES_DIR = 'bundles'
+STYLES = 'styles.css'
+
+_IMPORT = re.compile(
+    r'''^[ \t]*import\s*\{([^}]*)\}\s*from\s*['"](\.{1,2}/[^'"]+)['"][ \t]*;?[ \t]*$''', re.M,
+)
+_EXPORT = re.compile(r'^export\s+((?:async\s+)?function\*?\s*|class\s+|(?:const|let|var)\s+)([A-Za-z_$][\w$]*)', re.M)
+_UNSUPPORTED = re.compile(r'^[ \t]*(import|export)\b(?!\s*\()', re.M)
+
+
+class BundleError(Exception):
+    pass
+
+
+def _module_var(path):
+    return '__module_' + re.sub(r'\W', '_', path.removesuffix('.js'))
+
+
+def _parse(path, source):
+    """(imports [(names, path)], exported names, body without import/export syntax)."""
+    imports = []
+    for match in _IMPORT.finditer(source):
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(path), match.group(2)))
+        imports.append(([name.strip() for name in match.group(1).split(',') if name.strip()], target))
+    body = _IMPORT.sub('', source)
+    exports = [match.group(2) for match in _EXPORT.finditer(body)]
+    body = _EXPORT.sub(r'\1\2', body)
+    leftover = _UNSUPPORTED.search(body)
+    if leftover:
+        line = body.count('\n', 0, leftover.start()) + 1
+        raise BundleError(f'{path}:{line}: unsupported module syntax for bundling')
+    return imports, exports, body
+
+
+def bundle_js(entry, read):
+    """One script for the module graph of `entry`; `read(path)` returns a module's source."""
+    order, parsed, visiting = [], {}, []
+
+    def visit(path):
+        if path in parsed:
+            return
+        if path in visiting:
+            raise BundleError(f"import cycle: {' -> '.join(visiting + [path])}")
+        visiting.append(path)
+        # CRLF -> LF is what the JS parser does to line terminators in template literals too
+        parsed[path] = _parse(path, read(path).lstrip('\ufeff').replace('\r\n', '\n'))
+        for _, target in parsed[path][0]:
+            visit(target)
+        visiting.pop()
+        order.append(path)
+
+    visit(entry)
+    parts = ['(() => {\n"use strict";\n']
+    for path in order:
+        imports, exports, body = parsed[path]
+        bindings = ''.join(
+            f"const {{ {', '.join(name.replace(' as ', ': ') for name in names)} }} = {_module_var(target)};\n"
+            for names, target in imports
+        )
+        if path == entry:
+            parts.append(f'// {path}\n{bindings}{body}\n')
+        else:
+            parts.append(
+                f'// {path}\nconst {_module_var(path)} = (() => {{\n{bindings}{body}\n'
+                f"return {{ {', '.join(exports)} }};\n}})();\n"
+            )
+    parts.append('})();\n')
+    return ''.join(parts)
+
+
+def minify_js(source):
+    return rjsmin.jsmin(source) if rjsmin else source
+
+
+def minify_css(source):
+    source = source.lstrip('\ufeff')
+    return rcssmin.cssmin(source) if rcssmin else source
+
+
+def build_bundles(read, pages):
+    """{bundle path: content} for every page entry and the stylesheet."""
+    bundles = {
+        f'{BUNDLES_DIR}/{posixpath.basename(page)}': minify_js(bundle_js(page, read))
+        for page in pages
+    }
+    bundles[f'{BUNDLES_DIR}/{STYLES}'] = minify_css(read(STYLES))
+    return bundles
+
+
+class BundledStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """WhiteNoise's manifest storage, plus the bundles built before hashing."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = {**paths, **self.build_bundles(paths)}
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def build_bundles(self, paths):
+        def read(path):
+            if path not in paths:
+                raise BundleError(f'{path} is not a collected static file')
+            with self.open(path) as handle:
+                return handle.read().decode('utf-8')
+
+        pages = sorted(
+            path for path in paths
+            if posixpath.dirname(path) == PAGES_DIR and path.endswith('.js')
+        )
+        collected = {}
+        for name, content in build_bundles(read, pages).items():
+            if self.exists(name):
+                self.delete(name)
+            self.save(name, ContentFile(content.encode('utf-8')))
+            collected[name] = (self, name)
+        return collected
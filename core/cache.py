@@ -0,0 +1,414 @@
+"""
+Two-level cache with tag invalidation and single-flight recomputation.
+
+    photos = layered_cache.get_or_set(
+        'photos:42', compute, timeout=300, tags=['user:42'],
+    )
+    invalidate('user:42')       # runs after the current transaction commits
+
+Level 1 is a small LRU inside this process, so a hit costs no round trip.
+Level 2 is the `default` cache from settings.CACHES, shared by every worker
+when it is Redis (REDIS_URL).
+
+Tags: every tag has a version counter in level 2. An entry stores the
+versions its tags had before it was computed and counts as a miss once any
+of them moves, so invalidating `user:42` is one INCR however many keys carry
+the tag. This process drops its local entries for the tag immediately;
+other processes drop theirs when the invalidation reaches them over
+core.pubsub, and no local entry outlives CACHE_LOCAL_TIMEOUT anyway.
+
+Stampedes: on a miss only one caller computes. Threads of a process wait
+for the one computing their key, and processes race for a short lock in
+level 2; the losers poll level 2 until the winner has stored the value, and
+compute it themselves only if the lock goes away without one.
+
+Cached values are shared between callers: treat them as read-only.
+
+Views opt in with CachedResponseMixin or @cache_response, below. The model
+signals that invalidate tags are in homepage/signals.py.
+"""
+import functools
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.connection import ConnectionProxy
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+INVALIDATE_TOPIC = 'cache.invalidate'
+_MISS = object()
+
+
+def is_shared(cache):
+    """Whether every worker process sees the same entries in `cache`
+    (a backend, or django.core.cache.cache)."""
+    if isinstance(cache, ConnectionProxy):
+        cache = caches[DEFAULT_CACHE_ALIAS]
+    # LocMemCache keeps a separate copy per process
+    return not isinstance(cache, LocMemCache)
+
+
+def _origin():
+    # Per process: workers forked from one master share module state
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+# -------------------------------------------------------------
+# LEVEL 1: PER-PROCESS LRU
+# -------------------------------------------------------------
+class LocalLRU:
+    """Thread-safe LRU of short-lived entries, indexed by tag."""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        # Bumped by every invalidation, so a value computed before one is not stored
+        self.generation = 0
+        self._entries = OrderedDict()   # key -> (expires_at, tags, value)
+        self._by_tag = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISS
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return _MISS
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def set(self, key, value, timeout, tags=(), generation=None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + timeout, tuple(tags), value)
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def drop_tags(self, tags):
+        with self._lock:
+            self.generation += 1
+            for tag in tags:
+                for key in list(self._by_tag.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._by_tag.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+
+# -------------------------------------------------------------
+# LAYERED CACHE
+# -------------------------------------------------------------
+class LayeredCache:
+    PREFIX = 'lc:'
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, alias='default', local_max_entries=1000, local_timeout=5, lock_timeout=10):
+        self.alias = alias
+        self.local = LocalLRU(local_max_entries)
+        self.local_timeout = local_timeout
+        self.lock_timeout = lock_timeout
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._subscription = None
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def _key(self, key):
+        return f'{self.PREFIX}{key}'
+
+    def _tag_key(self, tag):
+        return f'{self.PREFIX}tag:{tag}'
+
+    # ---- reads -------------------------------------------------
+    def get(self, key, default=None):
+        value = self._get(key)
+        return default if value is _MISS else value
+
+    def _get(self, key):
+        self._listen()
+        value = self.local.get(key)
+        if value is _MISS:
+            value = self._get_shared(key)
+        return value
+
+    def _get_shared(self, key):
+        entry = self.shared.get(self._key(key))
+        if entry is None:
+            return _MISS
+        expires_at, versions, value = entry
+        if versions:
+            tag_keys = {self._tag_key(tag): version for tag, version in versions.items()}
+            if self.shared.get_many(list(tag_keys)) != tag_keys:
+                return _MISS
+        self.local.set(key, value, min(self.local_timeout, expires_at - time.time()), versions)
+        return value
+
+    # ---- writes ------------------------------------------------
+    def set(self, key, value, timeout, tags=()):
+        self._store(key, value, timeout, self._tag_versions(tags))
+
+    def _store(self, key, value, timeout, versions, generation=None):
+        self.shared.set(self._key(key), (time.time() + timeout, versions, value), timeout)
+        self.local.set(key, value, min(self.local_timeout, timeout), versions, generation)
+
+    def _tag_versions(self, tags):
+        tag_keys = {tag: self._tag_key(tag) for tag in tags}
+        found = self.shared.get_many(list(tag_keys.values()))
+        versions = {}
+        for tag, tag_key in tag_keys.items():
+            if tag_key not in found:
+                # Start from the clock, not 1: if the counter gets evicted, the
+                # versions old entries remember must not come back
+                initial = time.time_ns() // 1000
+                if not self.shared.add(tag_key, initial, None):
+                    initial = self.shared.get(tag_key, initial)
+                found[tag_key] = initial
+            versions[tag] = found[tag_key]
+        return versions
+
+    def get_or_set(self, key, compute, timeout, tags=()):
+        """The cached value of `key`, computed once by `compute()` on a miss.
+
+        `tags` is a list of tags, or a callable returning the tags of a
+        computed value (e.g. one tag per row of a list).
+        """
+        value = self._get(key)
+        if value is not _MISS:
+            return value
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = threading.Event()
+        if not leader:
+            flight.wait(self.lock_timeout)
+            value = self._get(key)
+            if value is not _MISS:
+                return value
+            return self._compute(key, compute, timeout, tags)
+
+        try:
+            return self._compute_once(key, compute, timeout, tags)
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.set()
+
+    def _compute_once(self, key, compute, timeout, tags):
+        lock_key = self._key(f'lock:{key}')
+        if self.shared.add(lock_key, _origin(), self.lock_timeout):
+            try:
+                return self._compute(key, compute, timeout, tags)
+            finally:
+                self.shared.delete(lock_key)
+
+        # Another process is computing it
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.POLL_INTERVAL)
+            value = self._get_shared(key)
+            if value is not _MISS:
+                return value
+            if self.shared.get(lock_key) is None:
+                break
+        return self._compute(key, compute, timeout, tags)
+
+    def _compute(self, key, compute, timeout, tags):
+        generation = self.local.generation
+        # Read before computing: an invalidation during compute() makes the result a miss
+        versions = None if callable(tags) else self._tag_versions(tags)
+        value = compute()
+        if versions is None:
+            versions = self._tag_versions(tags(value))
+        self._store(key, value, timeout, versions, generation)
+        return value
+
+    # ---- invalidation -----------------------------------------
+    def invalidate(self, *tags):
+        """Invalidate every entry carrying one of `tags`, in all processes."""
+        self._bump(tags)
+        self.local.drop_tags(tags)
+        if not self._single_process():
+            from core.pubsub import publish
+
+            publish(INVALIDATE_TOPIC, {'tags': list(tags), 'origin': _origin()})
+
+    def _bump(self, tags):
+        for tag in tags:
+            try:
+                self.shared.incr(self._tag_key(tag))
+            except ValueError:
+                pass   # No version yet, so no entry carries the tag
+
+    def clear(self):
+        self.shared.clear()
+        self.local.clear()
+
+    # ---- other processes --------------------------------------
+    def _single_process(self):
+        from core.pubsub import InMemoryBroker, get_broker
+
+        return isinstance(get_broker(), InMemoryBroker)
+
+    def _listen(self):
+        if self._subscription is not None or self._single_process():
+            return
+        from core.pubsub import get_broker
+
+        with self._flights_lock:
+            if self._subscription is not None:
+                return
+            self._subscription = get_broker().subscribe([INVALIDATE_TOPIC])
+        threading.Thread(target=self._apply_remote, name='cache-invalidation', daemon=True).start()
+
+    def _apply_remote(self):
+        for event in self._subscription:
+            payload = event['payload']
+            if payload.get('origin') == _origin():
+                continue
+            tags = payload.get('tags') or []
+            if not is_shared(self.shared):
+                # Every process has its own level 2 too
+                self._bump(tags)
+            self.local.drop_tags(tags)
+
+
+layered_cache = LayeredCache(
+    local_max_entries=getattr(settings, 'CACHE_LOCAL_MAX_ENTRIES', 1000),
+    local_timeout=getattr(settings, 'CACHE_LOCAL_TIMEOUT', 5),
+    lock_timeout=getattr(settings, 'CACHE_LOCK_TIMEOUT', 10),
+)
+
+
+def invalidate(*tags):
+    """Invalidate `tags` once the current transaction commits."""
+    def run():
+        try:
+            layered_cache.invalidate(*tags)
+        except Exception:
+            logger.exception('Failed to invalidate %s', tags)
+
+    transaction.on_commit(run)
+
+
+# -------------------------------------------------------------
+# CACHED VIEWS
+# -------------------------------------------------------------
+class _NotCacheable(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def _plain(data):
+    # ReturnDict / ReturnList keep a reference to their serializer
+    if isinstance(data, dict):
+        return {key: _plain(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_plain(value) for value in data]
+    return data
+
+
+def _rows(data):
+    if isinstance(data, dict):
+        return data.get('results', [data])
+    return data
+
+
+def _cached_response(request, view_kwargs, respond, timeout, tags, item_tags):
+    user_id = request.user.pk if request.user.is_authenticated else None
+    path = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+    key = f"response:{user_id or 'anon'}:{path}"
+    static_tags = [tag.format(user=user_id, **view_kwargs) for tag in tags]
+    computed = []
+
+    def compute():
+        response = respond()
+        if response.status_code != 200:
+            raise _NotCacheable(response)
+        computed.append(True)
+        return _plain(response.data)
+
+    def tags_of(data):
+        return static_tags + [tag.format_map(row) for row in _rows(data) for tag in item_tags]
+
+    try:
+        data = layered_cache.get_or_set(key, compute, timeout, tags_of if item_tags else static_tags)
+    except _NotCacheable as exc:
+        return exc.response
+    response = Response(data)
+    response['X-Cache'] = 'MISS' if computed else 'HIT'
+    return response
+
+
+class CachedResponseMixin:
+    """Caches the GET responses of a DRF view, per user and URL.
+
+    cache_timeout    seconds in the shared cache; None disables caching
+    cache_tags       tag templates formatted with the URL kwargs and `user`
+                     (the requesting user's id), e.g. ('user:{user}',)
+    cache_item_tags  tag templates formatted with every row of the response,
+                     e.g. ('photo:{id}',)
+
+    Authentication and permission checks still run on every request; only
+    the handler is skipped on a hit. Non-200 responses are not cached.
+    """
+    cache_timeout = None
+    cache_tags = ()
+    cache_item_tags = ()
+
+    def get(self, request, *args, **kwargs):
+        respond = functools.partial(super().get, request, *args, **kwargs)
+        if self.cache_timeout is None:
+            return respond()
+        return _cached_response(request, kwargs, respond, self.cache_timeout, self.cache_tags, self.cache_item_tags)
+
+
+def cache_response(timeout, tags=(), item_tags=()):
+    """CachedResponseMixin for @api_view functions; only GET is cached.
+
+    Put it below @api_view and @permission_classes.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(request, *args, **kwargs):
+            respond = functools.partial(func, request, *args, **kwargs)
+            if request.method != 'GET':
+                return respond()
+            return _cached_response(request, kwargs, respond, timeout, tags, item_tags)
+        return wrapper
+    return decorator
@@ -0,0 +1,108 @@
+"""
+Read replicas for safe requests.
+
+Configured from DATABASE_REPLICA_URLS (comma-separated, see settings). Each
+URL becomes a `replicaN` database alias, and when there is at least one:
+
+  * ReplicaRoutingMiddleware marks GET/HEAD/OPTIONS requests as replica-safe
+    and picks one replica per request, so a request reads one snapshot.
+  * ReplicaRouter sends reads of replica-safe requests there. Writes, and
+    every read after the request's first write or inside a transaction,
+    go to `default`.
+  * Read-your-writes: a POST/PUT/PATCH/DELETE response sets a short-lived
+    cookie (REPLICA_PIN_SECONDS). Requests carrying it read from `default`
+    until it expires, so a client never misses its own write because a
+    replica is lagging.
+
+Without replicas the middleware removes itself and the router is not
+installed, so nothing changes.
+"""
+import contextvars
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = contextvars.ContextVar('replica_state', default=None)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+class _RequestState:
+    def __init__(self, replica):
+        self.replica = replica   # None: this request reads from default
+        self.wrote = False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None or state.wrote:
+            return DEFAULT_DB_ALIAS
+        # A transaction on default must see its own uncommitted rows
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as default
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """Put it early in MIDDLEWARE so every query of the request is routed."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.replicas = replica_aliases()
+        if not self.replicas:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _state.set(self._state_for(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(request, response)
+
+    async def __acall__(self, request):
+        token = _state.set(self._state_for(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(request, response)
+
+    def _state_for(self, request):
+        if request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES:
+            return _RequestState(random.choice(self.replicas))
+        return _RequestState(None)
+
+    def _pin(self, request, response):
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+        return response
@@ -0,0 +1,56 @@
+"""
+Media URLs resolved once per file name.
+
+Avatars and gallery images appear on almost every list row. Building each
+row's URL through the FieldFile means a fresh call into the storage
+backend: name cleaning, path joining and URI quoting, every time.
+media_url() and media_urls() resolve file names (or FieldFiles) and
+memoize the storage's answer per name.
+
+For a public bucket (no querystring auth) a file's URL is plain string
+formatting of its name (core/storage.py) and never changes, so it is
+cached for the life of the process. Signed URLs expire, so storages with
+querystring_auth are asked every time.
+
+Serializers use media_url() / media_urls() and MediaURLField (api/serializers.py);
+templates use {% load media %}{{ file|media_url }}.
+"""
+import functools
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+_resolvers = {}
+
+
+def _resolver(storage):
+    resolve = _resolvers.get(storage)
+    if resolve is None:
+        if getattr(storage, 'querystring_auth', False):
+            resolve = storage.url
+        else:
+            resolve = functools.lru_cache(maxsize=getattr(settings, 'MEDIA_URL_CACHE_SIZE', 10000))(storage.url)
+        _resolvers[storage] = resolve
+    return resolve
+
+
+def media_url(value, storage=None):
+    """URL of a FieldFile or a stored file name; None for an empty one."""
+    name = getattr(value, 'name', value)
+    if not name:
+        return None
+    return _resolver(storage or getattr(value, 'storage', None) or default_storage)(name)
+
+
+def media_urls(names, storage=None):
+    """{name: url} for many file names of one storage; empty names are skipped."""
+    resolve = _resolver(storage or default_storage)
+    return {name: resolve(name) for name in set(names) if name}
+
+
+@receiver(setting_changed)
+def _reset(setting, **kwargs):
+    if setting in ('STORAGES', 'MEDIA_URL', 'MEDIA_URL_CACHE_SIZE') or setting.startswith('AWS_'):
+        _resolvers.clear()
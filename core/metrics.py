@@ -0,0 +1,239 @@
+"""
+Per-request timing and Prometheus metrics.
+
+RequestTimingMiddleware measures, for every request:
+
+  total      wall time spent in Django (middleware + view + rendering)
+  db         number of SQL queries and the time spent executing them
+  serialize  time spent building DRF serializer `.data`
+
+and reports them twice: as a `Server-Timing` response header (shown per
+request in the browser's network panel) and as histograms served by
+`metrics_view` in the Prometheus text format. Histograms are labelled with
+the route name from the URLconf (e.g. `api-dm-thread-messages`), never
+the raw path, so label cardinality stays bounded.
+
+Metrics live in process memory: with several gunicorn workers each worker
+reports its own series, so scrape every worker or sum on the Prometheus side.
+"""
+import bisect
+import contextvars
+import hmac
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+# Timings of the request being handled. A context variable, not a thread
+# local, so it follows async views into sync_to_async() threads.
+_current = contextvars.ContextVar('request_timings', default=None)
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.serialize_depth = 0
+
+
+# -------------------------------------------------------------
+# HISTOGRAMS
+# -------------------------------------------------------------
+class Histogram:
+    """A labelled Prometheus histogram (cumulative buckets, _sum and _count)."""
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # One slot per bucket plus +Inf, then the running sum
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            labels = ','.join(f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {series[-1]}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return '\n'.join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Wall time spent handling the request.',
+    ('route', 'method', 'status'), SECONDS_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL queries executed per request.',
+    ('route', 'method'), COUNT_BUCKETS,
+)
+DB_SECONDS = Histogram(
+    'http_request_db_duration_seconds', 'Time spent executing SQL per request.',
+    ('route', 'method'), SECONDS_BUCKETS,
+)
+SERIALIZE_SECONDS = Histogram(
+    'http_request_serializer_duration_seconds', 'Time spent in DRF serializers per request.',
+    ('route', 'method'), SECONDS_BUCKETS,
+)
+REGISTRY = [REQUEST_SECONDS, DB_QUERIES, DB_SECONDS, SERIALIZE_SECONDS]
+
+
+# -------------------------------------------------------------
+# INSTRUMENTATION HOOKS
+# -------------------------------------------------------------
+def _record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_queries += 1
+        timings.db_seconds += time.perf_counter() - started
+
+
+def _install_query_recorder():
+    # Wrappers live on the connection objects, which are reused across
+    # requests, so install ours once per connection instead of per request.
+    for alias in connections:
+        wrappers = connections[alias].execute_wrappers
+        if _record_query not in wrappers:
+            wrappers.append(_record_query)
+
+
+def _timed_data(prop):
+    def data(self):
+        timings = _current.get()
+        if timings is None:
+            return prop.fget(self)
+        # Only the outermost .data counts; nested serializers run inside it
+        timings.serialize_depth += 1
+        started = time.perf_counter()
+        try:
+            return prop.fget(self)
+        finally:
+            timings.serialize_depth -= 1
+            if not timings.serialize_depth:
+                timings.serialize_seconds += time.perf_counter() - started
+    data._timed = True
+    return property(data)
+
+
+def _install_serializer_timer():
+    from rest_framework import serializers
+
+    # BaseSerializer covers read-only serializers such as the lean chat/DM ones
+    for cls in (serializers.BaseSerializer, serializers.Serializer, serializers.ListSerializer):
+        if not getattr(cls.data.fget, '_timed', False):
+            cls.data = _timed_data(cls.data)
+
+
+# -------------------------------------------------------------
+# MIDDLEWARE
+# -------------------------------------------------------------
+class RequestTimingMiddleware:
+    """Put it first in MIDDLEWARE so `total` covers the whole stack."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _install_serializer_timer()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        _install_query_recorder()
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        _install_query_recorder()
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - started)
+
+    def _finish(self, request, response, timings, total):
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={timings.db_seconds * 1000:.1f};desc="{timings.db_queries} queries"',
+            f'serialize;dur={timings.serialize_seconds * 1000:.1f}',
+        ])
+
+        match = request.resolver_match
+        if match is None or match.url_name == 'metrics':
+            return response
+        route = match.url_name or match.route
+        REQUEST_SECONDS.observe(total, route=route, method=request.method, status=response.status_code)
+        DB_QUERIES.observe(timings.db_queries, route=route, method=request.method)
+        DB_SECONDS.observe(timings.db_seconds, route=route, method=request.method)
+        SERIALIZE_SECONDS.observe(timings.serialize_seconds, route=route, method=request.method)
+        return response
+
+
+# -------------------------------------------------------------
+# /metrics
+# -------------------------------------------------------------
+def metrics_view(request):
+    """
+    GET /metrics -> all histograms in the Prometheus text format
+    Scrapers must send "Authorization: Bearer <METRICS_TOKEN>". Without a
+    token configured the endpoint is only open with DEBUG on.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    body = '\n'.join(histogram.render() for histogram in REGISTRY) + '\n'
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
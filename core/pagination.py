@@ -0,0 +1,97 @@
+"""
+Keyset (cursor) pagination over (created_at, id), newest first.
+
+OFFSET pagination reads and throws away every row before the page, so each
+page deeper into a big gallery costs more. A keyset page starts right after
+the last row the client has:
+
+    WHERE created_at < :t OR (created_at = :t AND id < :id)
+    ORDER BY created_at DESC, id DESC LIMIT n
+
+With an index on (..., created_at, id) that reads n rows however far in the
+page is. The id breaks ties between rows created in the same instant, so no
+row is skipped or repeated, and rows added meanwhile do not shift pages.
+
+Cursors are opaque to clients: url-safe base64 of "<created_at>|<id>".
+keyset_page() serves templates; KeysetPagination serves DRF list views.
+"""
+import base64
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+PAGE_SIZE = 24
+
+
+def encode_cursor(row):
+    raw = f'{row.created_at.isoformat()}|{row.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, id) of a cursor; None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split('|')
+        created_at, pk = parse_datetime(created_at), int(pk)
+    except ValueError:
+        return None
+    return (created_at, pk) if created_at is not None else None
+
+
+def keyset_queryset(queryset, position=None):
+    """`queryset` newest first, from just after `position` (a decoded cursor)."""
+    queryset = queryset.order_by('-created_at', '-pk')
+    if position is None:
+        return queryset
+    created_at, pk = position
+    # The redundant upper bound lets the database seek straight to the position
+    return queryset.filter(created_at__lte=created_at).filter(Q(created_at__lt=created_at) | Q(pk__lt=pk))
+
+
+def keyset_page(queryset, position=None, size=PAGE_SIZE):
+    """The `size` newest rows of `queryset` after `position`.
+
+    Returns (rows, cursor of the next page or None).
+    """
+    rows = list(keyset_queryset(queryset, position)[:size + 1])
+    if len(rows) > size:
+        return rows[:size], encode_cursor(rows[size - 1])
+    return rows, None
+
+
+class KeysetPagination(BasePagination):
+    """keyset_page() for DRF: ?cursor=<cursor>&limit=<n>.
+
+    Responses are {"next": <URL of the next page> | null, "results": [...]}.
+    """
+    page_size = PAGE_SIZE
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        position = None
+        if request.query_params.get('cursor'):
+            position = decode_cursor(request.query_params['cursor'])
+            if position is None:
+                raise ValidationError({'cursor': 'Invalid cursor.'})
+        rows, self.next_cursor = keyset_page(queryset, position, self.get_page_size(request))
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            return min(max(int(request.query_params['limit']), 1), self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), 'cursor', self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
@@ -0,0 +1,130 @@
+"""
+On-demand cProfile of production requests.
+
+ProfilingMiddleware profiles a request's view when either
+
+  * a staff user sends the `X-Profile: 1` header (JWT or session auth), or
+  * the request is picked by random sampling at PROFILE_SAMPLE_RATE (0..1).
+
+Each sample is written to PROFILE_DIR as a pair of files sharing one stem:
+`<stem>.prof` (cProfile stats, loadable with pstats / snakeviz) and
+`<stem>.json` (route, timing and every SQL statement with its duration).
+Only the newest PROFILE_KEEP samples are kept. Summarize them with
+`python manage.py profile_summary`.
+
+Async views are passed through unprofiled: cProfile follows the event loop
+thread, not the coroutine, so the numbers would mix unrelated requests.
+"""
+import cProfile
+import json
+import logging
+import random
+import time
+import uuid
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+
+
+def profile_dir():
+    return Path(getattr(settings, 'PROFILE_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def _is_staff(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return bool(result) and result[0].is_staff
+
+
+class ProfilingMiddleware:
+    """Put it last in MIDDLEWARE so the profile covers the view only."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+
+        requested = request.headers.get(PROFILE_HEADER) == '1' and _is_staff(request)
+        rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0)
+        if not requested and not (rate and random.random() < rate):
+            return self.get_response(request)
+
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries.append({'sql': sql, 'ms': round((time.perf_counter() - started) * 1000, 3)})
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        wrappers = [connections[alias].execute_wrapper(record) for alias in connections]
+        for wrapper in wrappers:
+            wrapper.__enter__()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            for wrapper in reversed(wrappers):
+                wrapper.__exit__(None, None, None)
+        total = time.perf_counter() - started
+
+        try:
+            stem = self._save(request, response, profiler, queries, total, 'header' if requested else 'sampled')
+        except OSError:
+            logger.exception('Could not write request profile')
+            return response
+        if requested:
+            response['X-Profile-Id'] = stem
+        return response
+
+    def _save(self, request, response, profiler, queries, total, trigger):
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        match = request.resolver_match
+        route = (match.url_name if match else None) or 'unmatched'
+        stem = f"{timezone.now():%Y%m%dT%H%M%S}-{route}-{uuid.uuid4().hex[:8]}"
+
+        profiler.dump_stats(directory / f'{stem}.prof')
+        (directory / f'{stem}.json').write_text(json.dumps({
+            'route': route,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'trigger': trigger,
+            'total_ms': round(total * 1000, 3),
+            'queries': queries,
+        }, indent=2))
+        self._rotate(directory)
+        return stem
+
+    def _rotate(self, directory):
+        keep = getattr(settings, 'PROFILE_KEEP', 200)
+        samples = sorted(directory.glob('*.prof'), key=lambda p: p.stat().st_mtime, reverse=True)
+        for old in samples[keep:]:
+            old.unlink(missing_ok=True)
+            old.with_suffix('.json').unlink(missing_ok=True)
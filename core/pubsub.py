@@ -0,0 +1,288 @@
+"""
+Cross-process publish/subscribe for application events.
+
+Gunicorn runs several worker processes, so an event raised in one worker
+("new message in conversation 42") has to travel through a broker to reach
+subscribers in the others. The backend is picked from settings:
+
+    PUBSUB_BROKER = {
+        'BACKEND': 'core.pubsub.PostgresBroker',   # or InMemoryBroker / RedisBroker
+        'OPTIONS': {'channel': 'app_events'},
+    }
+
+Publish with ``publish(topic, payload)``; it fires after the current
+transaction commits, so subscribers never see rolled-back rows.
+Subscribe with ``get_broker().subscribe(['dm.conversation.42'])`` and read
+events from the returned Subscription.
+"""
+import abc
+import fnmatch
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils.module_loading import import_string
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------------------------------------
+# TOPIC NAMES
+# -------------------------------------------------------------
+def dm_topic(conversation_id):
+    return f"dm.conversation.{conversation_id}"
+
+
+def chat_topic(community_id=None):
+    return f"chat.community.{community_id}" if community_id else "chat.global"
+
+
+def community_members_topic(community_id):
+    return f"community.{community_id}.members"
+
+
+# -------------------------------------------------------------
+# SUBSCRIPTIONS
+# -------------------------------------------------------------
+class Subscription:
+    """A bounded queue of events for a set of topic patterns.
+
+    Backpressure: publishers never block on a slow subscriber. When the
+    queue is full the oldest event is dropped and counted in `dropped`, so a
+    consumer can tell it missed events and resync from the database.
+    """
+
+    def __init__(self, broker, patterns, max_queue=1000):
+        self.broker = broker
+        self.patterns = list(patterns)
+        self.dropped = 0
+        self.closed = False
+        self._queue = queue.Queue(maxsize=max_queue)
+
+    def matches(self, topic):
+        return any(fnmatch.fnmatchcase(topic, pattern) for pattern in self.patterns)
+
+    def put(self, event):
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Next event as {'topic': ..., 'payload': ...}.
+
+        None on timeout, and right away once a closed subscription has no
+        events left; `closed` tells the two apart.
+        """
+        try:
+            event = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if event is None:
+            self.put(None)   # Keep the end marker for the next call
+        return event
+
+    def __iter__(self):
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+    def close(self):
+        self.closed = True
+        self.broker.unsubscribe(self)
+        self.put(None)
+
+
+# -------------------------------------------------------------
+# BROKERS
+# -------------------------------------------------------------
+class BaseBroker(abc.ABC):
+    """Fans events out to the subscriptions of this process.
+
+    Backends only move messages between processes: `_send` ships an event to
+    the transport and a listener feeds received events into `_dispatch`.
+    """
+
+    def __init__(self, channel='app_events', max_queue=1000, **options):
+        self.channel = channel
+        self.max_queue = max_queue
+        self._subscriptions = []
+        self._lock = threading.Lock()
+
+    def publish(self, topic, payload):
+        self._send({'topic': topic, 'payload': payload})
+
+    def subscribe(self, patterns, max_queue=None):
+        subscription = Subscription(self, patterns, max_queue or self.max_queue)
+        with self._lock:
+            self._subscriptions.append(subscription)
+            first = len(self._subscriptions) == 1
+        if first:
+            self._start_listener()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def _dispatch(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.matches(event['topic']):
+                subscription.put(event)
+
+    @abc.abstractmethod
+    def _send(self, event):
+        """Ship `event` to every process, this one included."""
+
+    def _start_listener(self):
+        pass
+
+
+class InMemoryBroker(BaseBroker):
+    """Single-process broker for tests and local development."""
+
+    def _send(self, event):
+        self._dispatch(event)
+
+
+class PostgresBroker(BaseBroker):
+    """LISTEN/NOTIFY on the default database; no extra infrastructure needed.
+
+    NOTIFY is transactional and limited to 8000 bytes per payload, so keep
+    payloads to ids and let subscribers load the rows.
+    """
+
+    def _send(self, event):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, json.dumps(event)])
+
+    def _start_listener(self):
+        threading.Thread(target=self._listen, name='pubsub-postgres', daemon=True).start()
+
+    # Seconds between reconnect attempts, doubling up to the maximum
+    RECONNECT_DELAY = 1
+    RECONNECT_MAX_DELAY = 30
+
+    def _listen(self):
+        import psycopg2
+
+        delay = self.RECONNECT_DELAY
+        while True:
+            conn = None
+            try:
+                conn = self._connect()
+                delay = self.RECONNECT_DELAY
+                self._receive(conn)
+            except Exception:
+                # Keep the thread alive: every subscriber of this process depends on it
+                logger.exception('Lost LISTEN connection on %s, reconnecting in %ss', self.channel, delay)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except psycopg2.Error:
+                        pass
+            time.sleep(delay)
+            delay = min(delay * 2, self.RECONNECT_MAX_DELAY)
+
+    def _connect(self):
+        import psycopg2
+
+        # Same parameters as Django's own connections, OPTIONS (sslmode, ...) included
+        conn = psycopg2.connect(**connections['default'].get_connection_params())
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return conn
+
+    def _receive(self, conn):
+        while True:
+            if select.select([conn], [], [], 5) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                try:
+                    self._dispatch(json.loads(notify.payload))
+                except ValueError:
+                    logger.warning('Dropping malformed pub/sub payload on %s', self.channel)
+
+
+class RedisBroker(BaseBroker):
+    """PUBLISH/SUBSCRIBE against any Redis-protocol server (Redis, Valkey, KeyDB)."""
+
+    def __init__(self, url='redis://localhost:6379/0', **options):
+        super().__init__(**options)
+        if redis is None:
+            raise ImportError("RedisBroker requires the 'redis' package")
+        self.client = redis.Redis.from_url(url)
+
+    def _send(self, event):
+        self.client.publish(self.channel, json.dumps(event))
+
+    def _start_listener(self):
+        threading.Thread(target=self._listen, name='pubsub-redis', daemon=True).start()
+
+    def _listen(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for message in pubsub.listen():
+            try:
+                self._dispatch(json.loads(message['data']))
+            except ValueError:
+                logger.warning('Dropping malformed pub/sub payload on %s', self.channel)
+
+
+# -------------------------------------------------------------
+# MODULE-LEVEL API
+# -------------------------------------------------------------
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker configured by settings.PUBSUB_BROKER."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                config = getattr(settings, 'PUBSUB_BROKER', {})
+                backend = import_string(config.get('BACKEND', 'core.pubsub.InMemoryBroker'))
+                _broker = backend(**config.get('OPTIONS', {}))
+    return _broker
+
+
+def publish(topic, payload):
+    """Publish `payload` on `topic` once the current transaction commits.
+
+    Failures are logged, never raised: real-time fan-out must not break the
+    request that produced the event.
+    """
+    def send():
+        try:
+            get_broker().publish(topic, payload)
+        except Exception:
+            logger.exception('Failed to publish %s', topic)
+
+    transaction.on_commit(send)
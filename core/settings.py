@@ -7,6 +7,7 @@ Generated by 'django-admin startproject' using Django 5.2.8.
 from pathlib import Path
 from datetime import timedelta   # ⭐ ADD THIS
 import os
+import importlib.util
 import mimetypes
 
 # FIX: Windows registry often maps .js to text/plain, breaking ES6 modules
@@ -58,8 +59,11 @@ INSTALLED_APPS = [
 # MIDDLEWARE (leave as default)
 # ---------------------------------------------------------------
 MIDDLEWARE = [
+    'core.metrics.RequestTimingMiddleware',  # first, so its timings cover everything below
+    'core.db_router.ReplicaRoutingMiddleware',  # no-op without DATABASE_REPLICA_URLS
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware', # ⭐ Add Whitenoise here
+    'core.throttling.RateLimitMiddleware',  # before sessions and auth: a 429 costs no query
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -67,6 +71,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'homepage.activenowuser.ActiveUserMiddleware',
+    'core.profiling.ProfilingMiddleware',  # last, so profiles cover the view only
 ]
 
 
@@ -100,6 +105,76 @@ DATABASES = {
     'default': dj_database_url.config(default=os.environ.get('DATABASE_URL'))
 }
 
+# Optional read replicas (see core/db_router.py): comma-separated URLs.
+# GET/HEAD requests read from them; writers stay on default for a short window.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+for number, url in enumerate(DATABASE_REPLICA_URLS, 1):
+    # Tests run against the default test database only
+    DATABASES[f'replica{number}'] = {**dj_database_url.parse(url), 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter'] if DATABASE_REPLICA_URLS else []
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '5'))
+
+
+# ---------------------------------------------------------------
+# PUB/SUB (cross-process event fan-out, see core/pubsub.py)
+# ---------------------------------------------------------------
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    PUBSUB_BROKER = {'BACKEND': 'core.pubsub.RedisBroker', 'OPTIONS': {'url': REDIS_URL}}
+elif 'postgresql' in DATABASES['default'].get('ENGINE', ''):
+    PUBSUB_BROKER = {'BACKEND': 'core.pubsub.PostgresBroker'}
+else:
+    PUBSUB_BROKER = {'BACKEND': 'core.pubsub.InMemoryBroker'}
+
+
+# ---------------------------------------------------------------
+# CACHING (shared level 2 of core/cache.py, unread counters)
+# ---------------------------------------------------------------
+if REDIS_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}}
+else:
+    # Per process: fine for one worker, counters and cached pages diverge with several
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Level 1: per-process LRU in front of CACHES['default']
+CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get('CACHE_LOCAL_MAX_ENTRIES', '1000'))
+CACHE_LOCAL_TIMEOUT = float(os.environ.get('CACHE_LOCAL_TIMEOUT', '5'))
+# How long other workers wait for the one recomputing a missing key
+CACHE_LOCK_TIMEOUT = int(os.environ.get('CACHE_LOCK_TIMEOUT', '10'))
+
+
+# ---------------------------------------------------------------
+# RATE LIMITS (core/throttling.py)
+# ---------------------------------------------------------------
+# URL name -> {method: [(scope, 'N/period'), ...]}; scope is 'user' (JWT) or 'ip'
+RATE_LIMITS = {
+    'api-chat-list': {'POST': [('user', '30/min')]},
+    'api-community-chat-list': {'POST': [('user', '30/min')]},
+    'api-dm-thread-messages': {'POST': [('user', '60/min')]},
+    'api-chat-react': {'POST': [('user', '60/min')], 'DELETE': [('user', '60/min')]},
+    'api-community-chat-react': {'POST': [('user', '60/min')], 'DELETE': [('user', '60/min')]},
+    'api-dm-message-react': {'POST': [('user', '60/min')], 'DELETE': [('user', '60/min')]},
+    # Open to anyone and answers whether an email has an account
+    'resolve-username': {'GET': [('ip', '10/min')]},
+}
+# Proxies in front of Django that append to X-Forwarded-For (Render has one)
+RATE_LIMIT_PROXIES = int(os.environ.get('RATE_LIMIT_PROXIES', '1' if 'RENDER' in os.environ else '0'))
+
+
+# ---------------------------------------------------------------
+# METRICS & PROFILING (core/metrics.py, core/profiling.py)
+# ---------------------------------------------------------------
+# /metrics requires "Authorization: Bearer <METRICS_TOKEN>"; unset, it is open with DEBUG only
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Request profiling (see core/profiling.py): staff can send "X-Profile: 1",
+# and PROFILE_SAMPLE_RATE (0..1) profiles a random share of all requests.
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', BASE_DIR / 'profiles'))
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '200'))
+
 
 # ---------------------------------------------------------------
 # PASSWORD VALIDATION (leave as default)
@@ -156,6 +231,10 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [ BASE_DIR / 'frontend' ]
 STATIC_ROOT = BASE_DIR / 'static'
 
+# Templates load per-page bundles built by collectstatic (core/assets.py);
+# off in development, where the unbundled modules are served as they are
+ASSET_BUNDLES = os.environ.get('ASSET_BUNDLES', str(not DEBUG)).lower() in ('1', 'true', 'yes')
+
 # Media Files (Uploads)
 MEDIA_URL = '/media/'
 # MEDIA_ROOT = BASE_DIR / 'media'  <-- Commented out for S3
@@ -163,14 +242,31 @@ MEDIA_URL = '/media/'
 # Supabase Storage (S3 Compatible)
 AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY')
-AWS_STORAGE_BUCKET_NAME = 'media'
-AWS_S3_ENDPOINT_URL = 'https://tyeszjpfmtmftibxibwj.supabase.co/storage/v1/s3'
+AWS_STORAGE_BUCKET_NAME = os.environ.get('AWS_STORAGE_BUCKET_NAME', 'media')
+# e.g. http://localhost:9000 for MinIO, http://localhost:5000 for moto_server
+AWS_S3_ENDPOINT_URL = os.environ.get('AWS_S3_ENDPOINT_URL', 'https://tyeszjpfmtmftibxibwj.supabase.co/storage/v1/s3')
 AWS_S3_REGION_NAME = 'ap-southeast-1'
-AWS_S3_FILE_OVERWRITE = False
+# Names are content hashes (core/storage.py): an overwrite rewrites the same bytes
+AWS_S3_FILE_OVERWRITE = True
 AWS_DEFAULT_ACL = 'public-read'
 AWS_QUERYSTRING_AUTH = False
 AWS_S3_ADDRESSING_STYLE = "path"
-AWS_S3_CUSTOM_DOMAIN = 'tyeszjpfmtmftibxibwj.supabase.co/storage/v1/object/public/media'
+AWS_S3_CUSTOM_DOMAIN = os.environ.get('AWS_S3_CUSTOM_DOMAIN', 'tyeszjpfmtmftibxibwj.supabase.co/storage/v1/object/public/media')
+
+# Direct uploads (api/uploads.py): the browser PUTs/POSTs images to the bucket
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 10 * 1024 * 1024))
+UPLOAD_MAX_PIXELS = int(os.environ.get('UPLOAD_MAX_PIXELS', 40_000_000))
+UPLOAD_URL_EXPIRES = int(os.environ.get('UPLOAD_URL_EXPIRES', '600'))
+# 'put' works with every S3-compatible store; 'post' lets S3 itself enforce the size
+UPLOAD_PRESIGN_METHOD = os.environ.get('UPLOAD_PRESIGN_METHOD', 'put')
+# Unconfirmed uploads; expire this prefix with a bucket lifecycle rule
+UPLOAD_PENDING_PREFIX = 'uploads/pending/'
+# Chunked, resumable uploads (api/uploads.py): parts are assembled on local disk,
+# so every worker that serves /api/uploads/chunked/ must share UPLOAD_TEMP_DIR
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 1024 * 1024))
+UPLOAD_TEMP_DIR = Path(os.environ.get('UPLOAD_TEMP_DIR', BASE_DIR / 'chunked_uploads'))
+# Partial uploads untouched for this long are deleted
+UPLOAD_CHUNKED_EXPIRES = int(os.environ.get('UPLOAD_CHUNKED_EXPIRES', 24 * 3600))
 
 STORAGES = {
     
@@ -187,10 +283,12 @@ STORAGES = {
         #     "custom_domain": SUPABASE_S3_CUSTOM_DOMAIN,
         # },
     "default": {
-        "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",
+        # S3 (django-storages); boto3 is only imported for uploads/deletes, see core/storage.py
+        "BACKEND": "core.storage.PublicS3Storage",
     },
     "staticfiles": {
-        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+        # WhiteNoise's fingerprinting + gzip/brotli, plus the page bundles
+        "BACKEND": "core.assets.BundledStaticFilesStorage",
     },
 }
 
@@ -213,6 +311,18 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Faster JSON encoding/decoding when orjson is installed (see api/renderers.py)
+if importlib.util.find_spec('orjson'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    )
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = (
+        'api.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    )
+
 
 # ---------------------------------------------------------------
 # ⭐ ADD SIMPLE JWT CONFIG HERE
@@ -0,0 +1,108 @@
+"""
+Media storage that does not import boto3 until it has to.
+
+Avatar and gallery URLs are rendered on almost every request. With a public
+bucket behind AWS_S3_CUSTOM_DOMAIN (and no querystring auth) S3Storage.url
+is plain string formatting, but importing storages.backends.s3 pulls in
+boto3, which costs every worker ~180 ms at startup. PublicS3Storage builds
+those URLs itself and only creates the real S3Storage for operations that
+talk to S3: uploads, deletes, reads and existence checks.
+
+Saved files are content-addressed: the name's basename is replaced by the
+SHA-256 of the bytes, so re-uploading an image stores nothing new. Which rows
+still use a file is tracked by homepage.models.MediaObject.
+"""
+import hashlib
+import posixpath
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import Storage
+from django.utils.encoding import filepath_to_uri
+from django.utils.functional import cached_property
+from storages.utils import clean_name, safe_join
+
+
+def content_name(name, content):
+    """`name` with its basename replaced by the SHA-256 of `content`, read in chunks."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    directory, basename = posixpath.split(name)
+    return posixpath.join(directory, digest.hexdigest() + posixpath.splitext(basename)[1].lower())
+
+
+class PublicS3Storage(Storage):
+    def __init__(self, **options):
+        self._options = options
+        self.custom_domain = options.get('custom_domain', getattr(settings, 'AWS_S3_CUSTOM_DOMAIN', None))
+        self.url_protocol = options.get('url_protocol', getattr(settings, 'AWS_S3_URL_PROTOCOL', None)) or 'https:'
+        self.location = options.get('location', getattr(settings, 'AWS_LOCATION', ''))
+        self.querystring_auth = options.get('querystring_auth', getattr(settings, 'AWS_QUERYSTRING_AUTH', True))
+
+    @cached_property
+    def backend(self):
+        from storages.backends.s3 import S3Storage
+
+        return S3Storage(**self._options)
+
+    def url(self, name, parameters=None, expire=None, http_method=None):
+        if not self.custom_domain or self.querystring_auth or parameters:
+            return self.backend.url(name, parameters, expire, http_method)
+        # Same output as S3Storage.url for a public custom domain
+        return f"{self.url_protocol}//{self.custom_domain}/{filepath_to_uri(safe_join(self.location, clean_name(name)))}"
+
+    # Everything else goes to S3
+    def open(self, name, mode='rb'):
+        return self.backend.open(name, mode)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = content_name(name, content)
+        from homepage.models import MediaObject
+
+        # Before the existence check, so purge_media cannot delete the file after it
+        MediaObject.touch(name)
+        if self.backend.exists(name):
+            return name  # Same bytes are already stored
+        return self.backend.save(name, content, max_length)
+
+    def delete(self, name):
+        return self.backend.delete(name)
+
+    def exists(self, name):
+        return self.backend.exists(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def size(self, name):
+        return self.backend.size(name)
+
+    def get_valid_name(self, name):
+        return self.backend.get_valid_name(name)
+
+    def get_available_name(self, name, max_length=None):
+        return self.backend.get_available_name(name, max_length)
+
+    def generate_filename(self, filename):
+        return self.backend.generate_filename(filename)
+
+    def get_modified_time(self, name):
+        return self.backend.get_modified_time(name)
+
+    def get_created_time(self, name):
+        return self.backend.get_created_time(name)
+
+    def get_accessed_time(self, name):
+        return self.backend.get_accessed_time(name)
+
+    def __getattr__(self, name):
+        # Backend-specific helpers (bucket, connection, get_object_parameters, ...)
+        if name.startswith('__') or name in ('_options', 'backend'):
+            raise AttributeError(name)
+        return getattr(self.backend, name)
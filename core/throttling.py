@@ -0,0 +1,212 @@
+"""
+Token-bucket rate limits per route, enforced before any database work.
+
+settings.RATE_LIMITS maps URL names to the limits of each method:
+
+    RATE_LIMITS = {
+        'api-chat-list': {'POST': [('user', '30/min')]},
+        'resolve-username': {'GET': [('ip', '10/min')]},
+    }
+
+A limit of 'N/period' (period: s, min, hour or day) is a bucket of N tokens
+that refills at N per period: a client may burst N requests, then goes on at
+the steady rate. Every request takes a token from each of its buckets. When
+one is empty the answer is 429 Too Many Requests, with Retry-After set to
+the seconds until a token is back.
+
+Scopes:
+
+  user  the user id in the request's JWT, read without a database query.
+        Requests without a valid token are counted by IP instead.
+  ip    the client address. Set RATE_LIMIT_PROXIES to the number of
+        proxies in front of Django, so it is read from X-Forwarded-For.
+
+RateLimitMiddleware sits before the session and authentication middleware
+and resolves the route itself, so a throttled request reaches neither the
+database nor the view.
+
+Buckets live in the default cache. On Redis a take is a single Lua script,
+so all workers share each bucket atomically. Other caches are updated under
+a process lock, which is exact for LocMemCache (per process anyway).
+"""
+import math
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'30/min' -> (capacity, tokens refilled per second)."""
+    count, period = rate.split('/')
+    return int(count), int(count) / PERIODS[period[0]]
+
+
+# -------------------------------------------------------------
+# BUCKETS
+# -------------------------------------------------------------
+class TokenBuckets:
+    """take() one token from a bucket in the cache; returns the seconds to wait, 0 if taken."""
+
+    PREFIX = 'ratelimit:'
+
+    # The Redis server's clock, so every worker refills by the same time
+    SCRIPT = """
+        local now = redis.call('TIME')
+        now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+        local capacity, refill = tonumber(ARGV[1]), tonumber(ARGV[2])
+        local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+        local tokens = tonumber(bucket[1]) or capacity
+        local stamp = tonumber(bucket[2]) or now
+        tokens = math.min(capacity, tokens + math.max(0, now - stamp) * refill)
+        local wait = 0
+        if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / refill end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'stamp', tostring(now))
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+        return tostring(wait)
+    """
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._script = None
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def take(self, key, capacity, refill):
+        key = f'{self.PREFIX}{key}'
+        # After this long the bucket is full again, which is what a missing key means
+        timeout = math.ceil(capacity / refill)
+        if isinstance(self.cache, RedisCache):
+            return self._take_redis(key, capacity, refill, timeout)
+
+        with self._lock:
+            now = time.time()
+            tokens, stamp = self.cache.get(key) or (capacity, now)
+            tokens = min(capacity, tokens + max(0.0, now - stamp) * refill)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / refill
+            self.cache.set(key, (tokens - 1 if not wait else tokens, now), timeout)
+        return wait
+
+    def _take_redis(self, key, capacity, refill, timeout):
+        key = self.cache.make_and_validate_key(key)
+        client = self.cache._cache.get_client(key, write=True)
+        if self._script is None:
+            self._script = client.register_script(self.SCRIPT)   # EVALSHA, loaded on first use
+        return float(self._script(keys=[key], args=[capacity, refill, timeout], client=client))
+
+
+buckets = TokenBuckets()
+
+
+# -------------------------------------------------------------
+# SCOPES
+# -------------------------------------------------------------
+def client_ip(request):
+    proxies = getattr(settings, 'RATE_LIMIT_PROXIES', 0)
+    if proxies:
+        forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if part.strip()]
+        if forwarded:
+            # Each proxy appends the address it got the request from; earlier entries can be forged
+            return forwarded[-min(proxies, len(forwarded))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def jwt_user_id(request):
+    """The user id of a valid access token in the request, or None (no database query)."""
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.settings import api_settings
+
+    auth = JWTAuthentication()
+    try:
+        header = auth.get_header(request)
+        raw = auth.get_raw_token(header) if header else None
+        if raw is None:
+            return None
+        return auth.get_validated_token(raw).get(api_settings.USER_ID_CLAIM)
+    except AuthenticationFailed:
+        # Malformed header (e.g. "Bearer a b"), or an invalid or expired token (InvalidToken);
+        # the view answers 401 itself
+        return None
+
+
+def scope_ident(scope, request):
+    if scope == 'user':
+        user_id = jwt_user_id(request)
+        if user_id is not None:
+            return f'user:{user_id}'
+    return f'ip:{client_ip(request)}'
+
+
+# -------------------------------------------------------------
+# MIDDLEWARE
+# -------------------------------------------------------------
+def _limits(request):
+    """(route, [(scope, rate), ...]) of the request; no limits -> (None, ())."""
+    rate_limits = getattr(settings, 'RATE_LIMITS', None)
+    if not rate_limits:
+        return None, ()
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return None, ()
+    limits = rate_limits.get(match.url_name, {}).get(request.method, ())
+    if limits:
+        request.resolver_match = match   # labels the 429 in core.metrics
+    return match.url_name, limits
+
+
+def _throttle(request, route, limits):
+    """A 429 response if a bucket of the request is empty, else None."""
+    wait = 0.0
+    for scope, rate in limits:
+        capacity, refill = parse_rate(rate)
+        ident = scope_ident(scope, request)
+        wait = max(wait, buckets.take(f'{route}:{request.method}:{ident}', capacity, refill))
+    if not wait:
+        return None
+    retry_after = math.ceil(wait)
+    response = JsonResponse(
+        {'detail': f'Request was throttled. Expected available in {retry_after} seconds.'}, status=429,
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+class RateLimitMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        route, limits = _limits(request)
+        if limits:
+            throttled = _throttle(request, route, limits)
+            if throttled is not None:
+                return throttled
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        route, limits = _limits(request)
+        if limits:
+            # The cache client blocks
+            throttled = await sync_to_async(_throttle)(request, route, limits)
+            if throttled is not None:
+                return throttled
+        return await self.get_response(request)
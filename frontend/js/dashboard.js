@@ -342,9 +342,18 @@ export function initDashboard() {
 
         // Load Photos
         async function loadPhotos() {
-            const res = await authFetch('/api/photos/');
+            // Follow the keyset pages: the API does not cap galleries at 6
+            const photos = [];
+            let url = '/api/photos/';
+            let res;
+            while (url) {
+                res = await authFetch(url);
+                if (!res.ok) break;
+                const page = await res.json();
+                photos.push(...page.results);
+                url = page.next;
+            }
             if (res.ok) {
-                const photos = await res.json();
 
                 // Update photo count display
                 const countSpan = document.getElementById('photo-count');
@@ -3,7 +3,8 @@ export function initPublicProfile() {
 
     console.log("Initializing Public Profile Lightbox...");
 
-    const galleryItems = document.querySelectorAll('.gallery-item');
+    const galleryGrid = document.getElementById('gallery-grid');
+    const gallerySentinel = document.getElementById('gallery-sentinel');
     const lightboxModal = document.getElementById('lightbox-modal');
     const lightboxImg = document.getElementById('lightbox-img');
     const lightboxCaption = document.getElementById('lightbox-caption');
@@ -200,6 +201,29 @@ export function initPublicProfile() {
     // Load skills on page load
     loadSkills();
 
+    // --- Like status of the whole gallery, one request per 100 photos ---
+    const likeStates = new Map(); // photo id (string) -> { is_liked, like_count }
+
+    async function loadLikeStates(photoIds) {
+        const headers = accessToken ? getAuthHeaders() : { 'Content-Type': 'application/json' };
+        for (let i = 0; i < photoIds.length; i += 100) {
+            const ids = photoIds.slice(i, i + 100).join(',');
+            try {
+                const res = await fetch(`/api/photos/likes/?ids=${ids}`, { headers });
+                if (!res.ok) continue;
+                const states = await res.json();
+                Object.entries(states).forEach(([id, state]) => likeStates.set(id, state));
+            } catch (err) {
+                console.error("Failed to load like status:", err);
+            }
+        }
+    }
+
+    function galleryPhotoIds(root) {
+        return [...root.querySelectorAll('.gallery-item[data-photo-id]')].map(img => img.dataset.photoId);
+    }
+    if (galleryGrid) loadLikeStates(galleryPhotoIds(galleryGrid));
+
     // --- 1. Load Data (Likes & Comments) ---
     async function loadPhotoData(photoId, isPolling = false) {
         // CRITICAL: Always ensure currentUser is loaded before rendering comments
@@ -218,13 +242,18 @@ export function initPublicProfile() {
             likeBtn.dataset.liked = "false";
         }
 
+        // Known from the batch load: show it right away, then refresh
+        if (!isPolling && likeStates.has(String(photoId))) {
+            const known = likeStates.get(String(photoId));
+            updateLikeUI(known.is_liked, known.like_count);
+        }
+
         try {
             // A. Fetch Likes Status
             const likeHeaders = accessToken ? getAuthHeaders() : { 'Content-Type': 'application/json' };
-            const likeRes = await fetch(`/api/photos/${photoId}/like/`, { headers: likeHeaders });
-
-            if (likeRes.ok) {
-                const likeData = await likeRes.json();
+            await loadLikeStates([photoId]);
+            const likeData = likeStates.get(String(photoId));
+            if (likeData && String(currentPhotoId) === String(photoId)) {
                 updateLikeUI(likeData.is_liked, likeData.like_count);
             }
 
@@ -418,12 +447,14 @@ export function initPublicProfile() {
             updateLikeUI(!isLiked, isLiked ? count - 1 : count + 1);
 
             try {
+                // PUT/DELETE set the state outright, so double clicks and retries cannot flip it back
                 const res = await fetch(`/api/photos/${currentPhotoId}/like/`, {
-                    method: 'POST',
+                    method: isLiked ? 'DELETE' : 'PUT',
                     headers: getAuthHeaders()
                 });
                 if (!res.ok) throw new Error();
                 const data = await res.json();
+                likeStates.set(String(currentPhotoId), data);
                 updateLikeUI(data.is_liked, data.like_count);
             } catch (err) {
                 console.error("Like failed", err);
@@ -491,43 +522,101 @@ export function initPublicProfile() {
 
 
     // --- 3. Lightbox Open Logic ---
-    galleryItems.forEach(item => {
-        item.addEventListener('click', (e) => {
-            e.stopPropagation();
-            const imgSrc = item.getAttribute('src');
-            const caption = item.getAttribute('data-caption');
-            const photoId = item.getAttribute('data-photo-id');
-
-            if (imgSrc) {
-                lightboxImg.src = imgSrc;
-                if (lightboxCaption) lightboxCaption.textContent = caption || '';
-
-                lightboxModal.classList.remove('hidden');
-                document.body.style.overflow = 'hidden';
-
-                if (photoId) {
-                    loadPhotoData(photoId, false); // Initial Load
-
-                    // Start Polling
-                    if (pollingInterval) clearInterval(pollingInterval);
-                    pollingInterval = setInterval(() => {
-                        // Check if still open and visible
-                        const isOpen = currentPhotoId && !document.getElementById('lightbox-modal').classList.contains('hidden');
-
-                        // Check if user is interacting (replying or typing)
-                        const isInteracting = replyingToId !== null || (commentInput && commentInput.value.trim().length > 0);
-
-                        console.log(`Polling: isOpen=${isOpen}, isInteracting=${isInteracting}, replyingToId=${replyingToId}`);
-
-                        if (isOpen && !isInteracting) {
-                            loadPhotoData(currentPhotoId, true);
-                        }
-                    }, 3000);
-                }
+    // Delegated, so photos appended by infinite scroll open too
+    if (galleryGrid) galleryGrid.addEventListener('click', (e) => {
+        const item = e.target.closest('.gallery-item');
+        if (!item) return;
+        e.stopPropagation();
+        const imgSrc = item.getAttribute('src');
+        const caption = item.getAttribute('data-caption');
+        const photoId = item.getAttribute('data-photo-id');
+
+        if (imgSrc) {
+            lightboxImg.src = imgSrc;
+            if (lightboxCaption) lightboxCaption.textContent = caption || '';
+
+            lightboxModal.classList.remove('hidden');
+            document.body.style.overflow = 'hidden';
+
+            if (photoId) {
+                loadPhotoData(photoId, false); // Initial Load
+
+                // Start Polling
+                if (pollingInterval) clearInterval(pollingInterval);
+                pollingInterval = setInterval(() => {
+                    // Check if still open and visible
+                    const isOpen = currentPhotoId && !document.getElementById('lightbox-modal').classList.contains('hidden');
+
+                    // Check if user is interacting (replying or typing)
+                    const isInteracting = replyingToId !== null || (commentInput && commentInput.value.trim().length > 0);
+
+                    console.log(`Polling: isOpen=${isOpen}, isInteracting=${isInteracting}, replyingToId=${replyingToId}`);
+
+                    if (isOpen && !isInteracting) {
+                        loadPhotoData(currentPhotoId, true);
+                    }
+                }, 3000);
             }
-        });
+        }
     });
 
+    // --- 4. Infinite Scroll ---
+    // The server renders the first page; data-next is the API URL of the next one
+    function createPhotoCard(photo) {
+        const card = document.createElement('div');
+        card.className = 'glass-card rounded-xl overflow-hidden hover:scale-[1.02] transition duration-300 cursor-pointer group';
+
+        const img = document.createElement('img');
+        img.src = photo.image;
+        img.dataset.caption = photo.caption || '';
+        img.dataset.photoId = photo.id;
+        img.loading = 'lazy';
+        img.className = 'w-full aspect-square object-cover gallery-item group-hover:opacity-90 transition';
+        card.appendChild(img);
+
+        if (photo.caption) {
+            const captionBox = document.createElement('div');
+            captionBox.className = 'p-4';
+            const text = document.createElement('p');
+            text.className = 'text-sm text-gray-300 truncate';
+            text.textContent = photo.caption;
+            captionBox.appendChild(text);
+            card.appendChild(captionBox);
+        }
+        return card;
+    }
+
+    let loadingPhotos = false;
+    async function loadMorePhotos() {
+        const next = galleryGrid.dataset.next;
+        if (!next || loadingPhotos) return;
+        loadingPhotos = true;
+        photoObserver.unobserve(gallerySentinel);
+        try {
+            const headers = accessToken ? getAuthHeaders() : { 'Content-Type': 'application/json' };
+            const res = await fetch(next, { headers });
+            if (!res.ok) throw new Error(`HTTP ${res.status}`);
+            const page = await res.json();
+            page.results.forEach(photo => {
+                galleryGrid.appendChild(createPhotoCard(photo));
+                // The page already carries each photo's like status
+                likeStates.set(String(photo.id), { is_liked: photo.is_liked, like_count: photo.like_count });
+            });
+            galleryGrid.dataset.next = page.next || '';
+            // Observing again re-checks the sentinel: still in view means load another page
+            if (page.next) photoObserver.observe(gallerySentinel);
+        } catch (err) {
+            console.error("Failed to load more photos:", err);
+        } finally {
+            loadingPhotos = false;
+        }
+    }
+
+    const photoObserver = new IntersectionObserver((entries) => {
+        if (entries.some(entry => entry.isIntersecting)) loadMorePhotos();
+    }, { rootMargin: '600px' });
+    if (galleryGrid && gallerySentinel && galleryGrid.dataset.next) photoObserver.observe(gallerySentinel);
+
     // Close Interaction
     function closeLightbox() {
         lightboxModal.classList.add('hidden');
@@ -0,0 +1,6 @@
+// Community chat "/community/"
+import { initAnimations } from '../js/animations.js';
+import { initCommunity } from '../js/community.js';
+
+initAnimations();
+initCommunity();
@@ -0,0 +1,6 @@
+// Dashboard "/dashboard/"
+import { initAnimations } from '../js/animations.js';
+import { initDashboard } from '../js/dashboard.js';
+
+initAnimations();
+initDashboard();
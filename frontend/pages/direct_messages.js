@@ -0,0 +1,6 @@
+// Direct messages "/messages/"
+import { initAnimations } from '../js/animations.js';
+import { initDirectMessages } from '../js/direct_messages.js';
+
+initAnimations();
+initDirectMessages();
@@ -0,0 +1,6 @@
+// Landing page "/" (homepage/index.html)
+import { initAnimations } from '../js/animations.js';
+import { initAuth } from '../js/signup_signin.js';
+
+initAnimations();
+initAuth();
@@ -0,0 +1,6 @@
+// Public profile "/u/<username>/"
+import { initAnimations } from '../js/animations.js';
+import { initPublicProfile } from '../js/public_profile.js';
+
+initAnimations();
+initPublicProfile();
@@ -1,11 +1,21 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.utils import timezone
 from .models import Profile
 
 class ActiveUserMiddleware:
+    # Works in both stacks so async views are not forced through a thread switch
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
         response = self.get_response(request)
         
         if request.user.is_authenticated:
@@ -26,3 +36,16 @@ class ActiveUserMiddleware:
                 pass
                 
         return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+
+        user = await request.auser()
+        if user.is_authenticated:
+            try:
+                profile, created = await Profile.objects.aget_or_create(user=user)
+                await profile.asave(update_fields=['last_activity'])
+            except Exception:
+                pass
+
+        return response
@@ -1,7 +1,6 @@
 """
 Message encryption utilities using Fernet symmetric encryption.
 """
-from cryptography.fernet import Fernet
 from django.conf import settings
 
 
@@ -11,6 +10,7 @@ class MessageEncryption:
     @staticmethod
     def get_cipher():
         """Get Fernet cipher instance using the encryption key from settings."""
+        from cryptography.fernet import Fernet  # deferred: only DM reads/writes need it
         key = settings.MESSAGE_ENCRYPTION_KEY
         if key:
             # Clean the key of whitespace and surrounding quotes
@@ -62,3 +62,26 @@ class MessageEncryption:
             # If decryption fails, might be unencrypted legacy message
             # Return as-is for backward compatibility during migration
             return ciphertext
+
+    @staticmethod
+    def decrypt_many(ciphertexts):
+        """
+        Decrypt a batch of messages with a single cipher instance.
+
+        Same per-message behaviour as decrypt(); building the Fernet cipher
+        once matters when a page of 50 messages is rendered every second.
+        """
+        ciphertexts = list(ciphertexts)
+        if not any(ciphertexts):
+            return ciphertexts
+        cipher = MessageEncryption.get_cipher()
+        plaintexts = []
+        for ciphertext in ciphertexts:
+            if not ciphertext:
+                plaintexts.append(ciphertext)
+                continue
+            try:
+                plaintexts.append(cipher.decrypt(ciphertext.encode()).decode())
+            except Exception:
+                plaintexts.append(ciphertext)
+        return plaintexts
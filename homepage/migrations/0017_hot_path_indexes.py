@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-19 12:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homepage', '0016_profile_last_activity_profile_slug'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['community', '-created_at'], name='chat_community_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='directmessage',
+            index=models.Index(fields=['conversation', '-created_at'], name='dm_conversation_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='directmessage',
+            index=models.Index(fields=['conversation', 'is_read', 'sender'], name='dm_conversation_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photocomment',
+            index=models.Index(fields=['photo', 'parent', 'created_at'], name='comment_photo_parent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userphoto',
+            index=models.Index(fields=['user', '-created_at'], name='photo_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 6.0 on 2026-10-19 12:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def cursors_from_read_flags(apps, schema_editor):
+    """Seed one cursor per participant at the newest message they had marked read."""
+    Conversation = apps.get_model('homepage', 'Conversation')
+    DirectMessage = apps.get_model('homepage', 'DirectMessage')
+    ConversationReadCursor = apps.get_model('homepage', 'ConversationReadCursor')
+
+    cursors = []
+    for convo in Conversation.objects.prefetch_related('participants'):
+        for user in convo.participants.all():
+            last_read = (
+                DirectMessage.objects
+                .filter(conversation=convo, is_read=True)
+                .exclude(sender=user)
+                .aggregate(last=Max('id'))['last']
+            )
+            if last_read:
+                cursors.append(ConversationReadCursor(
+                    user=user, conversation=convo, last_read_message_id=last_read,
+                ))
+    ConversationReadCursor.objects.bulk_create(cursors)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homepage', '0017_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationReadCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_message_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='directmessage',
+            index=models.Index(fields=['conversation', 'id'], name='dm_conversation_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='conversationreadcursor',
+            name='conversation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_cursors', to='homepage.conversation'),
+        ),
+        migrations.AddField(
+            model_name='conversationreadcursor',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dm_read_cursors', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='conversationreadcursor',
+            constraint=models.UniqueConstraint(fields=('user', 'conversation'), name='unique_user_conversation_cursor'),
+        ),
+        migrations.RunPython(cursors_from_read_flags, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='directmessage',
+            name='dm_conversation_unread_idx',
+        ),
+        migrations.RemoveField(
+            model_name='directmessage',
+            name='is_read',
+        ),
+    ]
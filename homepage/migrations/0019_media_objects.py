@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-19 13:11
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def count_existing_media(apps, schema_editor):
+    """One MediaObject per avatar or gallery file already stored, with its current uses."""
+    MediaObject = apps.get_model('homepage', 'MediaObject')
+    counts = Counter()
+    for model, field in (('Profile', 'avatar'), ('UserPhoto', 'image')):
+        names = apps.get_model('homepage', model).objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+        counts.update(names.values_list(field, flat=True))
+    MediaObject.objects.bulk_create(
+        [MediaObject(name=name, refs=refs) for name, refs in counts.items()], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homepage', '0018_conversationreadcursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaObject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('refs', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('refs__lte', 0)), fields=['updated_at'], name='media_unreferenced_idx')],
+            },
+        ),
+        migrations.RunPython(count_existing_media, migrations.RunPython.noop),
+    ]
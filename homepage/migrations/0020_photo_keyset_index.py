@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-19 13:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homepage', '0019_media_objects'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # New index first, so the gallery is never listed without one
+        migrations.AddIndex(
+            model_name='userphoto',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='photo_user_created_id_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='userphoto',
+            name='photo_user_created_idx',
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-19 13:25
+
+from django.db import migrations, models
+
+
+def summarize_existing_reactions(apps, schema_editor):
+    """Fill reaction_summary of every message that already has reactions."""
+    for message_model, reaction_model in (('DirectMessage', 'MessageReaction'),
+                                          ('ChatMessage', 'CommunityMessageReaction')):
+        Message = apps.get_model('homepage', message_model)
+        summaries = {}
+        rows = (
+            apps.get_model('homepage', reaction_model).objects
+            .order_by('message_id', 'created_at', 'pk')
+            .values_list('message_id', 'emoji', 'user_id', 'user__username')
+        )
+        for message_id, emoji, user_id, username in rows.iterator():
+            summaries.setdefault(message_id, {}).setdefault(emoji, []).append([user_id, username])
+        Message.objects.bulk_update(
+            [Message(pk=pk, reaction_summary=[[emoji, users] for emoji, users in summary.items()])
+             for pk, summary in summaries.items()],
+            ['reaction_summary'], batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homepage', '0020_photo_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='reaction_summary',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='directmessage',
+            name='reaction_summary',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(summarize_existing_reactions, migrations.RunPython.noop),
+    ]
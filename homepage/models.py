@@ -1,10 +1,122 @@
-from django.db import models
+from collections import Counter
+
+from django.db import IntegrityError, connections, models, router, transaction
 from django.contrib.auth.models import User
-from django.db.models import UniqueConstraint
+from django.db.models import F, UniqueConstraint
+from django.dispatch import Signal
 from django.utils.text import slugify
 from django.utils import timezone
 
-class Profile(models.Model):
+from core.pubsub import chat_topic, dm_topic, publish
+
+class TracksMediaFiles:
+    """Remembers the file names a row was loaded with, so homepage/signals.py
+    can move MediaObject references when `media_fields` change."""
+    media_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_media = {
+            name: value for name, value in zip(field_names, values)
+            if name in cls.media_fields and value is not models.DEFERRED
+        }
+        return instance
+
+
+def delete_rows(model, **filters):
+    """DELETE FROM the table of `model` WHERE each field equals its value
+    (field names as keyword arguments, plain ids for foreign keys).
+    Returns the number of rows deleted.
+
+    A single statement: QuerySet.delete() SELECTs the rows first whenever
+    delete signals have receivers, so it can send them. No signals are sent
+    here, so callers do their receivers' work themselves.
+    """
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    where = ' AND '.join(f'{quote(model._meta.get_field(name).column)} = %s' for name in filters)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {quote(model._meta.db_table)} WHERE {where}', list(filters.values()))
+        return cursor.rowcount
+
+
+# Sent with `message` after its reaction_summary changed (no post_save is sent)
+reactions_summarized = Signal()
+
+
+class SummarizesReactions:
+    """Keeps the message's reactions grouped by emoji in its own row
+    (`reaction_summary`), so pages of messages render without a reaction join.
+
+    The summary is [[emoji, [[user_id, username], ...]], ...] in reaction
+    order; a list, because jsonb does not keep object keys in order.
+    set_reaction()/remove_reaction() change a reaction and the summary in one
+    transaction. homepage/signals.py rebuilds it after any other reaction write.
+    """
+
+    def _locked_summary(self):
+        """The stored summary, with the row locked until the transaction ends:
+        concurrent reactions on one message then update it one after another."""
+        return type(self).objects.select_for_update().filter(pk=self.pk) \
+            .values_list('reaction_summary', flat=True).first()
+
+    def _save_summary(self, summary):
+        self.reaction_summary = [[emoji, users] for emoji, users in summary if users]
+        type(self).objects.filter(pk=self.pk).update(reaction_summary=self.reaction_summary)
+        reactions_summarized.send(sender=type(self), message=self)
+
+    def set_reaction(self, user, emoji):
+        """Add `user`'s reaction or change its emoji (INSERT ... ON CONFLICT UPDATE)."""
+        reaction_model = self.reactions.model
+        with transaction.atomic():
+            summary = self._locked_summary() or []
+            reaction_model.objects.bulk_create(
+                [reaction_model(message=self, user=user, emoji=emoji)],
+                update_conflicts=True,
+                unique_fields=['message', 'user'],
+                update_fields=['emoji', 'created_at'],
+            )
+            summary = [[group, [entry for entry in users if entry[0] != user.pk]] for group, users in summary]
+            for group, users in summary:
+                if group == emoji:
+                    users.append([user.pk, user.username])
+                    break
+            else:
+                summary.append([emoji, [[user.pk, user.username]]])
+            self._save_summary(summary)
+
+    def remove_reaction(self, user, emoji):
+        """Remove `user`'s reaction if it is `emoji`. Returns whether there was one."""
+        with transaction.atomic():
+            summary = self._locked_summary() or []
+            # No post_delete: the summary is updated here instead of by its receiver
+            if not delete_rows(self.reactions.model, message=self.pk, user=user.pk, emoji=emoji):
+                return False
+            self._save_summary(
+                [[group, [entry for entry in users if group != emoji or entry[0] != user.pk]] for group, users in summary]
+            )
+        return True
+
+    @classmethod
+    def summarize_reactions(cls, message_id):
+        """Rebuild the summary of message `message_id` from its reactions."""
+        with transaction.atomic():
+            message = cls.objects.select_for_update().filter(pk=message_id).first()
+            if message is None:
+                return
+            summary = {}
+            rows = (
+                message.reactions.model.objects.filter(message_id=message_id)
+                .order_by('created_at', 'pk').values_list('emoji', 'user_id', 'user__username')
+            )
+            for emoji, user_id, username in rows:
+                summary.setdefault(emoji, []).append([user_id, username])
+            message._save_summary(summary.items())
+
+
+class Profile(TracksMediaFiles, models.Model):
+    media_fields = ('avatar',)
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     title = models.CharField(max_length=100, blank=True)
     description = models.TextField(blank=True, default="This is my personal corner of the internet.")
@@ -122,12 +234,19 @@ class Skill(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.name}"
 
-class UserPhoto(models.Model):
+class UserPhoto(TracksMediaFiles, models.Model):
+    media_fields = ('image',)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='photos')
     image = models.ImageField(upload_to='gallery/')
     caption = models.CharField(max_length=200, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Gallery listing: photos of one user, newest first, paged by (created_at, id)
+            models.Index(fields=['user', '-created_at', '-id'], name='photo_user_created_id_idx'),
+        ]
+
     def __str__(self):
         return f"Photo by {self.user.username} at {self.created_at}"
 
@@ -151,6 +270,12 @@ class PhotoComment(models.Model):
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='replies')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Comment thread: top-level (or reply) comments of a photo, oldest first
+            models.Index(fields=['photo', 'parent', 'created_at'], name='comment_photo_parent_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} on {self.photo.id}: {self.text[:20]}"
 
@@ -205,11 +330,29 @@ class CommunityMembership(models.Model):
         return f"{self.user.username} in {self.community.slug} ({self.role})"
 
 
-class ChatMessage(models.Model):
+class ChatMessage(SummarizesReactions, models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_messages')
     community = models.ForeignKey(Community, on_delete=models.CASCADE, null=True, blank=True, related_name='messages')
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # CommunityMessageReaction rows grouped by emoji (see SummarizesReactions)
+    reaction_summary = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [
+            # Chat polling: newest messages of a room (community=NULL is the global room)
+            models.Index(fields=['community', '-created_at'], name='chat_community_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            publish(chat_topic(self.community_id), {
+                'event': 'message.created',
+                'message_id': self.pk,
+                'user_id': self.user_id,
+            })
 
     def __str__(self):
         scope = self.community.slug if self.community_id else 'global'
@@ -235,19 +378,44 @@ class Conversation(models.Model):
         # For 1:1 conversations, return the other participant.
         if not me:
             return None
-        qs = self.participants.exclude(pk=me.pk)
-        return qs.first()
+        # Iterate participants.all() so a prefetched participant list is reused
+        for user in self.participants.all():
+            if user.pk != me.pk:
+                return user
+        return None
+
+    def last_read_message_id(self, user):
+        """Id of the newest message `user` has read here (0 if never opened)."""
+        cursor = self.read_cursors.filter(user=user).values_list('last_read_message_id', flat=True).first()
+        return cursor or 0
+
+    def unread_count_for(self, user):
+        """Messages from other participants newer than `user`'s read cursor."""
+        return self.messages.filter(
+            pk__gt=self.last_read_message_id(user)
+        ).exclude(
+            sender=user
+        ).count()
 
     def __str__(self):
         return f"Conversation {self.pk}"
 
 
-class DirectMessage(models.Model):
+class DirectMessage(SummarizesReactions, models.Model):
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='dm_messages_sent')
     text = models.TextField()  # Stores encrypted data
     created_at = models.DateTimeField(auto_now_add=True)
-    is_read = models.BooleanField(default=False)
+    # MessageReaction rows grouped by emoji (see SummarizesReactions)
+    reaction_summary = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [
+            # Thread polling: newest messages of a conversation
+            models.Index(fields=['conversation', '-created_at'], name='dm_conversation_created_idx'),
+            # Unread counting: messages of a conversation above a read cursor
+            models.Index(fields=['conversation', 'id'], name='dm_conversation_id_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         """Override save to encrypt message text before storing."""
@@ -256,10 +424,22 @@ class DirectMessage(models.Model):
             from .encryption import MessageEncryption
             self.text = MessageEncryption.encrypt(self.text)
         
+        adding = self._state.adding
         super().save(*args, **kwargs)
         
         # Keep conversation ordering fresh for inbox sorting
         Conversation.objects.filter(pk=self.conversation_id).update(updated_at=timezone.now())
+
+        if adding:
+            from .unread import UnreadCounters
+            recipients = self.conversation.participants.exclude(pk=self.sender_id).values_list('pk', flat=True)
+            UnreadCounters.message_created(self.conversation_id, recipients)
+
+            publish(dm_topic(self.conversation_id), {
+                'event': 'message.created',
+                'message_id': self.pk,
+                'sender_id': self.sender_id,
+            })
     
     def _is_encrypted(self, text):
         """
@@ -277,6 +457,47 @@ class DirectMessage(models.Model):
         return f"[DM {self.conversation_id}] {self.sender.username}: {self.text[:20]}"
 
 
+class ConversationReadCursor(models.Model):
+    """How far a participant has read a conversation.
+
+    Replaces a per-message read flag: marking a thread read is a single-row write,
+    unread messages are the ones above the cursor, and the other participant's
+    cursor doubles as a read receipt for your own messages.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='dm_read_cursors')
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='read_cursors')
+    # Plain id (not a FK) so deleting the message does not move the cursor
+    last_read_message_id = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['user', 'conversation'], name='unique_user_conversation_cursor'),
+        ]
+
+    @classmethod
+    def mark_read(cls, user, conversation, message_id):
+        """Move `user`'s cursor in `conversation` forward to `message_id`.
+
+        Never backwards: a slower poll, or one that read a lagging replica,
+        may pass an older id than the cursor already has.
+        """
+        moved = cls.objects.filter(
+            user=user, conversation=conversation, last_read_message_id__lt=message_id,
+        ).update(last_read_message_id=message_id)
+        if not moved:
+            # No cursor yet, or it is already there (INSERT ... ON CONFLICT DO NOTHING)
+            cls.objects.bulk_create(
+                [cls(user=user, conversation=conversation, last_read_message_id=message_id)],
+                ignore_conflicts=True,
+            )
+
+        from .unread import UnreadCounters
+        UnreadCounters.thread_read(user.pk, conversation.pk)
+
+    def __str__(self):
+        return f"{self.user.username} read DM {self.conversation_id} up to {self.last_read_message_id}"
+
+
 class MessageReaction(models.Model):
     """Emoji reactions on direct messages (WhatsApp-style)"""
     message = models.ForeignKey(DirectMessage, on_delete=models.CASCADE, related_name='reactions')
@@ -306,3 +527,67 @@ class CommunityMessageReaction(models.Model):
     
     def __str__(self):
         return f"{self.user.username} {self.emoji} on Chat {self.message_id}"
+
+
+class MediaObject(models.Model):
+    """A stored image and how many rows use it.
+
+    Uploads are stored under the SHA-256 of their bytes (core/storage.py), so
+    identical images share one object. `refs` counts the Profile.avatar and
+    UserPhoto.image values naming it (kept up to date by homepage/signals.py);
+    `manage.py purge_media` deletes objects nothing has used for a while.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    refs = models.IntegerField(default=0)
+    # When refs last changed: purge_media leaves recently released objects alone
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], condition=models.Q(refs__lte=0), name='media_unreferenced_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refs} refs)"
+
+    @classmethod
+    def count(cls, name, delta):
+        """Add `delta` to the references of the stored file `name`."""
+        if not name:
+            return
+        if cls.objects.filter(name=name).update(refs=F('refs') + delta, updated_at=timezone.now()) or delta < 0:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(name=name, refs=delta)
+        except IntegrityError:
+            # Created by a concurrent upload of the same bytes
+            cls.objects.filter(name=name).update(refs=F('refs') + delta, updated_at=timezone.now())
+
+    @classmethod
+    def touch(cls, name):
+        """Restart the grace period of `name` before a new upload reuses it.
+
+        purge_media only deletes objects untouched for the grace period, and
+        holds the row lock of one it is deleting, so this waits until the
+        file is gone and the upload stores it again.
+        """
+        cls.objects.filter(name=name).update(updated_at=timezone.now())
+
+    @classmethod
+    def recount(cls):
+        """Rebuild every count from the rows themselves (e.g. after editing files
+        outside the ORM). Returns the number of referenced files."""
+        counts = Counter()
+        for model in (Profile, UserPhoto):
+            for field in model.media_fields:
+                counts.update(model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+                              .values_list(field, flat=True))
+        with transaction.atomic():
+            # Newly unreferenced objects get the full grace period before purge_media
+            cls.objects.exclude(refs=0).update(refs=0, updated_at=timezone.now())
+            cls.objects.bulk_create(
+                [cls(name=name, refs=refs) for name, refs in counts.items()],
+                update_conflicts=True, unique_fields=['name'], update_fields=['refs'], batch_size=500,
+            )
+        return len(counts)
@@ -0,0 +1,93 @@
+"""
+Cache invalidation: writes to these models invalidate the tags of every
+cached response that shows them (see core/cache.py).
+
+  user:<id>        the user's profile, photo list and communities
+  photo:<id>       like counts and like status of one photo
+  community:<id>   a community's name, members and member count
+
+Media references: saving or deleting an avatar or gallery photo updates
+the reference count of the stored file (MediaObject).
+
+Reaction summaries: a reaction saved or deleted outside
+set_reaction()/remove_reaction() (admin, fixtures, a deleted user) rebuilds
+its message's reaction_summary.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import invalidate
+from .models import (
+    ChatMessage, Community, CommunityMembership, CommunityMessageReaction, Conversation, DirectMessage,
+    MediaObject, MessageReaction, PhotoLike, Profile, UserPhoto,
+)
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def invalidate_profile(sender, instance, **kwargs):
+    invalidate(f'user:{instance.user_id}')
+
+
+@receiver([post_save, post_delete], sender=UserPhoto)
+def invalidate_photo(sender, instance, **kwargs):
+    invalidate(f'user:{instance.user_id}', f'photo:{instance.pk}')
+
+
+@receiver([post_save, post_delete], sender=PhotoLike)
+def invalidate_photo_like(sender, instance, **kwargs):
+    invalidate(f'photo:{instance.photo_id}')
+
+
+@receiver([post_save, post_delete], sender=Community)
+def invalidate_community(sender, instance, **kwargs):
+    invalidate(f'community:{instance.pk}')
+
+
+@receiver([post_save, post_delete], sender=CommunityMembership)
+def invalidate_membership(sender, instance, **kwargs):
+    invalidate(f'community:{instance.community_id}', f'user:{instance.user_id}')
+
+
+# -------------------------------------------------------------
+# MEDIA REFERENCES
+# -------------------------------------------------------------
+@receiver(post_save, sender=Profile)
+@receiver(post_save, sender=UserPhoto)
+def count_media_refs(sender, instance, created, update_fields=None, **kwargs):
+    loaded = instance.__dict__.setdefault('_loaded_media', {})
+    deferred = instance.get_deferred_fields()
+    for field in sender.media_fields:
+        if field in deferred or (update_fields is not None and field not in update_fields):
+            continue
+        if not created and field not in loaded:
+            continue  # Loaded with only()/defer(): the stored name is unknown
+        old, new = loaded.get(field) or None, getattr(instance, field).name or None
+        if old != new:
+            MediaObject.count(new, 1)
+            MediaObject.count(old, -1)
+        loaded[field] = new
+
+
+@receiver(post_delete, sender=Profile)
+@receiver(post_delete, sender=UserPhoto)
+def release_media_refs(sender, instance, **kwargs):
+    for field in sender.media_fields:
+        MediaObject.count(getattr(instance, field).name, -1)
+
+
+# -------------------------------------------------------------
+# REACTION SUMMARIES
+# -------------------------------------------------------------
+@receiver(post_save, sender=MessageReaction)
+@receiver(post_save, sender=CommunityMessageReaction)
+def summarize_saved_reaction(sender, instance, **kwargs):
+    sender._meta.get_field('message').related_model.summarize_reactions(instance.message_id)
+
+
+@receiver(post_delete, sender=MessageReaction)
+@receiver(post_delete, sender=CommunityMessageReaction)
+def summarize_deleted_reaction(sender, instance, origin=None, **kwargs):
+    # Deleting a message (or its room) deletes its reactions too: nothing left to summarize
+    if getattr(origin, 'model', type(origin)) in (ChatMessage, DirectMessage, Community, Conversation):
+        return
+    sender._meta.get_field('message').related_model.summarize_reactions(instance.message_id)
@@ -0,0 +1,22 @@
+"""
+{% page_styles %} and {% page_script '<page>' %}: a page's stylesheet and
+entry module, bundled or not depending on ASSET_BUNDLES (see core/assets.py).
+"""
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_styles():
+    path = 'bundles/styles.css' if settings.ASSET_BUNDLES else 'styles.css'
+    return format_html('<link rel="stylesheet" href="{}">', static(path))
+
+
+@register.simple_tag
+def page_script(page):
+    path = f'bundles/{page}.js' if settings.ASSET_BUNDLES else f'pages/{page}.js'
+    return format_html('<script type="module" src="{}"></script>', static(path))
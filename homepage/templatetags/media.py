@@ -0,0 +1,14 @@
+"""
+{{ file|media_url }}: a FieldFile's URL through core.media, memoized per
+file name instead of asking the storage backend on every render.
+"""
+from django import template
+
+from core import media
+
+register = template.Library()
+
+
+@register.filter
+def media_url(value):
+    return media.media_url(value) or ''
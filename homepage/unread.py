@@ -0,0 +1,134 @@
+"""
+Cached per-user unread DM counters for nav-bar badges.
+"""
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.cache import is_shared
+
+
+class UnreadCounters:
+    """Maintains unread DM counts in the cache so badges cost O(1).
+
+    Two keys per user:
+      - dm_unread:<user>         total unread messages across all threads
+      - dm_unread:<user>:<conv>  unread messages in one thread
+
+    Counters are incremented when a message is created and recounted when the
+    reader's cursor moves. The database (read cursors) stays the source of
+    truth: a missing total is recomputed, and any inconsistency (e.g. an
+    evicted thread key) drops the total so it gets recomputed next time.
+
+    Counters need a cache shared by all workers (REDIS_URL). With a
+    per-process cache a write would only reach one worker's copy, so totals
+    are counted from the database on every read instead.
+    """
+
+    TIMEOUT = 60 * 60 * 24
+
+    @staticmethod
+    def total_key(user_id):
+        return f"dm_unread:{user_id}"
+
+    @staticmethod
+    def thread_key(user_id, conversation_id):
+        return f"dm_unread:{user_id}:{conversation_id}"
+
+    @classmethod
+    def get_total(cls, user):
+        """Total unread messages for `user`, recomputed from the DB on a cache miss."""
+        if not is_shared(cache):
+            return cls.unread_messages(user.pk).count()
+        total = cache.get(cls.total_key(user.pk))
+        if total is None:
+            total = cls.recompute(user)
+        return total
+
+    @classmethod
+    def recompute(cls, user):
+        """Rebuild the total and every thread counter of `user` from read cursors."""
+        per_thread = cls.count(user)
+        values = {cls.thread_key(user.pk, cid): n for cid, n in per_thread.items()}
+        values[cls.total_key(user.pk)] = sum(per_thread.values())
+        cache.set_many(values, cls.TIMEOUT)
+        return values[cls.total_key(user.pk)]
+
+    @staticmethod
+    def unread_messages(user_id):
+        """DirectMessages `user_id` has not read: above their cursor in each of their threads."""
+        from .models import ConversationReadCursor, DirectMessage
+
+        my_cursor = ConversationReadCursor.objects.filter(
+            conversation=OuterRef('conversation'), user_id=user_id,
+        ).values('last_read_message_id')[:1]
+        return (
+            DirectMessage.objects
+            .filter(conversation__participants=user_id, pk__gt=Coalesce(Subquery(my_cursor), 0))
+            .exclude(sender_id=user_id)
+        )
+
+    @classmethod
+    def count(cls, user):
+        """{conversation id: unread messages} of every thread of `user`, from the database."""
+        from .models import Conversation
+
+        # Every thread gets a key, including the fully read ones, so later
+        # increments never land on a stale value.
+        per_thread = dict.fromkeys(
+            Conversation.objects.filter(participants=user).values_list('pk', flat=True), 0
+        )
+        per_thread.update(
+            cls.unread_messages(user.pk).order_by()
+            .values('conversation_id').annotate(n=Count('pk')).values_list('conversation_id', 'n')
+        )
+        return per_thread
+
+    @classmethod
+    def message_created(cls, conversation_id, recipient_ids):
+        """Bump the counters of every recipient of a new message."""
+        if not is_shared(cache):
+            return
+        for user_id in recipient_ids:
+            total_key = cls.total_key(user_id)
+            if cache.get(total_key) is None:
+                continue  # Recomputed from the DB on next read
+            try:
+                cache.incr(cls.thread_key(user_id, conversation_id))
+                cache.incr(total_key)
+            except ValueError:
+                # A key was evicted, so the pair is no longer consistent
+                cache.delete(total_key)
+
+    @classmethod
+    def thread_read(cls, user_id, conversation_id):
+        """Recount one thread from the reader's cursor and move the total by the difference.
+
+        Not a reset to 0: messages that arrived after the page the reader saw stay unread.
+        """
+        if not is_shared(cache):
+            return
+        total_key = cls.total_key(user_id)
+        thread_key = cls.thread_key(user_id, conversation_id)
+        unread = cache.get(thread_key)
+        if unread is None:
+            if cache.get(total_key):
+                # Thread key evicted while the total still counts it
+                cache.delete(total_key)
+            return
+        # Relative to the value read above, so increments made meanwhile are kept
+        delta = cls.unread_messages(user_id).filter(conversation_id=conversation_id).count() - unread
+        if not delta:
+            return
+        try:
+            cache.incr(thread_key, delta)
+            if cache.incr(total_key, delta) < 0:
+                cache.delete(total_key)
+        except ValueError:
+            # A key was evicted, so the pair is no longer consistent
+            cache.delete(total_key)
+
+    @classmethod
+    def invalidate(cls, user_ids):
+        """Drop cached totals so they are recomputed (e.g. after a delete)."""
+        cache.delete_many([cls.total_key(user_id) for user_id in user_ids])
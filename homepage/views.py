@@ -1,5 +1,8 @@
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.models import User
+from django.urls import reverse
+
+from core.pagination import keyset_page
 
 # -------------------------------------------------------------
 # LANDING PAGE — ROOT URL "/"
@@ -12,8 +15,13 @@ def landing_page(request):
 # -------------------------------------------------------------
 def public_profile(request, username):
     user = get_object_or_404(User, username=username)
+    # First page of the gallery; the page scrolls in the rest from the API
+    photos, cursor = keyset_page(user.photos.all())
+    photos_next = f"{reverse('api-user-photos', args=[username])}?cursor={cursor}" if cursor else ''
     return render(request, "homepage/public_profile.html", {
-        "user_obj": user
+        "user_obj": user,
+        "photos": photos,
+        "photos_next": photos_next,
     })
 
 # -------------------------------------------------------------